@@ -1,4 +1,4 @@
 """API 패키지"""
-from . import auth, chat, history
+from . import auth, chat, history, files, batch
 
-__all__ = ["auth", "chat", "history"]
+__all__ = ["auth", "chat", "history", "files", "batch"]
@@ -1,7 +1,7 @@
 """인증 API"""
 from fastapi import APIRouter, Depends, HTTPException, Header
-from database import verify_user_token, get_user_profile
 from models import UserProfile
+from services import get_auth_service, get_profile_cache
 
 router = APIRouter()
 
@@ -19,8 +19,8 @@ async def get_current_user(authorization: str = Header(None)) -> dict:
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid authorization header")
 
-    # 토큰 검증
-    user = await verify_user_token(token)
+    # 토큰 검증 (로컬 JWT 검증 + 캐시, 필요 시 Supabase Auth 폴백)
+    user = await get_auth_service().verify(token)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
@@ -29,8 +29,8 @@ async def get_current_user(authorization: str = Header(None)) -> dict:
 
 @router.get("/me", response_model=UserProfile)
 async def get_me(user: dict = Depends(get_current_user)):
-    """현재 사용자 정보 조회"""
-    profile = await get_user_profile(user["id"])
+    """현재 사용자 정보 조회 (프로필 캐시)"""
+    profile = await get_profile_cache().get(user["id"])
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     return profile
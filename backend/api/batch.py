@@ -0,0 +1,99 @@
+"""배치 작업 API - 비대화형 일괄 처리 (Message Batches)"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from database import get_batch_job, get_user_batch_jobs, get_batch_items, BATCH_JOB_COLUMNS
+from models import BatchJobCreate, BatchJob, BatchItem
+from services import get_batch_service, BatchConversationNotFoundError
+from api.auth import get_current_user
+from config import get_settings
+from serialization import trusted_response
+
+router = APIRouter()
+settings = get_settings()
+
+DEFAULT_JOB_LIST_SIZE = 20
+MAX_JOB_LIST_SIZE = 100
+
+
+async def _get_own_job(job_id: str, user_id: str) -> dict:
+    """사용자 소유 작업 (없거나 남의 작업이면 404)"""
+    job = await get_batch_job(job_id, f"{BATCH_JOB_COLUMNS},user_id")
+    if not job or job["user_id"] != user_id:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.post("/jobs", response_model=BatchJob, status_code=202)
+async def create_job(
+    data: BatchJobCreate,
+    user: dict = Depends(get_current_user)
+):
+    """
+    배치 작업 제출
+
+    - kind=prompt: 항목마다 대화 히스토리 + prompt 로 답변 생성 → user / assistant 메시지 저장
+    - kind=summarize: 항목의 대화를 요약 → system 메시지로 저장
+
+    바로 queued 상태로 반환하고, 워커가 다른 대기 작업과 묶어 Anthropic 배치로
+    제출한다. 진행 상황은 GET /jobs/{job_id} 로 확인.
+    """
+    if len(data.items) > settings.batch_max_items_per_job:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items (max {settings.batch_max_items_per_job})"
+        )
+    if data.kind == "prompt" and any(item.prompt is None for item in data.items):
+        raise HTTPException(status_code=400, detail="Every item needs a prompt for prompt jobs")
+
+    try:
+        job = await get_batch_service().create_job(
+            user["id"],
+            data.kind,
+            [item.model_dump() for item in data.items]
+        )
+    except BatchConversationNotFoundError:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    if not job:
+        raise HTTPException(status_code=500, detail="Failed to create batch job")
+    return trusted_response(job, status_code=202)
+
+
+@router.get("/jobs", response_model=list[BatchJob])
+async def list_jobs(
+    limit: int = Query(DEFAULT_JOB_LIST_SIZE, ge=1, le=MAX_JOB_LIST_SIZE),
+    user: dict = Depends(get_current_user)
+):
+    """내 배치 작업 목록 (최근 순)"""
+    # BATCH_JOB_COLUMNS 행 그대로 → 검증 없이 직렬화
+    return trusted_response(await get_user_batch_jobs(user["id"], limit))
+
+
+@router.get("/jobs/{job_id}", response_model=BatchJob)
+async def get_job(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """배치 작업 상태 (결과 타입별 개수 포함)"""
+    return await _get_own_job(job_id, user["id"])
+
+
+@router.get("/jobs/{job_id}/items", response_model=list[BatchItem])
+async def get_job_items(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """배치 작업 항목별 상태"""
+    await _get_own_job(job_id, user["id"])
+    # BATCH_ITEM_COLUMNS 행 그대로 → 검증 없이 직렬화
+    return trusted_response(await get_batch_items([job_id]))
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=BatchJob)
+async def cancel_job(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """제출 전(queued) 작업 취소 - 이미 제출된 작업은 409"""
+    job = await _get_own_job(job_id, user["id"])
+    if job["status"] != "queued" or not await get_batch_service().cancel_job(job_id):
+        raise HTTPException(status_code=409, detail="Batch job already submitted")
+    return await _get_own_job(job_id, user["id"])
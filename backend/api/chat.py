@@ -1,32 +1,352 @@
 """채팅 API - WebSocket & HTTP Streaming"""
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Request
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from contextlib import aclosing
 from database import (
-    save_message,
+    get_conversation,
     get_conversation_messages,
     create_conversation
 )
-from services import get_claude_service
+from config import get_settings
+from services import (
+    get_claude_service,
+    get_auth_service,
+    get_message_writer,
+    get_hub,
+    get_replay_buffer,
+    get_profile_cache,
+    TurnExpiredError
+)
+from services.stream_coalescer import coalesce_chunks
 from api.auth import get_current_user
+from log import get_logger
+from metrics import TTFT, TURN_DURATION
+import asyncio
+import hashlib
 import json
+import time
 
 router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
 claude_service = get_claude_service()
+message_writer = get_message_writer()
+hub = get_hub()
+replay_buffer = get_replay_buffer()
+profile_cache = get_profile_cache()
+
+# 응답 연결과 분리되어 실행 중인 스트림 턴 (turn_id → 태스크)
+_turn_tasks: dict[str, asyncio.Task] = {}
+# 끊긴 클라이언트의 턴을 유예 시간 뒤 정리하는 태스크 (참조 유지용)
+_abandon_watchers: set[asyncio.Task] = set()
 
 
 class ChatRequest(BaseModel):
-    user_id: str
     message: str
     conversation_id: str = None
     files: list[str] = []
 
 
+class _TurnTimer:
+    """턴 하나의 TTFT / 전체 시간 메트릭"""
+
+    __slots__ = ("transport", "started", "first_chunk")
+
+    def __init__(self, transport: str):
+        self.transport = transport
+        self.started = time.perf_counter()
+        self.first_chunk = False
+
+    def chunk(self):
+        if not self.first_chunk:
+            self.first_chunk = True
+            TTFT.labels(transport=self.transport).observe(time.perf_counter() - self.started)
+
+    def finish(self, outcome: str):
+        TURN_DURATION.labels(transport=self.transport, outcome=outcome).observe(
+            time.perf_counter() - self.started
+        )
+
+
+async def _load_history(conversation_id: str) -> list[dict]:
+    """
+    컨텍스트용 최근 히스토리 (context_max_messages 개까지)
+
+    ContextBuilder 가 토큰 예산으로 다시 자르므로, 긴 대화라도 전체를 읽지 않는다.
+    write-behind 큐에서 아직 저장되지 않은 행(직전 턴 등)도 뒤에 합친다.
+    """
+    limit = settings.context_max_messages or None
+    history = await get_conversation_messages(conversation_id, limit=limit, columns="id,role,content")
+    pending = message_writer.pending_messages(conversation_id)
+    if pending:
+        saved = {row["id"] for row in history}
+        history += [row for row in pending if row["id"] not in saved]
+        if limit is not None:
+            history = history[-limit:]
+    return history
+
+
+async def _owned_history(conversation_id: str, user_id: str) -> list[dict] | None:
+    """내 대화면 최근 히스토리, 없거나 남의 대화면 None (소유 확인과 히스토리 조회를 동시에)"""
+    conversation, history = await asyncio.gather(
+        get_conversation(conversation_id, "id,user_id"),
+        _load_history(conversation_id)
+    )
+    if not conversation or conversation["user_id"] != user_id:
+        return None
+    return history
+
+
+def _coalesced(chunks):
+    """설정된 병합 정책(STREAM_FLUSH_MS / STREAM_FLUSH_BYTES) 적용"""
+    return coalesce_chunks(chunks, settings.stream_flush_ms, settings.stream_flush_bytes)
+
+
+def _spawn_turn(turn_id: str, coro) -> asyncio.Task:
+    """클라이언트 연결과 별개로 실행되는 턴 태스크"""
+    task = asyncio.create_task(coro)
+    _turn_tasks[turn_id] = task
+    task.add_done_callback(lambda _: _turn_tasks.pop(turn_id, None))
+    return task
+
+
+def _cancel_turn(turn_id: str) -> bool:
+    """진행 중인 턴 취소 (업스트림 Claude 스트림도 바로 닫힘)"""
+    task = _turn_tasks.get(turn_id)
+    if task is None or task.done():
+        return False
+    task.cancel()
+    return True
+
+
+async def drain_turns(timeout: float) -> dict:
+    """
+    종료 시 진행 중인 턴 마무리 (FastAPI lifespan 종료 시 호출)
+
+    timeout 초까지 턴이 끝나기를 기다리고, 남은 턴은 취소한다.
+    취소된 턴은 받은 데까지 truncated 로 저장된다. (메시지 저장 큐 drain 전에 호출)
+    종료 중에는 클라이언트가 끊겨도 유예 취소 없이 끝까지 생성해 저장한다.
+    """
+    for watcher in list(_abandon_watchers):
+        watcher.cancel()
+    tasks = [task for task in _turn_tasks.values() if not task.done()]
+    if not tasks:
+        return {"completed": 0, "cancelled": 0}
+    logger.info("Draining in-flight turns", extra={"turns": len(tasks), "timeout": timeout})
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending, timeout=5.0)
+    return {"completed": len(done), "cancelled": len(pending)}
+
+
+def _watch_abandoned(turn_id: str):
+    """
+    클라이언트가 끊긴 턴 정리 예약
+
+    STREAM_ABANDON_GRACE 초 안에 아무도 이어 받지 않고 (resume),
+    같은 대화를 보고 있는 다른 연결도 없으면 턴을 취소한다.
+    """
+    async def watch():
+        if settings.stream_abandon_grace > 0:
+            await asyncio.sleep(settings.stream_abandon_grace)
+        turn = replay_buffer.get_turn(turn_id)
+        if turn is not None:
+            if turn.done or turn.followers:
+                return
+            if turn.conversation_id and hub.has_subscribers(turn.conversation_id):
+                return
+        if _cancel_turn(turn_id):
+            logger.info("Cancelled abandoned turn", extra={"turn_id": turn_id})
+
+    task = asyncio.create_task(watch())
+    _abandon_watchers.add(task)
+    task.add_done_callback(_abandon_watchers.discard)
+
+
+def _done_event(
+    conversation_id: str | None,
+    turn_id: str,
+    message: dict | None,
+    full_response: str,
+    usage: dict,
+    truncated: bool = False
+) -> dict:
+    """완료 신호 (전체 텍스트 대신 길이 + 해시)"""
+    encoded = full_response.encode()
+    event = {
+        "type": "done",
+        "conversation_id": conversation_id,
+        "turn_id": turn_id,
+        "message_id": message["id"] if message else None,
+        "length": len(encoded),
+        "sha256": hashlib.sha256(encoded).hexdigest(),
+        "usage": usage
+    }
+    if truncated:
+        event["truncated"] = True
+    return event
+
+
+def _save_partial(conversation_id: str | None, parts: list[str]) -> dict | None:
+    """취소된 턴의 부분 응답 저장 (truncated 로 표시)"""
+    if not conversation_id or not parts:
+        return None
+    return message_writer.enqueue(conversation_id, "assistant", "".join(parts), truncated=True)
+
+
+async def _resume_turn(connection, turn_id: str, last_seq: int):
+    """버퍼에서 last_seq 이후 청크 + 라이브 청크를 이 연결에만 전송"""
+    try:
+        async for seq, chunk in replay_buffer.follow(turn_id, last_seq):
+            connection.send({"type": "stream", "turn_id": turn_id, "seq": seq, "content": chunk})
+    except TurnExpiredError:
+        connection.send({"type": "error", "turn_id": turn_id, "message": "Turn expired"})
+        return
+    turn = replay_buffer.get_turn(turn_id)
+    if turn is not None and turn.final_event is not None:
+        connection.send(turn.final_event)
+
+
+async def _follow_text(turn_id: str, offset: int = 0):
+    """text/plain 응답 본문 (버퍼를 따라가며 전송, 도중에 끊기면 정리 예약)"""
+    finished = False
+    try:
+        async with aclosing(replay_buffer.follow_bytes(turn_id, offset)) as stream:
+            async for data in stream:
+                yield data
+        finished = True
+    except TurnExpiredError:
+        finished = True
+        yield "\n⚠️ 스트림이 만료되었습니다. 다시 시도해주세요.".encode()
+    finally:
+        if not finished:
+            _watch_abandoned(turn_id)
+
+
+async def _ws_turn(connection, user_id: str, turn_id: str, data: dict, lock: asyncio.Lock):
+    """
+    WebSocket 메시지 하나에 대한 응답 턴
+
+    수신 루프와 별도 태스크로 실행되어 스트리밍 중에도 cancel / 연결 끊김을
+    받을 수 있다. lock 으로 같은 연결의 메시지는 보낸 순서대로 처리한다.
+    """
+    conversation_id = data.get("conversation_id")
+    content = data.get("content")
+    files = data.get("files", [])
+    parts: list[str] = []
+    usage = {}
+    streaming = False
+    # 구독자에게 이벤트를 보내도 되는 대화인지 (생성했거나 소유 확인을 마침)
+    verified = False
+    timer = _TurnTimer("ws")
+
+    try:
+        async with lock:
+            # 대화 ID 없으면 새로 생성
+            if not conversation_id:
+                conversation = await create_conversation(user_id, "New Chat")
+                conversation_id = conversation["id"]
+                connection.send({
+                    "type": "conversation_created",
+                    "conversation_id": conversation_id
+                })
+            elif conversation_id not in connection.conversations:
+                # 클라이언트가 보낸 대화 id - 구독 / 저장 / 스트리밍 전에 소유 확인
+                # (이미 구독 중인 대화는 구독할 때 확인함)
+                conversation = await get_conversation(conversation_id, "id,user_id")
+                if not conversation or conversation["user_id"] != user_id:
+                    connection.send({"type": "error", "turn_id": turn_id, "message": "Conversation not found"})
+                    return
+            verified = True
+            hub.subscribe(connection, conversation_id)
+            turn = replay_buffer.get_turn(turn_id)
+            if turn is not None:
+                turn.conversation_id = conversation_id
+
+            # 이전 대화 컨텍스트 (이번 메시지 저장 전에 조회)
+            history = await _load_history(conversation_id)
+
+            # 사용자 메시지 저장 (write-behind, 첫 토큰이 DB 쓰기를 기다리지 않음)
+            user_message = message_writer.enqueue(conversation_id, "user", content, files=files, user_id=user_id)
+            await hub.publish(conversation_id, {
+                "type": "user_message",
+                "conversation_id": conversation_id,
+                "message_id": user_message["id"],
+                "turn_id": turn_id,
+                "content": content
+            })
+
+            # 동시 실행 상한으로 대기하면 순번 전달 (요청한 연결에만)
+            async def report_queue(position: int):
+                connection.send({"type": "queued", "turn_id": turn_id, "position": position})
+
+            # Claude CLI 호출 및 스트리밍 응답 (델타 병합 후 구독자 전체에 전송)
+            streaming = True
+            async for chunk in _coalesced(claude_service.chat(
+                content, files, history, usage,
+                user_id=user_id, on_queue=report_queue
+            )):
+                timer.chunk()
+                seq = replay_buffer.append(turn_id, chunk)
+                await hub.publish(conversation_id, {
+                    "type": "stream",
+                    "conversation_id": conversation_id,
+                    "turn_id": turn_id,
+                    "seq": seq,
+                    "content": chunk
+                })
+                parts.append(chunk)
+            full_response = "".join(parts)
+
+            # AI 응답 저장 (id 는 미리 발급되므로 바로 전달)
+            message = message_writer.enqueue(conversation_id, "assistant", full_response)
+
+            done_event = _done_event(conversation_id, turn_id, message, full_response, usage)
+            replay_buffer.finish(turn_id, done_event)
+            await hub.publish(conversation_id, done_event)
+            timer.finish("completed")
+
+    except asyncio.CancelledError:
+        # cancel 요청 / 연결 끊김 - 받은 데까지 저장하고 구독자에게 알림
+        timer.finish("cancelled")
+        message = _save_partial(conversation_id, parts) if streaming else None
+        done_event = _done_event(conversation_id, turn_id, message, "".join(parts), usage, truncated=True)
+        replay_buffer.finish(turn_id, done_event)
+        if verified:
+            await hub.publish(conversation_id, done_event)
+        else:
+            # 소유 확인 전에 취소됨 - 클라이언트가 보낸 대화 id 의 구독자에게 보내지 않음
+            connection.send(done_event)
+    except Exception as e:
+        timer.finish("error")
+        logger.error("WebSocket turn error", extra={"turn_id": turn_id}, exc_info=True)
+        connection.send({
+            "type": "error",
+            "turn_id": turn_id,
+            "message": str(e)
+        })
+    finally:
+        replay_buffer.finish(turn_id)
+
+
 @router.websocket("/ws")
 async def websocket_chat(websocket: WebSocket):
     """
     WebSocket 채팅 엔드포인트
 
+    같은 대화를 구독한 연결(다른 탭/기기, 다른 워커 포함)은 모두 같은
+    user_message / stream / done 이벤트를 받는다. (ConnectionHub)
+
+    응답 턴마다 turn_id, stream 청크마다 1부터 증가하는 seq 가 붙는다.
+    연결이 끊겼다면 다시 연결해 resume 을 보내면 놓친 청크부터 이어 받는다.
+    (완료 후 REPLAY_TTL 초 동안, 턴을 시작한 워커에서만 가능)
+
+    연결이 끊긴 뒤 STREAM_ABANDON_GRACE 초 안에 아무도 이어 받지 않으면
+    턴을 취소하고, 받은 데까지를 truncated 응답으로 저장한다. (cancel 과 동일)
+
     메시지 형식:
     - 클라이언트 → 서버:
       {
@@ -35,17 +355,52 @@ async def websocket_chat(websocket: WebSocket):
         "content": "메시지 내용",
         "files": ["file_path1", "file_path2"]  # 선택
       }
+      또는
+      {
+        "type": "subscribe",  # 다른 기기에서 진행 중인 대화 수신
+        "conversation_id": "uuid"
+      }
+      또는
+      {
+        "type": "resume",  # 끊긴 응답 이어 받기 (이 연결에만 전송)
+        "turn_id": "uuid",
+        "last_seq": 12  # 마지막으로 받은 stream 청크의 seq (없으면 0)
+      }
+      또는
+      {
+        "type": "cancel",  # 응답 생성 중단 (업스트림 호출도 바로 종료)
+        "turn_id": "uuid"  # 선택, 없으면 이 연결이 시작한 진행 중 턴 전부
+      }
 
-    - 서버 → 클라이언트:
+    - 서버 → 클라이언트 (대화 이벤트에는 conversation_id 포함):
       {
-        "type": "stream",  # 스트리밍 중
+        "type": "user_message",  # 사용자 메시지 (보낸 연결 포함 구독자 전체)
+        "message_id": "uuid",
+        "turn_id": "uuid",  # 이어지는 응답 턴
+        "content": "메시지 내용"
+      }
+      또는
+      {
+        "type": "queued",  # 동시 실행 상한으로 대기 중 (순번이 바뀔 때마다)
+        "turn_id": "uuid",
+        "position": 3
+      }
+      또는
+      {
+        "type": "stream",  # 스트리밍 중 (STREAM_FLUSH_MS / STREAM_FLUSH_BYTES 단위로 병합)
+        "turn_id": "uuid",
+        "seq": 1,
         "content": "청크"
       }
       또는
       {
-        "type": "done",  # 응답 완료
-        "message_id": "uuid",
-        "content": "전체 응답"
+        "type": "done",  # 응답 완료 (전체 텍스트는 stream 청크를 이어 붙여 사용)
+        "turn_id": "uuid",
+        "message_id": "uuid",  # 취소되어 저장할 내용이 없으면 null
+        "length": 1234,  # 전체 응답의 UTF-8 바이트 수
+        "sha256": "hex",  # 전체 응답의 SHA-256
+        "usage": {...},  # 토큰 사용량 (cache_read/creation_input_tokens 포함)
+        "truncated": true  # 취소된 턴에만 포함
       }
       또는
       {
@@ -65,63 +420,81 @@ async def websocket_chat(websocket: WebSocket):
         await websocket.close()
         return
 
-    # 사용자 인증 (간단한 방식 - 실제로는 더 안전하게)
-    # TODO: JWT 토큰 검증 로직 추가
-    user_id = websocket.query_params.get("user_id")  # 임시
+    # 사용자 인증 (JWT 검증)
+    user = await get_auth_service().verify(token)
+    if not user:
+        await websocket.send_json({
+            "type": "error",
+            "message": "Invalid or expired token"
+        })
+        await websocket.close()
+        return
+    user_id = user["id"]
 
+    connection = hub.register(websocket, user_id)
+    resumes: set[asyncio.Task] = set()
+    turns: set[str] = set()  # 이 연결이 시작한 진행 중 턴
+    turn_lock = asyncio.Lock()
     try:
         while True:
             # 클라이언트로부터 메시지 수신
             data = await websocket.receive_json()
 
-            if data.get("type") != "message":
+            if data.get("type") == "subscribe":
+                conversation = await get_conversation(data.get("conversation_id"), "id,user_id")
+                if not conversation or conversation["user_id"] != user_id:
+                    connection.send({"type": "error", "message": "Conversation not found"})
+                    continue
+                hub.subscribe(connection, conversation["id"])
+                connection.send({"type": "subscribed", "conversation_id": conversation["id"]})
                 continue
 
-            conversation_id = data.get("conversation_id")
-            content = data.get("content")
-            files = data.get("files", [])
-
-            # 대화 ID 없으면 새로 생성
-            if not conversation_id:
-                conversation = await create_conversation(user_id, "New Chat")
-                conversation_id = conversation["id"]
-                await websocket.send_json({
-                    "type": "conversation_created",
-                    "conversation_id": conversation_id
-                })
-
-            # 사용자 메시지 저장
-            await save_message(conversation_id, "user", content)
+            if data.get("type") == "resume":
+                turn_id = data.get("turn_id")
+                turn = replay_buffer.get_turn(turn_id) if turn_id else None
+                if turn is None or turn.user_id != user_id:
+                    connection.send({"type": "error", "turn_id": turn_id, "message": "Turn expired"})
+                    continue
+                task = asyncio.create_task(
+                    _resume_turn(connection, turn_id, int(data.get("last_seq") or 0))
+                )
+                resumes.add(task)
+                task.add_done_callback(resumes.discard)
+                continue
 
-            # Claude CLI 호출 및 스트리밍 응답
-            full_response = ""
-            async for chunk in claude_service.chat(content, files):
-                # 실시간으로 클라이언트에 전송
-                await websocket.send_json({
-                    "type": "stream",
-                    "content": chunk
-                })
-                full_response += chunk
+            if data.get("type") == "cancel":
+                targets = [data["turn_id"]] if data.get("turn_id") else list(turns)
+                for turn_id in targets:
+                    turn = replay_buffer.get_turn(turn_id)
+                    if turn is not None and turn.user_id == user_id:
+                        _cancel_turn(turn_id)
+                continue
 
-            # AI 응답 저장
-            message = await save_message(conversation_id, "assistant", full_response)
+            if data.get("type") != "message":
+                continue
 
-            # 완료 신호
-            await websocket.send_json({
-                "type": "done",
-                "message_id": message["id"] if message else None,
-                "content": full_response
-            })
+            # 대화 id 는 _ws_turn 이 소유를 확인한 뒤 턴에 기록
+            turn_id = replay_buffer.start_turn(user_id)
+            turns.add(turn_id)
+            task = _spawn_turn(turn_id, _ws_turn(connection, user_id, turn_id, data, turn_lock))
+            task.add_done_callback(lambda _, turn_id=turn_id: turns.discard(turn_id))
 
     except WebSocketDisconnect:
-        print(f"Client disconnected: {user_id}")
+        logger.info("Client disconnected", extra={"user_id": user_id})
     except Exception as e:
-        print(f"WebSocket error: {e}")
-        await websocket.send_json({
+        logger.error("WebSocket error", extra={"user_id": user_id}, exc_info=True)
+        connection.send({
             "type": "error",
             "message": str(e)
         })
+        await connection.close()
         await websocket.close()
+    finally:
+        for task in list(resumes):
+            task.cancel()
+        await hub.unregister(connection)
+        for turn_id in list(turns):
+            _watch_abandoned(turn_id)
 
 
 @router.post("/send")
@@ -135,71 +508,152 @@ async def send_message_http(
     HTTP POST 방식 메시지 전송 (WebSocket 대안)
     스트리밍은 지원하지 않음
     """
-    # 사용자 메시지 저장
-    await save_message(conversation_id, "user", content)
+    # 이전 대화 컨텍스트 (내 대화인지 함께 확인)
+    history = await _owned_history(conversation_id, user["id"])
+    if history is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    # 사용자 메시지 저장 (write-behind)
+    message_writer.enqueue(conversation_id, "user", content, files=files, user_id=user["id"])
 
     # Claude CLI 호출
-    full_response = ""
-    async for chunk in claude_service.chat(content, files):
-        full_response += chunk
+    parts: list[str] = []
+    async for chunk in claude_service.chat(content, files, history, user_id=user["id"]):
+        parts.append(chunk)
+    full_response = "".join(parts)
 
     # AI 응답 저장
-    message = await save_message(conversation_id, "assistant", full_response)
+    message = message_writer.enqueue(conversation_id, "assistant", full_response)
 
     return {
-        "message_id": message["id"] if message else None,
+        "message_id": message["id"],
         "content": full_response
     }
 
 
 @router.post("/stream")
-async def stream_chat(request: ChatRequest):
+async def stream_chat(request: ChatRequest, user: dict = Depends(get_current_user)):
     """
     HTTP POST 스트리밍 방식 채팅
 
     배포 환경에서 WebSocket보다 안정적
+
+    응답 헤더 X-Turn-Id 로 턴 ID 를 알려준다. 생성은 응답 연결과 별개로
+    진행되므로, 도중에 끊기면 GET /stream/{turn_id}?offset=받은 바이트 수
+    로 나머지를 이어 받을 수 있다. STREAM_ABANDON_GRACE 초 안에 이어 받지
+    않으면 업스트림 호출을 취소하고 받은 데까지를 truncated 로 저장한다.
     """
+    user_id = user["id"]
+    turn_id = replay_buffer.start_turn(user_id, request.conversation_id)
+
     async def generate():
+        parts: list[str] = []
+        conversation_id = request.conversation_id
+        timer = _TurnTimer("http")
         try:
             # 대화 ID 없으면 새로 생성
-            conversation_id = request.conversation_id
             if not conversation_id:
-                # 프로필이 없으면 먼저 생성
-                from database import get_supabase_client
-                supabase = get_supabase_client()
-
-                # 프로필 확인 및 생성
-                profile_result = supabase.table("profiles").select("*").eq("id", request.user_id).execute()
-                if not profile_result.data:
-                    # 프로필 생성
-                    supabase.table("profiles").insert({
-                        "id": request.user_id,
-                        "display_name": f"User {request.user_id[:8]}"
-                    }).execute()
-
-                conversation = await create_conversation(request.user_id, "New Chat")
+                # 프로필이 없으면 먼저 생성 (캐시 적중 시 DB 호출 없음, 미스면 upsert 한 번)
+                await profile_cache.ensure(user_id)
+
+                conversation = await create_conversation(user_id, "New Chat")
                 if not conversation:
+                    # 캐시가 오래돼 프로필이 없을 수 있음 - 다음 요청에서 다시 확인
+                    profile_cache.invalidate(user_id)
                     yield "⚠️ 대화를 생성할 수 없습니다. 잠시 후 다시 시도해주세요."
                     return
                 conversation_id = conversation["id"]
 
-            # 사용자 메시지 저장 (실패해도 계속 진행)
-            await save_message(conversation_id, "user", request.message)
+            # 이전 대화 컨텍스트 (새 대화면 비어 있음)
+            history = []
+            if request.conversation_id:
+                history = await _owned_history(conversation_id, user_id)
+                if history is None:
+                    conversation_id = None  # 남의 대화에 부분 응답을 저장하지 않음
+                    yield "⚠️ 대화를 찾을 수 없습니다."
+                    return
 
-            # Claude API 호출 및 스트리밍
-            full_response = ""
-            async for chunk in claude_service.chat(request.message, request.files):
-                full_response += chunk
+            # 사용자 메시지 저장 (write-behind, 실패해도 계속 진행)
+            message_writer.enqueue(
+                conversation_id, "user", request.message, files=request.files, user_id=user_id
+            )
+
+            # Claude API 호출 및 스트리밍 (WebSocket 과 같은 병합 정책)
+            async for chunk in _coalesced(claude_service.chat(
+                request.message, request.files, history, user_id=user_id
+            )):
+                timer.chunk()
+                parts.append(chunk)
                 yield chunk
+            full_response = "".join(parts)
 
             # AI 응답 저장 (실패해도 무시)
             if conversation_id:
-                await save_message(conversation_id, "assistant", full_response)
-
+                message_writer.enqueue(conversation_id, "assistant", full_response)
+            timer.finish("completed")
+
+        except asyncio.CancelledError:
+            # 취소 / 연결 끊김 - 받은 데까지 저장
+            timer.finish("cancelled")
+            _save_partial(conversation_id, parts)
+            raise
         except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            print(f"Stream error: {error_detail}")
+            timer.finish("error")
+            logger.error("Stream error", extra={"turn_id": turn_id}, exc_info=True)
             yield f"\n⚠️ Error: {str(e)}"
 
-    return StreamingResponse(generate(), media_type="text/plain")
+    async def produce():
+        try:
+            async with aclosing(generate()) as chunks:
+                async for chunk in chunks:
+                    replay_buffer.append(turn_id, chunk)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            replay_buffer.finish(turn_id)
+
+    _spawn_turn(turn_id, produce())
+    return StreamingResponse(
+        _follow_text(turn_id),
+        media_type="text/plain",
+        headers={"X-Turn-Id": turn_id}
+    )
+
+
+@router.get("/stream/{turn_id}")
+async def resume_stream(
+    turn_id: str,
+    offset: int = 0,
+    user: dict = Depends(get_current_user)
+):
+    """
+    끊긴 /stream 응답 이어 받기 (턴을 시작한 사용자만)
+
+    Args:
+        turn_id: /stream 응답의 X-Turn-Id
+        offset: 이미 받은 본문 바이트 수 (UTF-8)
+    """
+    turn = replay_buffer.get_turn(turn_id)
+    if turn is None or turn.user_id != user["id"]:
+        raise HTTPException(status_code=404, detail="Turn not found or expired")
+    return StreamingResponse(
+        _follow_text(turn_id, offset),
+        media_type="text/plain",
+        headers={"X-Turn-Id": turn_id}
+    )
+
+
+@router.post("/stream/{turn_id}/cancel")
+async def cancel_stream(
+    turn_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """
+    진행 중인 /stream 응답 중단 (턴을 시작한 사용자만)
+
+    받은 데까지는 truncated 응답으로 저장된다.
+    """
+    turn = replay_buffer.get_turn(turn_id)
+    if turn is None or turn.user_id != user["id"]:
+        raise HTTPException(status_code=404, detail="Turn not found or expired")
+    return {"turn_id": turn_id, "cancelled": _cancel_turn(turn_id)}
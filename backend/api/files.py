@@ -0,0 +1,51 @@
+"""파일 업로드 API"""
+from fastapi import APIRouter, Depends, HTTPException, Header, Query, Request
+from models import FileUploadResult
+from services import get_storage_service, FileTooLargeError, FileTypeNotAllowedError
+from api.auth import get_current_user
+from config import get_settings
+from metrics import UPLOAD_SIZE
+
+router = APIRouter()
+settings = get_settings()
+
+
+@router.post("/upload", response_model=FileUploadResult)
+async def upload_file(
+    request: Request,
+    file_name: str = Query(..., min_length=1, max_length=255),
+    content_type: str = Header(...),
+    content_length: int | None = Header(None),
+    user: dict = Depends(get_current_user)
+):
+    """
+    파일 업로드 (요청 바디 = 파일 원본, 스트리밍 처리)
+
+    - Content-Type 헤더: 파일 MIME 타입
+    - file_name 쿼리: 원본 파일명
+
+    바디 전체를 메모리에 올리지 않고 청크 단위로 처리하며, 크기 제한을
+    넘는 순간 413 으로 중단한다. 같은 내용을 이미 올렸다면 Storage 업로드는
+    생략된다 (deduplicated=true).
+    """
+    mime_type = content_type.split(";")[0].strip().lower()
+    max_size = settings.max_file_size_mb * 1024 * 1024
+    if content_length is not None and content_length > max_size:
+        raise HTTPException(status_code=413, detail=f"File too large (max {max_size} bytes)")
+
+    try:
+        result = await get_storage_service().upload_stream(
+            request.stream(),
+            file_name,
+            mime_type,
+            user["id"]
+        )
+    except FileTypeNotAllowedError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    if not result:
+        raise HTTPException(status_code=500, detail="Failed to upload file")
+    UPLOAD_SIZE.observe(result["file_size"])
+    return result
@@ -1,21 +1,210 @@
 """대화 히스토리 API"""
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import html
+import re
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator, AsyncIterator
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from database import (
     get_user_conversations,
+    get_conversation,
     get_conversation_messages,
-    create_conversation
+    get_deletion_job,
+    get_export_conversations,
+    get_export_messages,
+    create_conversation,
+    save_conversations,
+    save_messages,
+    search_messages,
+    encode_cursor,
+    decode_cursor,
+    RowsRejectedError,
+    CONVERSATION_LIST_COLUMNS
 )
-from models import Conversation, ConversationCreate, Message
+from models import (
+    Conversation,
+    ConversationCreate,
+    ConversationPage,
+    MessagePage,
+    SearchPage,
+    ConversationBulkDelete,
+    DeletionJob,
+    ImportResult
+)
+from services import get_deletion_service
+from config import get_settings
 from api.auth import get_current_user
+from log import get_logger
+from serialization import dumps, loads, trusted_response
 
 router = APIRouter()
+logger = get_logger(__name__)
+settings = get_settings()
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# 검색 결과
+DEFAULT_SEARCH_SIZE = 20
+MAX_SEARCH_SIZE = 50
+_SNIPPET_CHARS = 160  # 발췌 길이
+_SNIPPET_LEAD = 40  # 첫 일치 앞에 남길 글자 수
+
+# 내보내기 / 가져오기 (NDJSON)
+_EXPORT_CONVERSATION_PAGE = 100  # 한 번에 읽을 대화 수
+_EXPORT_MESSAGE_PAGE = 500  # 한 번에 읽을 메시지 수 (= 응답 청크 하나)
+_IMPORT_BATCH_SIZE = 500  # 가져오기 INSERT 묶음 크기 (대화 + 메시지 행)
+_IMPORT_MAX_LINE = 1024 * 1024  # 줄 하나 최대 바이트
+_IMPORT_MAX_ERRORS = 20  # 응답에 남길 건너뛴 줄 사유 수
+_IMPORT_ROLES = {"user", "assistant", "system"}
+_GZIP_WBITS = 31  # zlib 에 gzip 헤더 / 트레일러 사용
+
+
+def _validate_cursors(before: str | None, after: str | None):
+    """커서 형식 확인"""
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    try:
+        for cursor in (before, after):
+            if cursor:
+                decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _page_cursors(
+    rows: list[dict],
+    limit: int,
+    before: str | None,
+    after: str | None,
+    sort_column: str,
+    newest_first: bool
+) -> tuple[list[dict], str | None, str | None]:
+    """
+    limit + 1 개 조회 결과에서 페이지와 양방향 커서 계산
+
+    Returns:
+        (items, next_cursor, prev_cursor)
+    """
+    has_more = len(rows) > limit
+    if has_more:
+        # 커서에서 먼 쪽(after 면 최신 쪽, 아니면 오래된 쪽)을 잘라냄
+        if after:
+            rows = rows[1:] if newest_first else rows[:-1]
+        else:
+            rows = rows[:-1] if newest_first else rows[1:]
+    if not rows:
+        return rows, None, None
+
+    oldest = rows[-1] if newest_first else rows[0]
+    newest = rows[0] if newest_first else rows[-1]
+    has_older = has_more if not after else True
+    has_newer = has_more if after else bool(before)
+    return (
+        rows,
+        encode_cursor(oldest, sort_column) if has_older else None,
+        encode_cursor(newest, sort_column) if has_newer else None
+    )
+
 
+def _search_terms(query: str) -> re.Pattern | None:
+    """하이라이트할 검색어 (websearch 문법의 따옴표 / 제외어 / or 제거)"""
+    terms = {
+        term.strip('"')
+        for term in query.split()
+        if term and not term.startswith("-") and term.lower() != "or"
+    }
+    terms = sorted((term for term in terms if term), key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
 
-@router.get("/conversations", response_model=list[Conversation])
-async def list_conversations(user: dict = Depends(get_current_user)):
-    """사용자의 모든 대화 목록 조회"""
-    conversations = await get_user_conversations(user["id"])
-    return conversations
+
+def _highlight(content: str, pattern: re.Pattern | None) -> str:
+    """첫 일치 주변 발췌 (HTML 이스케이프, 일치 부분은 <mark>)"""
+    first = pattern.search(content) if pattern else None
+    start = max(first.start() - _SNIPPET_LEAD, 0) if first else 0
+    window = content[start:start + _SNIPPET_CHARS]
+
+    parts = ["…"] if start > 0 else []
+    pos = 0
+    for match in pattern.finditer(window) if pattern else ():
+        parts.append(html.escape(window[pos:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        pos = match.end()
+    parts.append(html.escape(window[pos:]))
+    if start + _SNIPPET_CHARS < len(content):
+        parts.append("…")
+    return "".join(parts)
+
+
+@router.get("/search", response_model=SearchPage)
+async def search(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(DEFAULT_SEARCH_SIZE, ge=1, le=MAX_SEARCH_SIZE),
+    cursor: str | None = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    내 대화 메시지 전문 검색 (관련도순)
+
+    토큰 일치(tsvector)와 부분 일치(trigram, 한국어 조사 등)를 함께 찾는다.
+    다음 페이지는 next_cursor 를 cursor= 로 전달.
+    """
+    query = " ".join(q.split())
+    try:
+        rows = await search_messages(user["id"], query, limit + 1, after=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor({"rank": repr(float(last["rank"])), "id": last["id"]}, "rank")
+
+    pattern = _search_terms(query)
+    items = [
+        {
+            "id": row["id"],
+            "conversation_id": row["conversation_id"],
+            "conversation_title": row["conversation_title"],
+            "role": row["role"],
+            "snippet": _highlight(row["content"], pattern),
+            "truncated": row["truncated"],
+            "created_at": row["created_at"],
+            "rank": row["rank"],
+        }
+        for row in rows
+    ]
+    # RPC 반환 컬럼으로 만든 행 → 검증 없이 직렬화
+    return trusted_response({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/conversations", response_model=ConversationPage)
+async def list_conversations(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: str | None = None,
+    after: str | None = None,
+    user: dict = Depends(get_current_user)
+):
+    """사용자의 대화 목록 조회 (최근 업데이트 순, 키셋 페이지네이션)"""
+    _validate_cursors(before, after)
+    rows = await get_user_conversations(
+        user["id"],
+        limit=limit + 1,
+        before=before,
+        after=after,
+        columns=CONVERSATION_LIST_COLUMNS
+    )
+    items, next_cursor, prev_cursor = _page_cursors(
+        rows, limit, before, after, "updated_at", newest_first=True
+    )
+    # CONVERSATION_LIST_COLUMNS 행 그대로 → 검증 없이 직렬화
+    return trusted_response({"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor})
 
 
 @router.post("/conversations", response_model=Conversation)
@@ -30,22 +219,401 @@ async def new_conversation(
     return conversation
 
 
-@router.get("/conversations/{conversation_id}/messages", response_model=list[Message])
+@router.get("/conversations/{conversation_id}/messages", response_model=MessagePage)
 async def get_messages(
     conversation_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    before: str | None = None,
+    after: str | None = None,
     user: dict = Depends(get_current_user)
 ):
-    """특정 대화의 메시지 목록 조회"""
-    messages = await get_conversation_messages(conversation_id)
-    return messages
+    """
+    특정 대화의 메시지 목록 조회 (시간순, 키셋 페이지네이션)
 
+    커서 없이 호출하면 가장 최근 limit 개를 반환한다.
+    """
+    _validate_cursors(before, after)
+    # 소유 확인과 페이지 조회를 동시에 (남의 대화면 결과를 버리고 404)
+    conversation, rows = await asyncio.gather(
+        get_conversation(conversation_id, "id,user_id"),
+        get_conversation_messages(
+            conversation_id,
+            limit=limit + 1,
+            before=before,
+            after=after
+        )
+    )
+    if not conversation or conversation["user_id"] != user["id"]:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    items, next_cursor, prev_cursor = _page_cursors(
+        rows, limit, before, after, "created_at", newest_first=False
+    )
+    # MESSAGE_COLUMNS 행 그대로 → 검증 없이 직렬화
+    return trusted_response({"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor})
 
-@router.delete("/conversations/{conversation_id}")
+
+@router.delete("/conversations/{conversation_id}", status_code=202)
 async def delete_conversation(
     conversation_id: str,
     user: dict = Depends(get_current_user)
 ):
-    """대화 삭제"""
-    # TODO: Supabase에서 대화 삭제
-    # CASCADE로 메시지도 자동 삭제됨
-    return {"success": True, "conversation_id": conversation_id}
+    """
+    대화 삭제 (바로 반환, 삭제 / 첨부 파일 정리는 백그라운드)
+
+    메시지와 files 행은 CASCADE 로 함께 삭제되고, Storage 객체는 정리 작업이
+    묶어서 지운다. 진행 상황은 GET /deletions/{deletion_id}.
+    """
+    conversation = await get_conversation(conversation_id, "id,user_id")
+    if not conversation or conversation["user_id"] != user["id"]:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    job = await get_deletion_service().delete_conversations(user["id"], [conversation_id])
+    if not job:
+        raise HTTPException(status_code=500, detail="Failed to delete conversation")
+    return {"success": True, "conversation_id": conversation_id, "deletion_id": job["id"]}
+
+
+@router.post("/conversations/bulk-delete", response_model=DeletionJob, status_code=202)
+async def bulk_delete_conversations(
+    data: ConversationBulkDelete,
+    user: dict = Depends(get_current_user)
+):
+    """
+    대화 일괄 삭제 (바로 반환, deletion_batch_size 개씩 백그라운드 삭제)
+
+    없거나 남의 대화 id 는 건너뛴다. (deleted 에 세지 않음)
+    """
+    if len(data.conversation_ids) > settings.deletion_max_conversations:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many conversations (max {settings.deletion_max_conversations})"
+        )
+    job = await get_deletion_service().delete_conversations(user["id"], data.conversation_ids)
+    if not job:
+        raise HTTPException(status_code=500, detail="Failed to start deletion")
+    return job
+
+
+@router.get("/deletions/{job_id}", response_model=DeletionJob)
+async def get_deletion(
+    job_id: str,
+    user: dict = Depends(get_current_user)
+):
+    """삭제 작업 진행 상황"""
+    job = await get_deletion_job(job_id)
+    if not job or job["user_id"] != user["id"]:
+        raise HTTPException(status_code=404, detail="Deletion job not found")
+    return job
+
+
+def _export_cursor(conversation_cursor: str, message_cursor: str | None = None) -> str:
+    """내보내기 재개 커서 - 대화 커서 (+ 그 대화 안의 메시지 커서)"""
+    return f"{conversation_cursor}.{message_cursor}" if message_cursor else conversation_cursor
+
+
+def _parse_export_cursor(cursor: str | None) -> tuple[str | None, str | None]:
+    """재개 커서 해석 → (대화 커서, 메시지 커서) (잘못된 커서면 ValueError)"""
+    if not cursor:
+        return None, None
+    conversation_cursor, _, message_cursor = cursor.partition(".")
+    decode_cursor(conversation_cursor)
+    if message_cursor:
+        decode_cursor(message_cursor)
+    return conversation_cursor, message_cursor or None
+
+
+def _ndjson(records: list[dict]) -> bytes:
+    return "".join(dumps(record) + "\n" for record in records).encode()
+
+
+async def _export_conversation(
+    conversation_id: str,
+    conversation_cursor: str,
+    message_cursor: str | None,
+    counts: dict
+) -> AsyncGenerator[bytes, None]:
+    """대화 하나의 메시지를 페이지 단위로 (페이지마다 재개 지점 기록)"""
+    while True:
+        rows = await get_export_messages(conversation_id, message_cursor, _EXPORT_MESSAGE_PAGE)
+        if not rows:
+            break
+        counts["messages"] += len(rows)
+        message_cursor = encode_cursor(rows[-1], "created_at")
+        records = [{"type": "message", **row} for row in rows]
+        if len(rows) == _EXPORT_MESSAGE_PAGE:
+            records.append({"type": "checkpoint", "cursor": _export_cursor(conversation_cursor, message_cursor)})
+        yield _ndjson(records)
+        if len(rows) < _EXPORT_MESSAGE_PAGE:
+            break
+    # 대화 완료 - 여기서 재개하면 다음 대화부터
+    yield _ndjson([{"type": "checkpoint", "cursor": conversation_cursor}])
+
+
+async def _export_records(user_id: str, cursor: str | None) -> AsyncGenerator[bytes, None]:
+    """
+    사용자의 전체 대화를 NDJSON 청크로 (메시지 페이지 하나 = 청크 하나)
+
+    대화 / 메시지 모두 키셋 페이지로 읽어서 메모리에는 한 페이지만 둔다.
+    DB 오류가 나면 마지막 재개 지점을 담은 error 줄로 끝낸다.
+    """
+    conversation_cursor, message_cursor = _parse_export_cursor(cursor)
+    counts = {"conversations": 0, "messages": 0}
+    last_checkpoint = cursor
+    try:
+        if message_cursor:
+            # 중간에 끊긴 대화의 나머지 메시지부터 (대화 줄은 이전 내보내기에 있음)
+            _, conversation_id = decode_cursor(conversation_cursor)
+            async for chunk in _export_conversation(conversation_id, conversation_cursor, message_cursor, counts):
+                yield chunk
+            last_checkpoint = conversation_cursor
+
+        while True:
+            conversations = await get_export_conversations(user_id, conversation_cursor, _EXPORT_CONVERSATION_PAGE)
+            for conversation in conversations:
+                counts["conversations"] += 1
+                conversation_cursor = encode_cursor(conversation, "created_at")
+                yield _ndjson([{"type": "conversation", **conversation}])
+                async for chunk in _export_conversation(conversation["id"], conversation_cursor, None, counts):
+                    yield chunk
+                last_checkpoint = conversation_cursor
+            if len(conversations) < _EXPORT_CONVERSATION_PAGE:
+                break
+    except Exception as e:
+        logger.error("History export failed", extra={"user_id": user_id, "error": str(e)})
+        yield _ndjson([{"type": "error", "message": "Export interrupted", "cursor": last_checkpoint}])
+        return
+    yield _ndjson([{"type": "end", **counts}])
+
+
+async def _gzip(chunks: AsyncIterator[bytes]) -> AsyncGenerator[bytes, None]:
+    """스트리밍 gzip 압축"""
+    compressor = zlib.compressobj(wbits=_GZIP_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_history(
+    compress: bool = Query(False, alias="gzip"),
+    cursor: str | None = None,
+    user: dict = Depends(get_current_user)
+):
+    """
+    내 대화 전체 내보내기 (NDJSON 스트리밍, gzip=true 면 .ndjson.gz)
+
+    줄 형식 (type 필드로 구분):
+    - conversation: 대화 (id, title, created_at, updated_at)
+    - message: 그 대화의 메시지 (시간순)
+    - checkpoint: 여기까지 받았다면 cursor= 로 이어서 내보내기
+    - end: 정상 완료 (conversations / messages 개수)
+    - error: 중단됨 (cursor 로 재개)
+
+    이어 받은 파일은 앞 파일 뒤에 이어 붙여서 가져오기에 사용한다.
+    """
+    try:
+        conversation_cursor, message_cursor = _parse_export_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if message_cursor:
+        # 대화 중간에서 재개 - 커서의 대화가 내 대화인지 확인 (메시지 조회는 대화 id 로만 함)
+        _, conversation_id = decode_cursor(conversation_cursor)
+        conversation = await get_conversation(conversation_id, "id,user_id")
+        if not conversation or conversation["user_id"] != user["id"]:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    body = _export_records(user["id"], cursor)
+    file_name = "msg-export.ndjson"
+    media_type = "application/x-ndjson"
+    if compress:
+        body = _gzip(body)
+        file_name += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+
+
+async def _ndjson_lines(chunks: AsyncIterator[bytes], gzipped: bool) -> AsyncGenerator[tuple[int, bytes], None]:
+    """요청 바디 → (줄 번호, 줄) (압축 해제도 청크 단위, 줄 길이 제한)"""
+    decompressor = zlib.decompressobj(wbits=_GZIP_WBITS) if gzipped else None
+    buffer = b""
+    line_number = 0
+
+    def split(data: bytes):
+        nonlocal buffer
+        *lines, buffer = (buffer + data).split(b"\n")
+        if len(buffer) > _IMPORT_MAX_LINE:
+            raise HTTPException(status_code=413, detail=f"Line too long (max {_IMPORT_MAX_LINE} bytes)")
+        return lines
+
+    try:
+        async for chunk in chunks:
+            # 압축 폭탄 방지 - 한 번에 _IMPORT_MAX_LINE 바이트까지만 풀어서 처리
+            data = chunk if decompressor is None else decompressor.decompress(chunk, _IMPORT_MAX_LINE)
+            while True:
+                for line in split(data):
+                    line_number += 1
+                    yield line_number, line
+                if decompressor is None or not decompressor.unconsumed_tail:
+                    break
+                data = decompressor.decompress(decompressor.unconsumed_tail, _IMPORT_MAX_LINE)
+        if decompressor is not None:
+            for line in split(decompressor.flush()):
+                line_number += 1
+                yield line_number, line
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {e}")
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+
+def _timestamp(value, default: datetime) -> str:
+    """ISO 시각 문자열 확인 (없으면 default, 형식이 틀리면 ValueError)"""
+    if value is None:
+        return default.isoformat()
+    if not isinstance(value, str):
+        raise ValueError("timestamp must be a string")
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.isoformat()
+
+
+class _HistoryImporter:
+    """
+    내보내기 줄을 새 대화 / 메시지 행으로 바꿔 묶음 단위로 저장
+
+    대화는 새 id 로 만들고 (원래 id → 새 id), 메시지는 파일 안에 대화 줄이
+    먼저 나온 것만 가져온다. 대화 행을 항상 그 메시지보다 먼저 저장한다.
+    """
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.conversation_ids: dict[str, str] = {}
+        self.conversations: list[dict] = []
+        self.messages: list[dict] = []
+        self.result = {"conversations": 0, "messages": 0, "skipped": 0, "errors": []}
+        self._clock = datetime.now(timezone.utc)
+
+    def _now(self) -> datetime:
+        # 시각이 없는 행끼리도 순서가 유지되도록 1µs 씩 증가
+        self._clock += timedelta(microseconds=1)
+        return self._clock
+
+    @property
+    def full(self) -> bool:
+        return len(self.conversations) + len(self.messages) >= _IMPORT_BATCH_SIZE
+
+    def _skip(self, line_number: int, reason: str):
+        self.result["skipped"] += 1
+        if len(self.result["errors"]) < _IMPORT_MAX_ERRORS:
+            self.result["errors"].append(f"line {line_number}: {reason}")
+
+    def add(self, line_number: int, line: bytes):
+        """줄 하나 (빈 줄 / checkpoint / end / error 줄은 무시)"""
+        if not line.strip():
+            return
+        try:
+            record = loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("not an object")
+            kind = record.get("type")
+            if kind == "conversation":
+                self._add_conversation(record)
+            elif kind == "message":
+                self._add_message(record)
+            elif kind not in ("checkpoint", "end", "error"):
+                raise ValueError(f"unknown type {kind!r}")
+        except (ValueError, TypeError, KeyError) as e:
+            self._skip(line_number, str(e) or type(e).__name__)
+
+    def _add_conversation(self, record: dict):
+        if not isinstance(record["id"], str):
+            raise ValueError("id must be a string")
+        title = record.get("title") or "New Conversation"
+        if not isinstance(title, str):
+            raise ValueError("title must be a string")
+        created_at = _timestamp(record.get("created_at"), self._now())
+        new_id = str(uuid.uuid4())
+        self.conversations.append({
+            "id": new_id,
+            "user_id": self.user_id,
+            "title": title[:200],
+            "created_at": created_at,
+            "updated_at": _timestamp(record.get("updated_at"), datetime.fromisoformat(created_at))
+        })
+        self.conversation_ids[record["id"]] = new_id
+
+    def _add_message(self, record: dict):
+        conversation_id = self.conversation_ids.get(record["conversation_id"])
+        if conversation_id is None:
+            raise ValueError("conversation line missing before its messages")
+        if record["role"] not in _IMPORT_ROLES:
+            raise ValueError(f"invalid role {record['role']!r}")
+        if not isinstance(record["content"], str):
+            raise ValueError("content must be a string")
+        self.messages.append({
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": record["role"],
+            "content": record["content"],
+            "truncated": bool(record.get("truncated", False)),
+            "created_at": _timestamp(record.get("created_at"), self._now())
+        })
+
+    async def flush(self):
+        """대기 중인 대화 → 메시지 순으로 저장 (실패하면 500, 그때까지 저장된 개수 포함)"""
+        if self.conversations:
+            if not await save_conversations(self.conversations):
+                self._fail()
+            self.result["conversations"] += len(self.conversations)
+            self.conversations = []
+        if self.messages:
+            try:
+                saved = await save_messages(self.messages)
+            except RowsRejectedError:
+                saved = False
+            if not saved:
+                self._fail()
+            self.result["messages"] += len(self.messages)
+            self.messages = []
+
+    def _fail(self):
+        raise HTTPException(
+            status_code=500,
+            detail=(
+                f"Failed to import history (saved {self.result['conversations']} conversations, "
+                f"{self.result['messages']} messages)"
+            )
+        )
+
+
+@router.post("/import", response_model=ImportResult)
+async def import_history(
+    request: Request,
+    user: dict = Depends(get_current_user)
+):
+    """
+    내보내기 파일 가져오기 (요청 바디 = NDJSON, 스트리밍 처리)
+
+    gzip 파일이면 Content-Type: application/gzip 또는 Content-Encoding: gzip.
+    대화는 새 대화로 추가되고, 행은 _IMPORT_BATCH_SIZE 개씩 묶어 INSERT 한다.
+    형식이 틀린 줄은 건너뛰고 사유를 errors 에 남긴다.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    gzipped = (
+        content_type in ("application/gzip", "application/x-gzip")
+        or request.headers.get("content-encoding", "").lower() == "gzip"
+    )
+
+    importer = _HistoryImporter(user["id"])
+    async for line_number, line in _ndjson_lines(request.stream(), gzipped):
+        importer.add(line_number, line)
+        if importer.full:
+            await importer.flush()
+    await importer.flush()
+    return importer.result
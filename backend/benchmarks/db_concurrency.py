@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+DB 호출 중 스트리밍 지연 벤치마크
+
+느린 PostgREST 응답(동기 블로킹)을 흉내내는 가짜 클라이언트를 끼운 뒤,
+토큰 스트림 N개와 DB 호출 M개를 동시에 돌려 스트림의 틱 간격을 측정한다.
+
+- blocking: 기존 방식 (async 함수 안에서 동기 호출)
+- executor: database.run_db 를 통한 스레드 풀 실행
+
+사용법:
+    cd backend
+    python benchmarks/db_concurrency.py --streams 20 --db-calls 50 --db-latency-ms 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 설정 로딩에 필요한 더미 환경변수 (실제 네트워크 호출 없음)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+import database  # noqa: E402
+
+
+class _SlowResult:
+    def __init__(self):
+        self.data = [{"id": "00000000-0000-0000-0000-000000000000"}]
+
+
+class _SlowQuery:
+    """PostgREST 쿼리 빌더 흉내 - execute()가 latency 만큼 스레드를 블로킹"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        time.sleep(self.latency)
+        return _SlowResult()
+
+
+class _SlowClient:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def table(self, name):
+        return _SlowQuery(self.latency)
+
+
+async def _stream(tokens: int, interval: float, gaps: list[float]):
+    """토큰 스트림 흉내 - interval 마다 한 토큰, 실제 간격을 기록"""
+    last = time.perf_counter()
+    for _ in range(tokens):
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+async def _blocking_call(client: _SlowClient):
+    # 기존 database.py 와 동일: async 함수 안의 동기 호출
+    return client.table("messages").select("*").execute()
+
+
+async def _run(mode: str, streams: int, db_calls: int, tokens: int, interval: float) -> dict:
+    gaps: list[float] = []
+    client = database._client_cache
+
+    async def db_worker():
+        if mode == "blocking":
+            await _blocking_call(client)
+        else:
+            await database.get_conversation_messages("bench")
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[_stream(tokens, interval, gaps) for _ in range(streams)],
+        *[db_worker() for _ in range(db_calls)]
+    )
+    elapsed = time.perf_counter() - start
+
+    gaps_ms = sorted(g * 1000 for g in gaps)
+    return {
+        "mode": mode,
+        "elapsed_s": round(elapsed, 3),
+        "gap_p50_ms": round(statistics.median(gaps_ms), 2),
+        "gap_p99_ms": round(gaps_ms[int(len(gaps_ms) * 0.99) - 1], 2),
+        "gap_max_ms": round(gaps_ms[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--db-calls", type=int, default=50)
+    parser.add_argument("--db-latency-ms", type=float, default=40.0)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--token-interval-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    database._client_cache = _SlowClient(args.db_latency_ms / 1000)
+    interval = args.token_interval_ms / 1000
+
+    print(f"streams={args.streams} db_calls={args.db_calls} "
+          f"db_latency={args.db_latency_ms}ms token_interval={args.token_interval_ms}ms")
+    for mode in ("blocking", "executor"):
+        result = asyncio.run(_run(mode, args.streams, args.db_calls, args.tokens, interval))
+        print(result)
+    database.shutdown_db_executor()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+대화 삭제 → 첨부 파일 Storage 정리 확인 (외부 서비스 없이)
+
+benchmarks/fakes.py 의 가짜 Anthropic + PostgREST 위에서 앱을 띄우고:
+
+1. 파일 하나를 업로드해 대화 A, B 에서 각각 첨부로 보냄
+   → files 행이 두 메시지에 연결되는지 (files.message_id)
+2. 대화 A 삭제 → B 가 아직 쓰므로 Storage 객체가 남아 있는지
+3. 대화 B 삭제 → 경로가 정리 큐를 거쳐 Storage 에서 지워지는지
+
+하나라도 어긋나면 종료 코드 1.
+
+사용법:
+    cd backend
+    python benchmarks/deletion_check.py
+"""
+import argparse
+import random
+import sys
+import time
+
+import httpx
+
+import load_test as lt
+
+
+def _wait(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def run(app_url: str, postgrest_url: str) -> list[str]:
+    """확인 실패 사유 목록 (비어 있으면 통과)"""
+    failures = []
+    user = lt.seed(postgrest_url, 1, 2, 2, random.Random(0))[0]
+    headers = {"Authorization": f"Bearer {user.token}"}
+
+    upload = httpx.post(
+        f"{app_url}/api/files/upload", params={"file_name": "note.txt"},
+        headers={**headers, "Content-Type": "text/plain"}, content=b"deletion check"
+    )
+    upload.raise_for_status()
+    file_path = upload.json()["file_path"]
+    storage_url = f"{postgrest_url}/storage/v1/object/chat-files/{file_path}"
+
+    for conversation_id in user.conversations:
+        httpx.post(f"{app_url}/api/chat/stream", json={
+            "message": "첨부 확인", "conversation_id": conversation_id,
+            "files": [file_path]
+        }, headers=headers, timeout=60).raise_for_status()
+
+    def linked_rows() -> list[dict]:
+        rows = httpx.get(f"{postgrest_url}/rest/v1/files", params={"file_path": f"eq.{file_path}"}).json()
+        return [row for row in rows if row.get("message_id")]
+
+    if not _wait(lambda: len(linked_rows()) == 2):
+        failures.append(f"files rows linked to messages: {len(linked_rows())} (expected 2)")
+
+    def delete(conversation_id: str) -> dict:
+        response = httpx.delete(f"{app_url}/api/history/conversations/{conversation_id}", headers=headers)
+        response.raise_for_status()
+        job_url = f"{app_url}/api/history/deletions/{response.json()['deletion_id']}"
+        job = {}
+
+        def finished() -> bool:
+            nonlocal job
+            job = httpx.get(job_url, headers=headers).json()
+            return job["status"] in ("done", "failed")
+
+        _wait(finished)
+        return job
+
+    job = delete(user.conversations[0])
+    if job.get("status") != "done" or job.get("files_removed") != 0:
+        failures.append(f"first deletion: {job} (expected done, files_removed=0)")
+    if httpx.get(storage_url).status_code != 200:
+        failures.append("object removed while another conversation still attaches it")
+
+    job = delete(user.conversations[1])
+    if job.get("status") != "done" or job.get("files_removed") != 1:
+        failures.append(f"second deletion: {job} (expected done, files_removed=1)")
+    if httpx.get(storage_url).status_code == 200:
+        failures.append("object still in Storage after its last conversation was deleted")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    lt.fakes.add_arguments(parser)
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE")
+    args = parser.parse_args()
+    args.tokens = min(args.tokens, 20)
+    args.ttft_ms = 0.0
+    # 정리 주기를 기다리지 않도록 삭제 작업 안에서만 정리
+    args.app_env.append("STORAGE_PURGE_INTERVAL=0")
+
+    fakes_process, anthropic_url, postgrest_url = lt.start_fakes(args)
+    app_process = None
+    try:
+        app_process, app_url = lt.start_app(args, 1, anthropic_url, postgrest_url)
+        failures = run(app_url, postgrest_url)
+    finally:
+        if app_process is not None:
+            lt._stop(app_process)
+        lt._stop(fakes_process)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("OK" if not failures else f"{len(failures)} check(s) failed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,758 @@
+#!/usr/bin/env python3
+"""
+벤치마크용 가짜 외부 서비스 (Anthropic Messages API + Supabase PostgREST)
+
+네트워크 없이 백엔드를 부하 테스트하기 위한 로컬 서버. load_test.py 가
+별도 프로세스로 띄운다.
+
+- Anthropic: POST /v1/messages 스트리밍 (TTFT, 토큰 속도, 오류 주입)
+  + Message Batches (/v1/messages/batches - 생성 / 상태 / 결과 JSONL, 처리 지연 설정)
+  + Files API 업로드 (POST /v1/files)
+- PostgREST: /rest/v1/{table} 메모리 테이블
+  (select / 필터 / or·and / order / limit, insert·upsert, patch, delete + cascade, rpc 등록)
+  + Storage 객체 업로드 / 다운로드 / 삭제 (/storage/v1/object/{bucket}/...)
+- 둘 다 GET /_stats 로 처리 통계
+
+사용법 (단독 실행):
+    cd backend
+    python benchmarks/fakes.py --anthropic-port 18080 --postgrest-port 18081 --ttft-ms 300 --token-rate 80
+"""
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+# ============================================
+# Anthropic Messages API
+# ============================================
+
+
+class AnthropicConfig:
+    """가짜 Anthropic 응답 특성"""
+
+    def __init__(
+        self,
+        tokens: int = 200,
+        token_rate: float = 80.0,
+        ttft_ms: float = 300.0,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        stream_error_rate: float = 0.0,
+        batch_delay_ms: float = 2000.0,
+        seed: int | None = None
+    ):
+        self.tokens = tokens  # 응답당 텍스트 델타 수 (델타 하나 = 단어 하나)
+        self.token_rate = token_rate  # 스트림당 초당 델타 수
+        self.ttft_ms = ttft_ms  # 요청 → 첫 델타
+        self.jitter = jitter  # TTFT 에 곱하는 ±비율
+        self.error_rate = error_rate  # 529 overloaded 로 바로 거절할 확률
+        self.stream_error_rate = stream_error_rate  # 스트림 도중 error 이벤트 확률
+        self.batch_delay_ms = batch_delay_ms  # 배치 생성 → ended 까지 (error_rate 만큼 요청이 errored)
+        self.rng = random.Random(seed)
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+def anthropic_app(config: AnthropicConfig) -> Starlette:
+    """POST /v1/messages (stream=true 만 지원) + Message Batches"""
+    stats = {
+        "requests": 0, "completed": 0, "disconnected": 0, "active": 0, "max_active": 0,
+        "errors_injected": 0, "stream_errors_injected": 0, "output_tokens": 0,
+        "batches": 0, "batch_requests": 0, "batch_polls": 0, "batch_result_downloads": 0,
+        "attachment_blocks": 0, "file_uploads": 0,
+    }
+    # batch id → (배치 객체, 결과 줄 목록 - ended 전에는 None)
+    batches: dict[str, tuple[dict, list[str] | None]] = {}
+
+    async def messages(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        # 마지막 user 메시지의 첨부 블록 (image / document)
+        last = (body.get("messages") or [{}])[-1].get("content")
+        if isinstance(last, list):
+            stats["attachment_blocks"] += sum(1 for block in last if block.get("type") in ("image", "document"))
+        rng = config.rng
+        if rng.random() < config.error_rate:
+            stats["errors_injected"] += 1
+            return JSONResponse(
+                {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+                status_code=529
+            )
+        error_at = rng.randrange(config.tokens) if rng.random() < config.stream_error_rate else None
+        ttft = config.ttft_ms / 1000 * (1 + rng.uniform(-config.jitter, config.jitter))
+        input_tokens = len(json.dumps(body.get("messages", []))) // 4
+        return StreamingResponse(_stream(ttft, error_at, input_tokens), media_type="text/event-stream")
+
+    async def _stream(ttft: float, error_at: int | None, input_tokens: int):
+        loop = asyncio.get_running_loop()
+        stats["active"] += 1
+        stats["max_active"] = max(stats["max_active"], stats["active"])
+        finished = False
+        sent = 0
+        try:
+            yield _sse("message_start", {"type": "message_start", "message": {
+                "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+                "content": [], "model": "fake", "stop_reason": None, "stop_sequence": None,
+                "usage": {"input_tokens": input_tokens, "output_tokens": 1}}})
+            yield _sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                               "content_block": {"type": "text", "text": ""}})
+            await asyncio.sleep(ttft)
+            interval = 1 / config.token_rate if config.token_rate > 0 else 0
+            next_at = loop.time()
+            for i in range(config.tokens):
+                if i == error_at:
+                    stats["stream_errors_injected"] += 1
+                    finished = True
+                    yield _sse("error", {"type": "error", "error": {
+                        "type": "overloaded_error", "message": "Overloaded"}})
+                    return
+                yield _sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                   "delta": {"type": "text_delta", "text": f"tok{i} "}})
+                sent += 1
+                next_at += interval
+                await asyncio.sleep(max(next_at - loop.time(), 0))
+            yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield _sse("message_delta", {"type": "message_delta",
+                                         "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                                         "usage": {"output_tokens": config.tokens}})
+            yield _sse("message_stop", {"type": "message_stop"})
+            finished = True
+            stats["completed"] += 1
+        finally:
+            stats["active"] -= 1
+            stats["output_tokens"] += sent
+            if not finished:
+                stats["disconnected"] += 1
+
+    def _batch_result(custom_id: str) -> dict:
+        if config.rng.random() < config.error_rate:
+            return {"custom_id": custom_id, "result": {"type": "errored", "error": {
+                "type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}}}
+        text = "".join(f"tok{i} " for i in range(config.tokens))
+        return {"custom_id": custom_id, "result": {"type": "succeeded", "message": {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "content": [{"type": "text", "text": text}], "model": "fake",
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {"input_tokens": 1, "output_tokens": config.tokens}}}}
+
+    def _finish_batch(batch_id: str, custom_ids: list[str], results_url: str):
+        batch, _ = batches[batch_id]
+        lines = [json.dumps(_batch_result(custom_id), separators=(",", ":")) for custom_id in custom_ids]
+        succeeded = sum('"type":"succeeded"' in line for line in lines)
+        batch.update({
+            "processing_status": "ended",
+            "request_counts": {"processing": 0, "succeeded": succeeded, "errored": len(lines) - succeeded,
+                               "canceled": 0, "expired": 0},
+            "ended_at": datetime.now(timezone.utc).isoformat(),
+            "results_url": results_url,
+        })
+        batches[batch_id] = (batch, lines)
+
+    async def create_batch(request: Request):
+        body = await request.json()
+        requests = body.get("requests") or []
+        custom_ids = [entry["custom_id"] for entry in requests]
+        if not custom_ids or len(set(custom_ids)) != len(custom_ids):
+            return JSONResponse({"type": "error", "error": {
+                "type": "invalid_request_error", "message": "requests must have unique custom_id"}}, status_code=400)
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        batch = {
+            "id": batch_id, "type": "message_batch", "processing_status": "in_progress",
+            "request_counts": {"processing": len(requests), "succeeded": 0, "errored": 0,
+                               "canceled": 0, "expired": 0},
+            "created_at": datetime.now(timezone.utc).isoformat(), "ended_at": None, "results_url": None,
+        }
+        batches[batch_id] = (batch, None)
+        stats["batches"] += 1
+        stats["batch_requests"] += len(requests)
+        results_url = f"{str(request.base_url).rstrip('/')}/v1/messages/batches/{batch_id}/results"
+        asyncio.get_running_loop().call_later(
+            config.batch_delay_ms / 1000, _finish_batch, batch_id, custom_ids, results_url
+        )
+        return JSONResponse(batch)
+
+    async def get_batch(request: Request):
+        entry = batches.get(request.path_params["batch_id"])
+        if entry is None:
+            return JSONResponse({"type": "error", "error": {"type": "not_found_error"}}, status_code=404)
+        stats["batch_polls"] += 1
+        return JSONResponse(entry[0])
+
+    async def batch_results(request: Request):
+        entry = batches.get(request.path_params["batch_id"])
+        if entry is None or entry[1] is None:
+            return JSONResponse({"type": "error", "error": {"type": "not_found_error"}}, status_code=404)
+        stats["batch_result_downloads"] += 1
+        return Response("\n".join(entry[1]) + "\n", media_type="application/binary")
+
+    async def upload_file(request: Request):
+        form = await request.form()
+        upload = form["file"]
+        size = len(await upload.read())
+        stats["file_uploads"] += 1
+        return JSONResponse({
+            "id": f"file_{uuid.uuid4().hex[:24]}", "type": "file", "filename": upload.filename,
+            "mime_type": upload.content_type, "size_bytes": size,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        })
+
+    async def get_stats(request: Request):
+        return JSONResponse(stats)
+
+    return Starlette(routes=[
+        Route("/v1/messages", messages, methods=["POST"]),
+        Route("/v1/messages/batches", create_batch, methods=["POST"]),
+        Route("/v1/messages/batches/{batch_id}", get_batch),
+        Route("/v1/messages/batches/{batch_id}/results", batch_results),
+        Route("/v1/files", upload_file, methods=["POST"]),
+        Route("/_stats", get_stats),
+    ])
+
+
+# ============================================
+# Supabase PostgREST
+# ============================================
+
+# 테이블별 기본값 (id / created_at 은 모든 테이블에 채움)
+_DEFAULTS = {
+    "conversations": {"title": "New Conversation"},
+    "messages": {"truncated": False},
+    "batch_jobs": {"status": "queued", "provider_batch_id": None, "succeeded": 0, "errored": 0,
+                   "canceled": 0, "expired": 0, "error": None, "submitted_at": None, "ended_at": None},
+    "batch_items": {"status": "pending", "error": None},
+    "deletion_jobs": {"status": "deleting", "deleted": 0, "files_removed": 0, "error": None, "finished_at": None},
+}
+_UPDATED_AT_TABLES = {"profiles", "conversations", "batch_jobs", "deletion_jobs"}
+_TIMESTAMP_COLUMNS = {"created_at", "updated_at"}
+# eq 필터를 인덱스로 처리하는 컬럼
+_INDEXED_COLUMNS = ("id", "conversation_id", "user_id", "job_id", "message_id")
+# files 행의 Storage 경로 (원본 + 전처리 파생 파일)
+_FILE_PATH_COLUMNS = ("file_path", "model_image_path", "thumbnail_path", "text_path")
+# ON DELETE CASCADE (부모 테이블 → (자식 테이블, 외래 키 컬럼))
+_CASCADES = {
+    "conversations": (("messages", "conversation_id"),),
+    "messages": (("files", "message_id"),),
+    "batch_jobs": (("batch_items", "job_id"),),
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _normalize_ts(value: Any) -> Any:
+    """타임스탬프를 한 형식으로 (문자열 비교 = 시간 비교)"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _split_top(text: str) -> list[str]:
+    """괄호 / 따옴표 밖의 쉼표로 분리"""
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part for part in parts if part]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _coerce(sample: Any, value: str) -> Any:
+    """URL 문자열 값을 행 값 타입에 맞춤"""
+    if isinstance(sample, bool):
+        return value.lower() == "true"
+    if isinstance(sample, int):
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if isinstance(sample, float):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+_COMPARE: dict[str, Callable[[Any, Any], bool]] = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+}
+
+
+def _condition(column: str, expr: str) -> Callable[[dict], bool]:
+    """column=op.value 필터 하나"""
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[4:]
+    op, _, raw = expr.partition(".")
+
+    if op == "in":
+        values = {_unquote(v) for v in _split_top(raw.strip("()"))}
+        test = lambda row: str(row.get(column)) in values  # noqa: E731
+    elif op == "is":
+        target = {"null": None, "true": True, "false": False}.get(raw.lower(), raw)
+        test = lambda row: row.get(column) is target  # noqa: E731
+    elif op in ("like", "ilike"):
+        pattern = _unquote(raw).replace("*", "%")
+        needle = pattern.strip("%")
+        if op == "ilike":
+            needle = needle.lower()
+            test = lambda row: needle in str(row.get(column) or "").lower()  # noqa: E731
+        else:
+            test = lambda row: needle in str(row.get(column) or "")  # noqa: E731
+    elif op in _COMPARE:
+        compare = _COMPARE[op]
+        value = _unquote(raw)
+        if column in _TIMESTAMP_COLUMNS:
+            value = _normalize_ts(value)
+
+        def test(row, value=value):
+            current = row.get(column)
+            return compare(current, _coerce(current, value))
+    else:
+        raise ValueError(f"unsupported operator: {op}")
+
+    return (lambda row: not test(row)) if negate else test
+
+
+def _logical(kind: str, body: str) -> Callable[[dict], bool]:
+    """or=(a,b) / and(a,b) 식"""
+    tests = []
+    for term in _split_top(body):
+        if term.startswith(("and(", "or(")):
+            inner_kind, _, rest = term.partition("(")
+            tests.append(_logical(inner_kind, rest[:-1]))
+        else:
+            column, _, expr = term.partition(".")
+            tests.append(_condition(column, expr))
+    if kind == "or":
+        return lambda row: any(test(row) for test in tests)
+    return lambda row: all(test(row) for test in tests)
+
+
+class FakePostgREST:
+    """
+    메모리 테이블 기반 PostgREST
+
+    supabase-py(postgrest-py) 가 보내는 요청 형식만 다룬다. RLS 는 없다.
+    rpc(name, handler) 로 /rest/v1/rpc/{name} 함수를 등록할 수 있다.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.tables: dict[str, dict[str, dict]] = defaultdict(dict)
+        self.indexes: dict[str, dict[str, dict[Any, set[str]]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(set))
+        )
+        self.functions: dict[str, Callable[["FakePostgREST", dict], Any]] = {}
+        self.stats = defaultdict(int)
+        self.storage_objects: dict[str, bytes] = {}  # "{bucket}/{path}" → 내용
+        self.storage_objects_removed: list[str] = []
+
+    def rpc(self, name: str, handler: Callable[["FakePostgREST", dict], Any]):
+        """rpc 함수 등록 (handler(db, params) → JSON 결과)"""
+        self.functions[name] = handler
+
+    # --- 저장 ---
+
+    def insert(self, table: str, row: dict, on_conflict: str | None = None) -> dict | None:
+        """행 추가 (on_conflict: None=오류, "ignore", "merge")"""
+        row = {**_DEFAULTS.get(table, {}), **row}
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now())
+        if table in _UPDATED_AT_TABLES:
+            row.setdefault("updated_at", row["created_at"])
+        for column in _TIMESTAMP_COLUMNS & row.keys():
+            row[column] = _normalize_ts(row[column])
+
+        existing = self.tables[table].get(row["id"])
+        if existing is not None:
+            if on_conflict == "ignore":
+                return None
+            if on_conflict != "merge":
+                raise KeyError(row["id"])
+            self._unindex(table, existing)
+            existing.update(row)
+            self._index(table, existing)
+            return existing
+        self.tables[table][row["id"]] = row
+        self._index(table, row)
+        return row
+
+    def missing_parent(self, table: str, rows: list[dict]) -> str | None:
+        """_CASCADES 외래 키가 없는 부모를 가리키는 첫 행 설명 (없으면 None)"""
+        for parent, children in _CASCADES.items():
+            for child, column in children:
+                if child != table:
+                    continue
+                for row in rows:
+                    value = row.get(column)
+                    if value is not None and value not in self.tables[parent]:
+                        return f"Key ({column})=({value}) is not present in table \"{parent}\"."
+        return None
+
+    def delete(self, table: str, rows: list[dict]):
+        """행 삭제 (cascade + files 삭제 트리거 → storage_purge_queue)"""
+        for row in rows:
+            if self.tables[table].pop(row["id"], None) is None:
+                continue
+            self._unindex(table, row)
+            if table == "files":
+                for column in _FILE_PATH_COLUMNS:
+                    if row.get(column):
+                        self.insert("storage_purge_queue", {"file_path": row[column]})
+            for child, column in _CASCADES.get(table, ()):
+                ids = list(self.indexes[child][column].get(row["id"], ()))
+                self.delete(child, [self.tables[child][child_id] for child_id in ids])
+
+    def _index(self, table: str, row: dict):
+        for column in _INDEXED_COLUMNS:
+            if column in row:
+                self.indexes[table][column][row[column]].add(row["id"])
+
+    def _unindex(self, table: str, row: dict):
+        for column in _INDEXED_COLUMNS:
+            if column in row:
+                self.indexes[table][column][row[column]].discard(row["id"])
+
+    # --- 조회 ---
+
+    def query(self, table: str, params: list[tuple[str, str]]) -> list[dict]:
+        """필터 / 정렬 / limit 적용한 행 (select 적용 전)"""
+        tests = []
+        candidates = None
+        order = None
+        limit = offset = None
+        for key, value in params:
+            if key in ("select", "columns", "on_conflict"):
+                continue
+            if key == "order":
+                order = value
+            elif key == "limit":
+                limit = int(value)
+            elif key == "offset":
+                offset = int(value)
+            elif key in ("or", "and"):
+                tests.append(_logical(key, value[1:-1]))
+            else:
+                if candidates is None and key in _INDEXED_COLUMNS and value.startswith("eq."):
+                    ids = self.indexes[table][key].get(_unquote(value[3:]), set())
+                    candidates = [self.tables[table][row_id] for row_id in ids]
+                tests.append(_condition(key, value))
+
+        rows = candidates if candidates is not None else self.tables[table].values()
+        rows = [row for row in rows if all(test(row) for test in tests)]
+        if order:
+            for term in reversed(order.split(",")):
+                column, _, direction = term.partition(".")
+                desc = direction.startswith("desc")
+                rows.sort(key=lambda row: (row.get(column) is None, row.get(column) or ""), reverse=desc)
+        if offset:
+            rows = rows[offset:]
+        if limit is not None:
+            rows = rows[:limit]
+        return rows
+
+    @staticmethod
+    def project(rows: list[dict], select: str | None) -> list[dict]:
+        if not select or select == "*":
+            return [dict(row) for row in rows]
+        columns = [column.strip() for column in select.split(",") if column.strip()]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    # --- HTTP ---
+
+    def app(self) -> Starlette:
+        async def table_route(request: Request):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            table = request.path_params["table"]
+            params = list(request.query_params.multi_items())
+            prefer = request.headers.get("prefer", "")
+            representation = "return=representation" in prefer
+            method = request.method
+
+            if method == "GET":
+                self.stats["select"] += 1
+                rows = self.query(table, params)
+                return JSONResponse(self.project(rows, request.query_params.get("select")))
+
+            if method == "POST":
+                self.stats["insert"] += 1
+                body = await request.json()
+                rows = body if isinstance(body, list) else [body]
+                on_conflict = None
+                if "resolution=ignore-duplicates" in prefer:
+                    on_conflict = "ignore"
+                elif "resolution=merge-duplicates" in prefer:
+                    on_conflict = "merge"
+                # 외래 키 위반이면 문장 전체를 거부 (아무 행도 넣지 않음)
+                missing = self.missing_parent(table, rows)
+                if missing:
+                    return JSONResponse({
+                        "code": "23503", "message": f"insert or update on table \"{table}\" violates foreign key",
+                        "details": missing, "hint": None
+                    }, status_code=409)
+                try:
+                    saved = [self.insert(table, row, on_conflict) for row in rows]
+                except KeyError as e:
+                    return JSONResponse(
+                        {"code": "23505", "message": f"duplicate key {e}", "details": None, "hint": None},
+                        status_code=409
+                    )
+                saved = [row for row in saved if row is not None]
+                if not representation:
+                    return Response(status_code=201)
+                return JSONResponse(self.project(saved, request.query_params.get("select")), status_code=201)
+
+            rows = self.query(table, params)
+            if method == "PATCH":
+                self.stats["update"] += 1
+                changes = await request.json()
+                for row in rows:
+                    self._unindex(table, row)
+                    row.update(changes)
+                    self._index(table, row)
+            else:  # DELETE
+                self.stats["delete"] += 1
+                self.delete(table, rows)
+            if not representation:
+                return Response(status_code=204)
+            return JSONResponse(self.project(rows, request.query_params.get("select")))
+
+        async def rpc_route(request: Request):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            name = request.path_params["name"]
+            handler = self.functions.get(name)
+            if handler is None:
+                return JSONResponse({"code": "PGRST202", "message": f"function {name} not found"}, status_code=404)
+            self.stats["rpc"] += 1
+            params = await request.json() if await request.body() else {}
+            return JSONResponse(handler(self, params))
+
+        async def storage_remove(request: Request):
+            body = await request.json()
+            self.stats["storage_remove"] += 1
+            self.storage_objects_removed.extend(body.get("prefixes", []))
+            for path in body.get("prefixes", []):
+                self.storage_objects.pop(f"{request.path_params['bucket']}/{path}", None)
+            return JSONResponse([{"name": path} for path in body.get("prefixes", [])])
+
+        async def storage_object(request: Request):
+            key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+            if request.method == "GET":
+                self.stats["storage_download"] += 1
+                if key not in self.storage_objects:
+                    return JSONResponse({"statusCode": "404", "error": "not_found",
+                                         "message": "Object not found"}, status_code=400)
+                return Response(self.storage_objects[key], media_type="application/octet-stream")
+            form = await request.form()
+            self.storage_objects[key] = await form["file"].read()
+            self.stats["storage_upload"] += 1
+            return JSONResponse({"Key": key})
+
+        async def get_stats(request: Request):
+            return JSONResponse({
+                **self.stats,
+                "rows": {table: len(rows) for table, rows in self.tables.items()},
+                "storage_objects_removed": len(self.storage_objects_removed)
+            })
+
+        return Starlette(routes=[
+            Route("/storage/v1/object/{bucket}", storage_remove, methods=["DELETE"]),
+            Route("/storage/v1/object/{bucket}/{path:path}", storage_object, methods=["GET", "POST", "PUT"]),
+            Route("/rest/v1/rpc/{name}", rpc_route, methods=["POST"]),
+            Route("/rest/v1/{table}", table_route, methods=["GET", "POST", "PATCH", "DELETE"]),
+            Route("/_stats", get_stats),
+        ])
+
+
+def search_messages_rpc(db: FakePostgREST, params: dict) -> list[dict]:
+    """search_messages RPC 흉내 (부분 일치, rank = 일치한 검색어 비율)"""
+    terms = [term.lower() for term in params["p_query"].split()]
+    conversations = [
+        db.tables["conversations"][conversation_id]
+        for conversation_id in db.indexes["conversations"]["user_id"].get(params["p_user_id"], ())
+    ]
+    after = (params.get("p_after_rank"), params.get("p_after_id"))
+    rows = []
+    for conversation in conversations:
+        for message_id in db.indexes["messages"]["conversation_id"].get(conversation["id"], ()):
+            message = db.tables["messages"][message_id]
+            content = message["content"].lower()
+            matched = sum(term in content for term in terms)
+            if not matched:
+                continue
+            rank = matched / len(terms)
+            if after[0] is not None and (rank, message["id"]) >= after:
+                continue
+            rows.append({
+                "id": message["id"], "conversation_id": conversation["id"],
+                "conversation_title": conversation["title"], "role": message["role"],
+                "content": message["content"], "truncated": message.get("truncated", False),
+                "created_at": message["created_at"], "rank": rank,
+            })
+    rows.sort(key=lambda row: (row["rank"], row["id"]), reverse=True)
+    return rows[:params.get("p_limit", 20)]
+
+
+def create_batch_job_rpc(db: FakePostgREST, params: dict) -> bool:
+    """create_batch_job RPC 흉내 (대화 소유 확인 후 작업 + 항목 저장)"""
+    job, items = params["p_job"], params["p_items"]
+    conversations = db.tables["conversations"]
+    if any(conversations.get(item["conversation_id"], {}).get("user_id") != job["user_id"] for item in items):
+        return False
+    db.insert("batch_jobs", {"id": job["id"], "user_id": job["user_id"], "kind": job["kind"], "total": len(items)})
+    for item in items:
+        db.insert("batch_items", {**item, "job_id": job["id"]})
+    return True
+
+
+def claim_storage_purge_rpc(db: FakePostgREST, params: dict) -> list[dict]:
+    """claim_storage_purge RPC 흉내 (큐 앞에서 꺼내고 아직 쓰이는 경로 표시)"""
+    queue = db.tables["storage_purge_queue"]
+    claimed = [queue[row_id] for row_id in list(queue)[:params.get("p_limit", 100)]]
+    db.delete("storage_purge_queue", claimed)
+    in_use = {
+        row[column] for row in db.tables["files"].values() for column in _FILE_PATH_COLUMNS if row.get(column)
+    }
+    return [{"file_path": row["file_path"], "in_use": row["file_path"] in in_use} for row in claimed]
+
+
+def conversation_file_paths_rpc(db: FakePostgREST, params: dict) -> list[str]:
+    """conversation_file_paths RPC 흉내 (대화 메시지에 연결된 files 행의 경로, 파생 파일 포함)"""
+    paths = set()
+    for conversation_id in params["p_conversation_ids"]:
+        conversation = db.tables["conversations"].get(conversation_id)
+        if conversation is None or conversation["user_id"] != params["p_user_id"]:
+            continue
+        for message_id in db.indexes["messages"]["conversation_id"].get(conversation_id, ()):
+            for file_id in db.indexes["files"]["message_id"].get(message_id, ()):
+                row = db.tables["files"][file_id]
+                paths.update(row[column] for column in _FILE_PATH_COLUMNS if row.get(column))
+    return sorted(paths)
+
+
+def link_message_files_rpc(db: FakePostgREST, params: dict) -> int:
+    """link_message_files RPC 흉내 (미연결 업로드 행 연결, 이미 연결된 경로는 행 복사)"""
+    message_id, paths = params["p_message_id"], set(params["p_paths"])
+    rows = sorted(
+        (row for row in db.tables["files"].values()
+         if row.get("user_id") == params["p_user_id"] and row["file_path"] in paths),
+        key=lambda row: row["created_at"]
+    )
+    done = {row["file_path"] for row in rows if row.get("message_id") == message_id}
+    count = 0
+    for row in rows:
+        if row["file_path"] in done or row.get("message_id") is not None:
+            continue
+        db._unindex("files", row)
+        row["message_id"] = message_id
+        db._index("files", row)
+        done.add(row["file_path"])
+        count += 1
+    for row in rows:
+        if row["file_path"] not in done:
+            copy = {key: value for key, value in row.items() if key not in ("id", "created_at")}
+            db.insert("files", {**copy, "message_id": message_id})
+            done.add(row["file_path"])
+            count += 1
+    return count
+
+
+# ============================================
+# 실행
+# ============================================
+
+
+async def serve(apps: list[tuple[Starlette, int]], host: str = "127.0.0.1"):
+    """여러 가짜 서버를 한 이벤트 루프에서 실행"""
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning", lifespan="off"))
+        for app, port in apps
+    ]
+    await asyncio.gather(*(server.serve() for server in servers))
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """가짜 서비스 설정 인자 (load_test.py 와 공유)"""
+    group = parser.add_argument_group("fake services")
+    group.add_argument("--tokens", type=int, default=200, help="응답당 토큰(델타) 수")
+    group.add_argument("--token-rate", type=float, default=80.0, help="스트림당 초당 토큰")
+    group.add_argument("--ttft-ms", type=float, default=300.0, help="첫 토큰까지 지연")
+    group.add_argument("--ttft-jitter", type=float, default=0.2, help="TTFT ±비율")
+    group.add_argument("--error-rate", type=float, default=0.0, help="529 로 거절할 확률")
+    group.add_argument("--stream-error-rate", type=float, default=0.0, help="스트림 도중 error 이벤트 확률")
+    group.add_argument("--batch-delay-ms", type=float, default=2000.0, help="배치 생성 → ended 까지")
+    group.add_argument("--db-latency-ms", type=float, default=0.0, help="PostgREST 응답 지연")
+    group.add_argument("--seed", type=int, default=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--anthropic-port", type=int, default=18080)
+    parser.add_argument("--postgrest-port", type=int, default=18081)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    config = AnthropicConfig(
+        tokens=args.tokens,
+        token_rate=args.token_rate,
+        ttft_ms=args.ttft_ms,
+        jitter=args.ttft_jitter,
+        error_rate=args.error_rate,
+        stream_error_rate=args.stream_error_rate,
+        batch_delay_ms=args.batch_delay_ms,
+        seed=args.seed
+    )
+    postgrest = FakePostgREST(latency_ms=args.db_latency_ms)
+    postgrest.rpc("search_messages", search_messages_rpc)
+    postgrest.rpc("create_batch_job", create_batch_job_rpc)
+    postgrest.rpc("claim_storage_purge", claim_storage_purge_rpc)
+    postgrest.rpc("link_message_files", link_message_files_rpc)
+    postgrest.rpc("conversation_file_paths", conversation_file_paths_rpc)
+    asyncio.run(serve([
+        (anthropic_app(config), args.anthropic_port),
+        (postgrest.app(), args.postgrest_port),
+    ]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+채팅 / 히스토리 API 부하 테스트 (외부 서비스 없이)
+
+benchmarks/fakes.py 의 가짜 Anthropic + PostgREST 를 띄우고, 그 위에서 실제
+앱(uvicorn main:app)을 실행한 뒤 가상 사용자 N명으로 엔드포인트를 호출한다.
+
+- stream: POST /api/chat/stream (TTFT = 첫 본문 청크)
+- ws: /api/chat/ws 사용자당 연결 하나, message → done (TTFT = 첫 stream 프레임)
+- history: GET /api/history/conversations + 첫 대화의 messages 페이지
+
+결과는 JSON (커밋 / 설정 / 시나리오별 TTFT, 지연, 토큰 속도의 p50/p95/p99) 으로
+출력하고, --compare 로 이전 결과와 비교해 기준(--threshold) 이상 나빠진 지표가
+있으면 종료 코드 1 을 돌려준다.
+
+부하 생성기와 가짜 서비스도 각각 프로세스 하나이므로, 워커 수를 늘린 측정에서는
+/_stats 의 max_active 와 이 프로세스의 CPU 사용률을 함께 확인한다.
+
+사용법:
+    cd backend
+    python benchmarks/load_test.py --concurrency 20 --duration 20 --out bench.json
+    python benchmarks/load_test.py --scenarios ws --workers-sweep 1 2 4
+    python benchmarks/load_test.py --compare bench.json --out bench-new.json
+    python benchmarks/load_test.py --app-env STREAM_FLUSH_MS=0 --token-rate 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import websockets
+from jose import jwt
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fakes  # noqa: E402
+
+JWT_SECRET = "load-test-secret"
+SCENARIOS = ("stream", "ws", "history")
+_PROMPTS = ["안녕하세요", "코드 리뷰 부탁해요", "이 함수 설명해줘", "테스트 케이스 만들어줘"]
+
+# --compare 대상 지표 (높을수록 나쁨 / 낮을수록 나쁨)
+_HIGHER_IS_WORSE = ("ttft_ms.p50", "ttft_ms.p95", "latency_ms.p50", "latency_ms.p95", "latency_ms.p99", "error_rate")
+_LOWER_IS_WORSE = ("rps", "tokens_per_sec.p50", "throughput_tokens_per_sec")
+
+
+# ============================================
+# 프로세스 관리
+# ============================================
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"process exited ({process.returncode}): {' '.join(process.args)}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise TimeoutError(f"not ready: {url}")
+
+
+def _stop(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def start_fakes(args) -> tuple[subprocess.Popen, str, str]:
+    """가짜 Anthropic / PostgREST 프로세스 → (프로세스, anthropic URL, postgrest URL)"""
+    anthropic_port, postgrest_port = _free_port(), _free_port()
+    command = [
+        sys.executable, os.path.join(BACKEND_DIR, "benchmarks", "fakes.py"),
+        "--anthropic-port", str(anthropic_port), "--postgrest-port", str(postgrest_port),
+        "--tokens", str(args.tokens), "--token-rate", str(args.token_rate),
+        "--ttft-ms", str(args.ttft_ms), "--ttft-jitter", str(args.ttft_jitter),
+        "--error-rate", str(args.error_rate), "--stream-error-rate", str(args.stream_error_rate),
+        "--batch-delay-ms", str(args.batch_delay_ms), "--db-latency-ms", str(args.db_latency_ms),
+    ]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR)
+    anthropic_url = f"http://127.0.0.1:{anthropic_port}"
+    postgrest_url = f"http://127.0.0.1:{postgrest_port}"
+    _wait_ready(f"{anthropic_url}/_stats", process)
+    _wait_ready(f"{postgrest_url}/_stats", process)
+    return process, anthropic_url, postgrest_url
+
+
+def start_app(args, workers: int, anthropic_url: str, postgrest_url: str) -> tuple[subprocess.Popen, str]:
+    """uvicorn main:app (워커 N개) → (프로세스, 앱 URL)"""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "SUPABASE_URL": postgrest_url,
+        "SUPABASE_ANON_KEY": "bench",
+        "SUPABASE_SERVICE_ROLE_KEY": "bench",
+        "ANTHROPIC_API_KEY": "bench",
+        "ANTHROPIC_BASE_URL": anthropic_url,
+        "JWT_SECRET": JWT_SECRET,
+        "CLAUDE_HTTP2": "false",
+        "CLAUDE_USER_RATE_PER_MIN": "0",
+        "HUB_BACKEND": "memory",
+    }
+    for item in args.app_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+    ]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    _wait_ready(f"{url}/", process, timeout=60.0)
+    return process, url
+
+
+def _git_commit() -> dict:
+    def git(*command):
+        return subprocess.run(
+            ["git", *command], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain"))}
+
+
+# ============================================
+# 시드 데이터
+# ============================================
+
+
+class VirtualUser:
+    """부하를 만드는 사용자 하나 (토큰 + 시드 대화)"""
+
+    def __init__(self, user_id: str, conversations: list[str]):
+        self.user_id = user_id
+        self.conversations = conversations
+        now = datetime.now(timezone.utc)
+        self.token = jwt.encode(
+            {"sub": user_id, "aud": "authenticated", "role": "authenticated",
+             "email": f"{user_id[:8]}@bench.local", "exp": now + timedelta(hours=6)},
+            JWT_SECRET, algorithm="HS256"
+        )
+
+
+def seed(postgrest_url: str, users: int, conversations: int, messages: int, rng: random.Random) -> list[VirtualUser]:
+    """가짜 PostgREST 에 프로필 / 대화 / 메시지 생성"""
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    profiles, conversation_rows, message_rows, result = [], [], [], []
+    for _ in range(users):
+        user_id = str(uuid.uuid4())
+        profiles.append({"id": user_id, "display_name": f"User {user_id[:8]}"})
+        ids = []
+        for c in range(conversations):
+            conversation_id = str(uuid.uuid4())
+            created = start + timedelta(hours=c)
+            ids.append(conversation_id)
+            conversation_rows.append({
+                "id": conversation_id, "user_id": user_id, "title": f"Conversation {c}",
+                "created_at": created.isoformat(),
+                "updated_at": (created + timedelta(minutes=messages)).isoformat(),
+            })
+            for m in range(messages):
+                message_rows.append({
+                    "conversation_id": conversation_id,
+                    "role": "user" if m % 2 == 0 else "assistant",
+                    "content": " ".join(rng.choice(_PROMPTS) for _ in range(rng.randint(2, 30))),
+                    "created_at": (created + timedelta(minutes=m)).isoformat(),
+                })
+        result.append(VirtualUser(user_id, ids))
+
+    with httpx.Client(base_url=f"{postgrest_url}/rest/v1", timeout=60.0) as client:
+        for table, rows in (("profiles", profiles), ("conversations", conversation_rows), ("messages", message_rows)):
+            for i in range(0, len(rows), 5000):
+                client.post(f"/{table}", json=rows[i:i + 5000]).raise_for_status()
+    return result
+
+
+# ============================================
+# 시나리오
+# ============================================
+
+
+class Sample:
+    __slots__ = ("started", "latency", "ttft", "tokens", "error")
+
+    def __init__(self, started: float, latency: float, ttft: float | None = None,
+                 tokens: int = 0, error: str | None = None):
+        self.started = started
+        self.latency = latency
+        self.ttft = ttft
+        self.tokens = tokens
+        self.error = error
+
+
+def _count_tokens(text: str) -> int:
+    # 가짜 서버 토큰은 "tok{i} " 형식 → 공백 수 = 토큰 수
+    return text.count(" ")
+
+
+async def _stream_user(client: httpx.AsyncClient, user: VirtualUser, deadline: float,
+                       rng: random.Random, samples: list[Sample]):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        ttft = None
+        parts = []
+        error = None
+        try:
+            async with client.stream("POST", "/api/chat/stream", json={
+                "message": rng.choice(_PROMPTS),
+                "conversation_id": rng.choice(user.conversations),
+            }, headers={"Authorization": f"Bearer {user.token}"}) as response:
+                if response.status_code != 200:
+                    error = f"http {response.status_code}"
+                async for chunk in response.aiter_text():
+                    if ttft is None and chunk:
+                        ttft = time.perf_counter() - started
+                    parts.append(chunk)
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        text = "".join(parts)
+        if error is None and "⚠️" in text:
+            error = "stream error"
+        samples.append(Sample(started, time.perf_counter() - started, ttft, _count_tokens(text), error))
+
+
+async def _ws_user(url: str, user: VirtualUser, deadline: float,
+                   rng: random.Random, samples: list[Sample]):
+    try:
+        websocket = await websockets.connect(f"{url}/api/chat/ws?token={user.token}", max_size=None)
+    except (OSError, websockets.WebSocketException) as e:
+        samples.append(Sample(time.perf_counter(), 0.0, error=f"connect: {type(e).__name__}"))
+        return
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            ttft = None
+            tokens = 0
+            error = None
+            await websocket.send(json.dumps({
+                "type": "message",
+                "content": rng.choice(_PROMPTS),
+                "conversation_id": rng.choice(user.conversations),
+            }))
+            try:
+                while True:
+                    frame = json.loads(await websocket.recv())
+                    kind = frame.get("type")
+                    if kind == "stream":
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        tokens += _count_tokens(frame["content"])
+                        if "⚠️" in frame["content"]:
+                            error = "stream error"
+                    elif kind == "done":
+                        break
+                    elif kind == "error":
+                        error = frame.get("message") or "error"
+                        break
+            except websockets.WebSocketException as e:
+                samples.append(Sample(started, time.perf_counter() - started, ttft, tokens, type(e).__name__))
+                return
+            samples.append(Sample(started, time.perf_counter() - started, ttft, tokens, error))
+    finally:
+        await websocket.close()
+
+
+async def _history_user(client: httpx.AsyncClient, user: VirtualUser, deadline: float,
+                        rng: random.Random, samples: list[Sample]):
+    headers = {"Authorization": f"Bearer {user.token}"}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        error = None
+        try:
+            response = await client.get("/api/history/conversations", params={"limit": 20}, headers=headers)
+            if response.status_code != 200:
+                error = f"http {response.status_code}"
+            else:
+                items = response.json()["items"]
+                conversation_id = items[0]["id"] if items else rng.choice(user.conversations)
+                samples.append(Sample(started, time.perf_counter() - started))
+                started = time.perf_counter()
+                response = await client.get(
+                    f"/api/history/conversations/{conversation_id}/messages",
+                    params={"limit": 50}, headers=headers
+                )
+                if response.status_code != 200:
+                    error = f"http {response.status_code}"
+        except httpx.HTTPError as e:
+            error = type(e).__name__
+        samples.append(Sample(started, time.perf_counter() - started, error=error))
+
+
+async def run_scenario(name: str, url: str, users: list[VirtualUser], args) -> dict:
+    """가상 사용자 concurrency 명이 duration 동안 반복 호출 (warmup 구간은 집계 제외)"""
+    rng = random.Random(args.seed)
+    samples: list[Sample] = []
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+    active = [users[i % len(users)] for i in range(args.concurrency)]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        if name == "stream":
+            tasks = [_stream_user(client, user, deadline, rng, samples) for user in active]
+        elif name == "ws":
+            ws_url = url.replace("http://", "ws://", 1)
+            tasks = [_ws_user(ws_url, user, deadline, rng, samples) for user in active]
+        else:
+            tasks = [_history_user(client, user, deadline, rng, samples) for user in active]
+        await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - measure_from
+
+    measured = [sample for sample in samples if sample.started >= measure_from]
+    return summarize(measured, elapsed, streaming=name != "history")
+
+
+# ============================================
+# 집계 / 비교
+# ============================================
+
+
+def percentiles(values: list[float], scale: float = 1.0) -> dict | None:
+    if not values:
+        return None
+    values = sorted(values)
+
+    def at(q: float) -> float:
+        return round(values[min(int(q * len(values)), len(values) - 1)] * scale, 2)
+
+    return {
+        "p50": at(0.50), "p95": at(0.95), "p99": at(0.99),
+        "mean": round(sum(values) / len(values) * scale, 2), "max": round(values[-1] * scale, 2),
+    }
+
+
+def summarize(samples: list[Sample], elapsed: float, streaming: bool) -> dict:
+    ok = [sample for sample in samples if sample.error is None]
+    errors: dict[str, int] = {}
+    for sample in samples:
+        if sample.error is not None:
+            errors[sample.error] = errors.get(sample.error, 0) + 1
+    result = {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(len(samples) and (len(samples) - len(ok)) / len(samples), 4),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(ok) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": percentiles([sample.latency for sample in ok], 1000),
+    }
+    if streaming:
+        result["ttft_ms"] = percentiles([sample.ttft for sample in ok if sample.ttft is not None], 1000)
+        # 스트림당 생성 속도 (첫 토큰 이후 구간)
+        result["tokens_per_sec"] = percentiles([
+            sample.tokens / (sample.latency - sample.ttft)
+            for sample in ok
+            if sample.ttft is not None and sample.latency > sample.ttft and sample.tokens > 1
+        ])
+        result["throughput_tokens_per_sec"] = round(sum(sample.tokens for sample in ok) / elapsed, 1) if elapsed > 0 else 0.0
+    return result
+
+
+def _metric(result: dict, path: str):
+    value = result
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[dict]:
+    """같은 워커 수 / 시나리오끼리 지표 비교 → 기준 이상 나빠진 항목"""
+    baseline_runs = {run["workers"]: run for run in baseline.get("runs", [])}
+    regressions = []
+    for run in current["runs"]:
+        before_run = baseline_runs.get(run["workers"])
+        if before_run is None:
+            continue
+        for scenario, result in run["scenarios"].items():
+            before = before_run["scenarios"].get(scenario)
+            if before is None:
+                continue
+            for path in _HIGHER_IS_WORSE + _LOWER_IS_WORSE:
+                old, new = _metric(before, path), _metric(result, path)
+                if old is None or new is None:
+                    continue
+                if path == "error_rate":
+                    worse = new - old > threshold
+                    change = new - old
+                elif old == 0:
+                    continue
+                else:
+                    change = (new - old) / old
+                    worse = change > threshold if path in _HIGHER_IS_WORSE else -change > threshold
+                if worse:
+                    regressions.append({
+                        "workers": run["workers"], "scenario": scenario, "metric": path,
+                        "baseline": old, "current": new, "change": round(change, 4),
+                    })
+    return regressions
+
+
+# ============================================
+# 실행
+# ============================================
+
+
+def _fake_stats(anthropic_url: str, postgrest_url: str) -> dict:
+    return {
+        "anthropic": httpx.get(f"{anthropic_url}/_stats").json(),
+        "postgrest": httpx.get(f"{postgrest_url}/_stats").json(),
+    }
+
+
+def _stats_delta(before: dict, after: dict) -> dict:
+    """가짜 서비스 누적 카운터 → 이번 실행분 (active / max_active / rows 는 그대로)"""
+    return {
+        service: {
+            key: value - before[service].get(key, 0)
+            if isinstance(value, int) and key not in ("active", "max_active") else value
+            for key, value in counters.items()
+        }
+        for service, counters in after.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20, help="동시 가상 사용자 수")
+    parser.add_argument("--duration", type=float, default=15.0, help="시나리오별 측정 시간 (초)")
+    parser.add_argument("--warmup", type=float, default=2.0, help="집계에서 뺄 시작 구간 (초)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="요청 타임아웃 (초)")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    parser.add_argument("--workers-sweep", type=int, nargs="+", help="워커 수별로 반복 실행 (예: 1 2 4)")
+    parser.add_argument("--users", type=int, help="시드 사용자 수 (기본: concurrency)")
+    parser.add_argument("--seed-conversations", type=int, default=5, help="사용자당 대화 수")
+    parser.add_argument("--seed-messages", type=int, default=40, help="대화당 메시지 수")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE", help="앱 환경변수")
+    parser.add_argument("--out", help="결과 JSON 파일")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="회귀로 볼 변화율 (error_rate 는 절대값)")
+    fakes.add_arguments(parser)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    sweep = args.workers_sweep or [args.workers]
+    report = {
+        "meta": {
+            **_git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("out", "compare")},
+        },
+        "runs": [],
+    }
+
+    fake_process, anthropic_url, postgrest_url = start_fakes(args)
+    try:
+        users = seed(postgrest_url, args.users or args.concurrency,
+                     args.seed_conversations, args.seed_messages, rng)
+        for workers in sweep:
+            app_process, url = start_app(args, workers, anthropic_url, postgrest_url)
+            stats_before = _fake_stats(anthropic_url, postgrest_url)
+            try:
+                run = {"workers": workers, "scenarios": {}}
+                for name in args.scenarios:
+                    result = asyncio.run(run_scenario(name, url, users, args))
+                    run["scenarios"][name] = result
+                    print(json.dumps({"workers": workers, "scenario": name, **result}, ensure_ascii=False),
+                          file=sys.stderr)
+                run["fakes"] = _stats_delta(stats_before, _fake_stats(anthropic_url, postgrest_url))
+                report["runs"].append(run)
+            finally:
+                _stop(app_process)
+    finally:
+        _stop(fake_process)
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        report["compare"] = {
+            "baseline": baseline.get("meta", {}).get("commit"),
+            "threshold": args.threshold,
+            "regressions": compare(baseline, report, args.threshold),
+        }
+        exit_code = 1 if report["compare"]["regressions"] else 0
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
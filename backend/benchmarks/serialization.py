@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+히스토리 응답 / WebSocket 프레임 직렬화 벤치마크
+
+PostgREST 형식의 가짜 메시지 행 N개를 방식별 엔드포인트로 돌려주고
+요청당 CPU 시간을 잰다. (실제 DB / 네트워크 호출 없음)
+
+- validate: 기존 방식 (response_model 검증 + jsonable_encoder + 표준 json)
+- construct: model_construct 로 만든 모델 + response_model + orjson 응답
+- trusted: serialization.trusted_response (검증 없이 행을 바로 orjson 직렬화)
+
+WebSocket 은 stream 프레임 N개를 send_json(표준 json) 과
+serialization.send_json 으로 보낼 때의 직렬화 시간을 비교한다.
+
+사용법:
+    cd backend
+    python benchmarks/serialization.py --messages 1000 10000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 설정 로딩에 필요한 더미 환경변수 (실제 네트워크 호출 없음)
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_ANON_KEY", "bench")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench")
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+
+from fastapi import APIRouter, FastAPI  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import serialization  # noqa: E402
+from models import Message, MessagePage  # noqa: E402
+
+_TEXT = "안녕하세요! 요청하신 내용을 정리했습니다. The quick brown fox jumps over the lazy dog. "
+
+
+def fake_rows(count: int, seed: int = 7) -> list[dict]:
+    """PostgREST 가 돌려주는 형식의 메시지 행 (MESSAGE_COLUMNS)"""
+    rng = random.Random(seed)
+    conversation_id = str(uuid.uuid4())
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "conversation_id": conversation_id,
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": _TEXT * rng.randint(1, 8),
+            "truncated": False,
+            "created_at": (start + timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def _bench_app(rows: list[dict]) -> FastAPI:
+    """방식별 엔드포인트 (페이지 계산은 생략, 직렬화 경로만 비교)"""
+    router = APIRouter()
+
+    @router.get("/validate", response_model=MessagePage, response_class=JSONResponse)
+    async def validate():
+        return {"items": rows, "next_cursor": None, "prev_cursor": None}
+
+    @router.get("/construct", response_model=MessagePage, response_class=serialization.FastJSONResponse)
+    async def construct():
+        items = [Message.model_construct(**row) for row in rows]
+        return MessagePage.model_construct(items=items, next_cursor=None, prev_cursor=None)
+
+    @router.get("/trusted", response_model=MessagePage)
+    async def trusted():
+        return serialization.trusted_response(
+            {"items": rows, "next_cursor": None, "prev_cursor": None}
+        )
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+def _bench_http(rows: list[dict], repeat: int) -> list[dict]:
+    import warnings
+    warnings.simplefilter("ignore")  # construct: 문자열 created_at 직렬화 경고
+
+    client = TestClient(_bench_app(rows))
+    results = []
+    for mode in ("validate", "construct", "trusted"):
+        client.get(f"/{mode}")  # 워밍업
+        cpu = time.process_time()
+        for _ in range(repeat):
+            response = client.get(f"/{mode}")
+        cpu = (time.process_time() - cpu) / repeat
+        assert len(response.json()["items"]) == len(rows)
+        results.append({
+            "mode": mode,
+            "messages": len(rows),
+            "cpu_ms_per_request": round(cpu * 1000, 2),
+            "bytes": len(response.content),
+        })
+    return results
+
+
+class _FakeWebSocket:
+    async def send_text(self, data: str):
+        pass
+
+    async def send_json(self, data, mode: str = "text"):
+        # starlette WebSocket.send_json 과 같은 인코딩
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+
+async def _bench_ws(frames: int) -> list[dict]:
+    websocket = _FakeWebSocket()
+    frame = {"type": "stream", "conversation_id": str(uuid.uuid4()),
+             "turn_id": str(uuid.uuid4()), "seq": 1, "content": _TEXT[:40]}
+    results = []
+    for mode, send in (("send_json", websocket.send_json),
+                       ("serialization", lambda data: serialization.send_json(websocket, data))):
+        cpu = time.process_time()
+        for seq in range(frames):
+            frame["seq"] = seq
+            await send(frame)
+        cpu = time.process_time() - cpu
+        results.append({"mode": f"ws:{mode}", "frames": frames,
+                        "cpu_us_per_frame": round(cpu / frames * 1e6, 2)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=100000)
+    args = parser.parse_args()
+
+    for count in args.messages:
+        rows = fake_rows(count)
+        repeat = max(args.repeat * 1000 // count, 3)
+        for result in _bench_http(rows, repeat):
+            print(result)
+    for result in asyncio.run(_bench_ws(args.frames)):
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Anthropic SSE 파싱 CPU 벤치마크
+
+녹화 형식의 Messages API 스트림을 임의 크기 청크로 잘라 httpx.Response 로
+재생하고, 동시 스트림 N개를 한 이벤트 루프에서 파싱할 때 토큰당 CPU 시간을 잰다.
+
+- lines: 기존 방식 (aiter_lines + 줄마다 json.loads)
+- parser: services.sse_parser.SSEParser (aiter_bytes + 증분 파싱, orjson)
+- parser-json: 같은 파서, 표준 json (orjson 미설치 환경)
+
+사용법:
+    cd backend
+    python benchmarks/sse_parser.py --streams 200 --tokens 400
+    python benchmarks/sse_parser.py --record recorded.sse  # 실제 녹화 스트림 사용
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import sse_parser  # noqa: E402
+from services.sse_parser import SSEParser, TEXT  # noqa: E402
+
+_WORDS = ["안녕하세요", " 오늘", " 날씨는", " 맑고", " the", " quick", " brown", " fox", ",", ".", "\n", " 코드", " `x`"]
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+def record_stream(tokens: int, rng: random.Random) -> bytes:
+    """Messages API 스트림과 같은 형식의 녹화본 생성"""
+    parts = [
+        _sse("message_start", {"type": "message_start", "message": {
+            "id": "msg_bench", "type": "message", "role": "assistant", "content": [],
+            "model": "claude-3-5-sonnet-20241022", "stop_reason": None, "stop_sequence": None,
+            "usage": {"input_tokens": 1200, "output_tokens": 1,
+                      "cache_creation_input_tokens": 0, "cache_read_input_tokens": 1024}}}),
+        _sse("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}}),
+        _sse("ping", {"type": "ping"}),
+    ]
+    for _ in range(tokens):
+        parts.append(_sse("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                  "delta": {"type": "text_delta", "text": rng.choice(_WORDS)}}))
+    parts += [
+        _sse("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        _sse("message_delta", {"type": "message_delta",
+                               "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                               "usage": {"output_tokens": tokens}}),
+        _sse("message_stop", {"type": "message_stop"}),
+    ]
+    return b"".join(parts)
+
+
+def split_chunks(data: bytes, rng: random.Random, min_size: int = 16, max_size: int = 512) -> list[bytes]:
+    """네트워크 수신처럼 임의 위치(줄/문자 중간 포함)에서 자름"""
+    chunks, pos = [], 0
+    while pos < len(data):
+        size = rng.randint(min_size, max_size)
+        chunks.append(data[pos:pos + size])
+        pos += size
+    return chunks
+
+
+class _Replay(httpx.AsyncByteStream):
+    def __init__(self, chunks: list[bytes]):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)  # 다른 스트림과 번갈아 실행
+            yield chunk
+
+
+async def _parse_lines(response: httpx.Response) -> int:
+    """기존 ClaudeService 파싱 루프"""
+    tokens = 0
+    async for line in response.aiter_lines():
+        if line.startswith("data: "):
+            data_str = line[6:]
+            if data_str == "[DONE]":
+                break
+            try:
+                data = json.loads(data_str)
+                event_type = data.get("type")
+                if event_type == "message_start":
+                    data.get("message", {}).get("usage")
+                elif event_type == "message_delta":
+                    data.get("usage")
+                elif event_type == "content_block_delta":
+                    delta = data.get("delta", {})
+                    if delta.get("type") == "text_delta" and delta.get("text", ""):
+                        tokens += 1
+            except json.JSONDecodeError:
+                continue
+    return tokens
+
+
+async def _parse_events(response: httpx.Response) -> int:
+    tokens = 0
+    parser = SSEParser()
+    async for raw in response.aiter_bytes():
+        for event in parser.feed(raw):
+            if event.kind == TEXT:
+                tokens += 1
+    return tokens
+
+
+async def _run(mode: str, streams: list[list[bytes]]) -> dict:
+    parse = _parse_lines if mode == "lines" else _parse_events
+    responses = [httpx.Response(200, stream=_Replay(chunks)) for chunks in streams]
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    counts = await asyncio.gather(*[parse(response) for response in responses])
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+
+    tokens = sum(counts)
+    return {
+        "mode": mode,
+        "streams": len(streams),
+        "tokens": tokens,
+        "cpu_s": round(cpu, 3),
+        "wall_s": round(wall, 3),
+        "cpu_us_per_token": round(cpu / tokens * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--streams", type=int, default=200, help="동시 스트림 수")
+    parser.add_argument("--tokens", type=int, default=400, help="스트림당 텍스트 델타 수")
+    parser.add_argument("--record", action="append", help="녹화된 SSE 응답 본문 파일 (여러 번 지정 가능)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.record:
+        recordings = [open(path, "rb").read() for path in args.record]
+    else:
+        recordings = [record_stream(args.tokens, rng) for _ in range(8)]
+    streams = [split_chunks(recordings[i % len(recordings)], rng) for i in range(args.streams)]
+
+    print(f"streams={args.streams} recordings={len(recordings)} "
+          f"bytes/stream={sum(map(len, streams[0]))}")
+    results = [asyncio.run(_run("lines", streams)), asyncio.run(_run("parser", streams))]
+
+    loads = sse_parser._loads
+    sse_parser._loads = json.loads
+    result = asyncio.run(_run("parser", streams))
+    result["mode"] = "parser-json"
+    results.append(result)
+    sse_parser._loads = loads
+
+    for result in results:
+        print(result)
+    baseline = results[0]["cpu_us_per_token"]
+    print({"speedup_vs_lines": round(baseline / results[1]["cpu_us_per_token"], 2)})
+
+
+if __name__ == "__main__":
+    main()
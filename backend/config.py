@@ -16,6 +16,91 @@ class Settings(BaseSettings):
 
     # Anthropic
     anthropic_api_key: str
+    anthropic_base_url: str = "https://api.anthropic.com"  # 프록시 / 로컬 가짜 서버 (benchmarks/fakes.py)
+
+    # Anthropic HTTP 클라이언트 (공유 커넥션 풀)
+    claude_timeout: float = 60.0
+    claude_http2: bool = True
+    claude_max_connections: int = 50
+    claude_max_keepalive_connections: int = 20
+    claude_keepalive_expiry: float = 60.0
+
+    # Claude 호출 입장 제어 / 재시도
+    claude_max_concurrency: int = 20  # 전역 동시 스트림 수
+    claude_user_rate_per_min: float = 20  # 사용자별 분당 요청 (0 이면 제한 없음)
+    claude_user_burst: int = 5
+    claude_max_retries: int = 3
+    claude_retry_base_delay: float = 1.0  # 초
+    claude_retry_max_delay: float = 30.0  # 백오프 상한 (retry-after 가 이보다 길면 재시도 안 함)
+
+    # 대화 컨텍스트 (히스토리 토큰 예산 + 프롬프트 캐시)
+    claude_system_prompt: str = ""
+    claude_prompt_caching: bool = True
+    context_max_tokens: int = 8000
+    context_max_messages: int = 50
+    context_trim_step: int = 10  # 오래된 턴을 이 단위로 잘라 캐시 프리픽스 유지
+
+    # 응답 캐시 (반복 프롬프트, 기본 꺼짐)
+    response_cache_enabled: bool = False
+    response_cache_ttl: int = 3600  # 초
+    response_cache_max_entries: int = 1000
+    response_cache_max_mb: int = 64
+
+    # 스트리밍 델타 병합 (둘 다 0 이면 토큰마다 전송)
+    stream_flush_ms: int = 30
+    stream_flush_bytes: int = 512
+
+    # WebSocket 팬아웃 허브 (memory: 단일 워커, postgres: LISTEN/NOTIFY 로 워커/레플리카 간 전달)
+    hub_backend: str = "memory"
+    database_url: str | None = None  # postgres 백엔드용 직접 연결 (Supabase: Session pooler)
+    hub_client_queue_size: int = 1000  # 연결별 미전송 이벤트 상한 (넘으면 연결 종료)
+    hub_health_interval: float = 5.0  # postgres LISTEN 연결 확인 주기 (초, 끊기면 재연결)
+
+    # 스트림 재개 버퍼 (끊긴 클라이언트가 turn_id + last_seq 로 이어 받기)
+    replay_ttl: int = 300  # 초 (턴 완료 후 보관 시간)
+    replay_max_mb: int = 64  # 전체 버퍼 메모리 상한
+    stream_abandon_grace: float = 10.0  # 초, 클라이언트가 끊긴 뒤 재개를 기다렸다가 업스트림 취소 (0 이면 즉시)
+
+    # 배치 작업 (Message Batches API - 대화형 동시성 예산 / 스케줄러와 별도)
+    batch_worker_enabled: bool = True  # 끄면 이 프로세스에서 배치 워커를 돌리지 않음 (API 는 동작)
+    batch_poll_interval: float = 30.0  # 초, 대기 작업 제출 + 제출된 배치 상태 확인 주기
+    batch_max_requests: int = 10000  # Anthropic 배치 하나에 묶을 최대 요청 수
+    batch_max_items_per_job: int = 1000  # 작업 하나에 넣을 수 있는 항목 수
+    batch_max_tokens: int = 1024  # 요청별 max_tokens
+    batch_write_size: int = 500  # 결과를 이 단위로 messages 에 일괄 저장
+    batch_stale_timeout: float = 600.0  # 초, submitting / collecting 상태로 이보다 오래 멈춘 작업은 다시 처리
+    batch_summary_prompt: str = "지금까지의 대화를 핵심 내용 위주로 간결하게 요약해 주세요."
+    batch_summary_page_size: int = 500  # 요약할 대화 전체를 이 단위로 나눠 읽음
+    batch_summary_max_tokens: int = 150000  # 요약 입력(대화록) 상한 - 넘으면 앞/뒤를 남기고 중간 생략
+
+    # 대화 삭제 / Storage 정리 (요청은 바로 반환, 백그라운드에서 묶음 단위로 처리)
+    deletion_batch_size: int = 50  # DELETE 한 번에 지울 대화 수
+    deletion_max_conversations: int = 1000  # 일괄 삭제 요청 하나에 넣을 수 있는 대화 수
+    storage_purge_batch_size: int = 100  # Storage remove 한 번에 지울 객체 수
+    storage_purge_interval: float = 300.0  # 초, 남은 정리 큐를 주기적으로 비움 (0 이면 삭제 작업 때만)
+
+    # Database (동기 supabase-py 호출을 실행할 스레드 풀 크기)
+    db_max_workers: int = 16
+
+    # 메시지 write-behind 저장
+    message_batch_size: int = 50
+    message_flush_interval_ms: int = 100
+    message_max_retries: int = 5
+    message_retry_base_delay: float = 0.2  # 초 (지수 백오프 시작값)
+    message_drain_timeout: float = 10.0  # 종료 시 남은 메시지 저장 대기 시간
+
+    # 시작 워밍업 / 헬스체크 (readiness 는 점검 결과를 캐시)
+    warmup_timeout: float = 10.0  # 초, 넘으면 워밍업 없이 기동
+    warmup_db_connections: int = 4
+    warmup_claude_connections: int = 2
+    health_cache_ttl: float = 5.0  # 초
+    health_check_timeout: float = 2.0  # 의존성별 점검 시간 상한
+    health_check_anthropic: bool = True  # 끄면 Anthropic 은 점검하지 않음 (readiness 에는 원래 영향 없음)
+    shutdown_drain_timeout: float = 30.0  # 초, 종료 시 진행 중인 턴 완료 대기 (넘으면 취소 후 truncated 저장)
+
+    # 로깅 (큐 기반, json: 한 줄 JSON / text: 사람이 읽는 형식)
+    log_level: str = "INFO"
+    log_format: str = "json"
 
     # API
     api_port: int = 8000
@@ -41,9 +126,40 @@ class Settings(BaseSettings):
     # Storage
     storage_bucket: str = "chat-files"
 
+    # 채팅 첨부 파일 (files → image / document 블록)
+    attachment_mode: str = "inline"  # inline: base64 본문 전달, files_api: Files API 에 한 번 올리고 file_id 로 참조
+    attachment_max_files: int = 10  # 메시지 하나에 첨부할 수 있는 파일 수
+    attachment_fetch_concurrency: int = 4  # 동시에 받는 첨부 파일 수 (프로세스 전체)
+    attachment_cache_memory_mb: int = 64  # 변환된 블록 메모리 캐시 (LRU)
+    attachment_cache_disk_mb: int = 512  # 변환된 블록 디스크 캐시 (LRU, 워커별 상한)
+    attachment_cache_dir: str | None = None  # 기본: {임시 디렉터리}/msg-attachments
+    attachment_pdf_text: bool = True  # 업로드 때 추출한 텍스트가 있으면 PDF 대신 텍스트 문서로 전달
+
+    # 업로드 전처리 (프로세스 풀, Pillow / pypdf 가 없으면 해당 단계 생략)
+    preprocess_workers: int = 2  # 프로세스 수 = 동시 작업 수 (0 이면 전처리 끔)
+    preprocess_timeout: float = 30.0  # 초, 넘으면 원본만 저장
+    image_max_edge: int = 1568  # 모델 입력용 이미지 긴 변 (px) - 이보다 크면 축소
+    image_reencode_min_kb: int = 512  # 축소가 필요 없어도 이보다 크면 재인코딩 시도 (작아질 때만 사용)
+    image_quality: int = 85  # JPEG 품질
+    thumbnail_max_edge: int = 256  # UI 썸네일 긴 변 (px)
+    pdf_text_max_chars: int = 200000  # PDF 추출 텍스트 상한
+
     # JWT (Supabase가 관리하지만 백엔드에서도 필요할 수 있음)
     jwt_secret: str = "change_this_in_production"
     jwt_algorithm: str = "HS256"
+    jwt_audience: str = "authenticated"
+    jwt_jwks_url: str | None = None  # 비대칭 키 프로젝트: {SUPABASE_URL}/auth/v1/.well-known/jwks.json
+
+    # 운영용 /stats 접근 토큰 (Authorization: Bearer, 없으면 /stats 비활성)
+    stats_token: str | None = None
+
+    # 프로필 캐시 (존재 확인된 프로필 id / /api/auth/me 행)
+    profile_cache_ttl: int = 300  # 초
+    profile_cache_max_entries: int = 10000
+
+    # 검증된 토큰 캐시
+    auth_cache_ttl: int = 300  # 초 (토큰 exp 보다 길어지지 않음)
+    auth_cache_max_entries: int = 10000
 
     class Config:
         env_file = ".env"
@@ -1,10 +1,81 @@
 """Supabase 데이터베이스 연결"""
+import asyncio
+import base64
+import functools
+import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable
+from postgrest.types import ReturnMethod
 from supabase import create_client, Client
 from config import get_settings
+from log import get_logger
+from metrics import DB_LATENCY, timed
+
+logger = get_logger(__name__)
 
 # 캐시 없이 매번 새로 생성 (환경변수 업데이트 반영)
 _client_cache = None
 _anon_client_cache = None
+_db_executor = None
+
+# 목록 조회용 컬럼 (select("*") 대신 필요한 컬럼만)
+MESSAGE_COLUMNS = "id,conversation_id,role,content,truncated,created_at"
+CONVERSATION_LIST_COLUMNS = "id,title,created_at,updated_at"
+BATCH_JOB_COLUMNS = (
+    "id,kind,status,total,succeeded,errored,canceled,expired,error,"
+    "created_at,updated_at,submitted_at,ended_at"
+)
+BATCH_ITEM_COLUMNS = "id,job_id,conversation_id,prompt,status,error"
+# 업로드 전처리 결과 (원본 크기, 원본 경로 옆에 저장한 파생 파일)
+FILE_DERIVED_COLUMNS = "width,height,model_image_path,thumbnail_path,text_path"
+# 다시 보내도 같은 결과인 SQLSTATE 클래스 (22: 데이터 오류, 23: 무결성 위반)
+_PERMANENT_SQLSTATE_CLASSES = ("22", "23")
+
+
+class RowsRejectedError(Exception):
+    """DB 가 행 내용 때문에 거부함 (재시도해도 실패 - 예: 삭제된 대화를 가리키는 외래 키)"""
+
+
+def _is_permanent(error: Exception) -> bool:
+    code = getattr(error, "code", None)
+    return isinstance(code, str) and code[:2] in _PERMANENT_SQLSTATE_CLASSES
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """DB 호출 전용 스레드 풀 (이벤트 루프 블로킹 방지)"""
+    global _db_executor
+    if _db_executor is None:
+        settings = get_settings()
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.db_max_workers,
+            thread_name_prefix="supabase"
+        )
+    return _db_executor
+
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    동기 supabase-py 호출을 스레드 풀에서 실행
+
+    supabase-py의 동기 Client는 내부적으로 하나의 httpx.Client 세션
+    (keep-alive 커넥션 풀)을 공유하므로, 워커 수만큼의 요청이 같은 풀을
+    재사용하며 동시에 진행된다.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(),
+        functools.partial(fn, *args, **kwargs)
+    )
+
+
+def shutdown_db_executor():
+    """DB 스레드 풀 종료 (진행 중인 호출은 완료까지 대기)"""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
 
 
 def get_supabase_client() -> Client:
@@ -12,7 +83,7 @@ def get_supabase_client() -> Client:
     global _client_cache
     if _client_cache is None:
         settings = get_settings()
-        print(f"[DEBUG] Creating Supabase client with key: {settings.supabase_service_role_key[:30]}...")
+        logger.debug("Creating Supabase client", extra={"supabase_url": settings.supabase_url})
         _client_cache = create_client(
             settings.supabase_url,
             settings.supabase_service_role_key
@@ -32,28 +103,54 @@ def get_supabase_anon_client() -> Client:
     return _anon_client_cache
 
 
+@timed(DB_LATENCY)
 async def verify_user_token(token: str) -> dict | None:
     """JWT 토큰 검증"""
     try:
         supabase = get_supabase_client()
-        user = supabase.auth.get_user(token)
+        user = await run_db(supabase.auth.get_user, token)
         return user.user if user else None
     except Exception as e:
-        print(f"Token verification failed: {e}")
+        logger.info("Token verification failed", extra={"error": str(e)})
         return None
 
 
+@timed(DB_LATENCY)
 async def get_user_profile(user_id: str) -> dict | None:
     """사용자 프로필 조회"""
     try:
         supabase = get_supabase_client()
-        result = supabase.table("profiles").select("*").eq("id", user_id).execute()
+        result = await run_db(
+            supabase.table("profiles").select("*").eq("id", user_id).execute
+        )
         return result.data[0] if result.data else None
     except Exception as e:
-        print(f"Failed to get user profile: {e}")
+        logger.error("Failed to get user profile", extra={"user_id": user_id, "error": str(e)})
         return None
 
 
+@timed(DB_LATENCY)
+async def ensure_profile(user_id: str, display_name: str) -> bool:
+    """
+    프로필이 없으면 생성 (idempotent upsert 한 번)
+
+    이미 있으면 아무것도 바꾸지 않는다. (ON CONFLICT (id) DO NOTHING)
+    """
+    try:
+        supabase = get_supabase_client()
+        await run_db(supabase.table("profiles").upsert(
+            {"id": user_id, "display_name": display_name},
+            on_conflict="id",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal
+        ).execute)
+        return True
+    except Exception as e:
+        logger.error("Failed to ensure profile", extra={"user_id": user_id, "error": str(e)})
+        return False
+
+
+@timed(DB_LATENCY)
 async def save_message(
     conversation_id: str,
     role: str,
@@ -62,56 +159,638 @@ async def save_message(
     """메시지 저장"""
     try:
         supabase = get_supabase_client()
-        result = supabase.table("messages").insert({
+        result = await run_db(supabase.table("messages").insert({
             "conversation_id": conversation_id,
             "role": role,
             "content": content
-        }).execute()
+        }).execute)
         return result.data[0] if result.data else None
     except Exception as e:
-        print(f"Failed to save message: {e}")
+        logger.error("Failed to save message", extra={"conversation_id": conversation_id, "error": str(e)})
         return None
 
 
-async def get_conversation_messages(conversation_id: str) -> list[dict]:
-    """대화의 모든 메시지 조회"""
+@timed(DB_LATENCY)
+async def save_messages(rows: list[dict]) -> bool:
+    """
+    메시지 일괄 저장 (write-behind 배치용)
+
+    행마다 id 를 미리 지정하므로, 재시도 시 이미 저장된 행은 무시된다.
+
+    Returns:
+        저장 성공 여부 (False 는 연결 오류 등 재시도할 만한 실패)
+
+    Raises:
+        RowsRejectedError: 배치 안의 행이 무결성 / 데이터 오류로 거부됨 (문장 전체가 롤백)
+    """
     try:
         supabase = get_supabase_client()
-        result = supabase.table("messages")\
-            .select("*")\
-            .eq("conversation_id", conversation_id)\
-            .order("created_at", desc=False)\
-            .execute()
-        return result.data if result.data else []
+        await run_db(supabase.table("messages").upsert(
+            rows,
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal
+        ).execute)
+        return True
     except Exception as e:
-        print(f"Failed to get messages: {e}")
+        if _is_permanent(e):
+            raise RowsRejectedError(str(e)) from e
+        logger.error("Failed to save message batch", extra={"rows": len(rows), "error": str(e)})
+        return False
+
+
+@timed(DB_LATENCY)
+async def link_message_files(message_id: str, user_id: str, file_paths: list[str]) -> int | None:
+    """
+    첨부 경로의 files 행을 메시지에 연결 (link_message_files RPC, 메시지 행 저장 후 호출)
+
+    Returns:
+        연결한 행 수 (사용자 소유가 아닌 경로는 무시), 실패 시 None
+    """
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.rpc("link_message_files", {
+            "p_message_id": message_id,
+            "p_user_id": user_id,
+            "p_paths": file_paths
+        }).execute)
+        return result.data
+    except Exception as e:
+        logger.error("Failed to link message files", extra={"message_id": message_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def find_file_by_hash(user_id: str, sha256: str) -> dict | None:
+    """같은 내용(sha256)으로 이미 업로드된 파일 조회"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("files")\
+            .select(f"file_path,{FILE_DERIVED_COLUMNS}")\
+            .eq("user_id", user_id)\
+            .eq("sha256", sha256)\
+            .limit(1)
+        result = await run_db(query.execute)
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error("Failed to look up file hash", extra={"user_id": user_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def get_user_files(user_id: str, file_paths: list[str]) -> list[dict]:
+    """사용자 소유 파일 메타데이터 (첨부 경로 → MIME 타입 / 내용 해시)"""
+    if not file_paths:
+        return []
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("files")\
+            .select("file_path,mime_type,sha256,model_image_path,text_path")\
+            .eq("user_id", user_id)\
+            .in_("file_path", file_paths)
+        result = await run_db(query.execute)
+        return result.data
+    except Exception as e:
+        logger.error("Failed to get user files", extra={"user_id": user_id, "error": str(e)})
         return []
 
 
+@timed(DB_LATENCY)
+async def create_file_record(
+    user_id: str,
+    file_name: str,
+    file_path: str,
+    file_size: int,
+    mime_type: str,
+    sha256: str,
+    message_id: str | None = None,
+    derived: dict | None = None
+) -> dict | None:
+    """파일 메타데이터 저장 (메시지 연결 전이면 message_id 없음, derived: 전처리 결과 컬럼)"""
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.table("files").insert({
+            "user_id": user_id,
+            "message_id": message_id,
+            "file_name": file_name,
+            "file_path": file_path,
+            "file_size": file_size,
+            "mime_type": mime_type,
+            "sha256": sha256,
+            **(derived or {})
+        }).execute)
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error("Failed to save file record", extra={"user_id": user_id, "error": str(e)})
+        return None
+
+
+def encode_cursor(row: dict, sort_column: str) -> str:
+    """키셋 커서 생성 (정렬 컬럼 값 + id)"""
+    raw = json.dumps([row[sort_column], row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """
+    키셋 커서 해석 (잘못된 커서면 ValueError)
+
+    값이 PostgREST 필터 문자열에 들어가므로 id 는 UUID 로 정규화하고,
+    정렬 값에는 따옴표 / 백슬래시를 허용하지 않는다.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        row_id = str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if not isinstance(sort_value, str) or '"' in sort_value or "\\" in sort_value:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return sort_value, row_id
+
+
+def _apply_keyset(query, sort_column: str, cursor: str, op: str):
+    """(sort_column, id) 튜플 비교를 PostgREST or 필터로 표현"""
+    sort_value, row_id = decode_cursor(cursor)
+    return query.or_(
+        f'{sort_column}.{op}."{sort_value}",'
+        f'and({sort_column}.eq."{sort_value}",id.{op}.{row_id})'
+    )
+
+
+@timed(DB_LATENCY)
+async def get_conversation_messages(
+    conversation_id: str,
+    limit: int | None = None,
+    before: str | None = None,
+    after: str | None = None,
+    columns: str = MESSAGE_COLUMNS
+) -> list[dict]:
+    """
+    대화의 메시지 조회 (항상 시간순으로 반환)
+
+    Args:
+        conversation_id: 대화 ID
+        limit: 최대 개수 (없으면 전체)
+        before: 이 커서보다 오래된 메시지 (limit 과 함께면 가장 가까운 것부터)
+        after: 이 커서보다 새로운 메시지
+        columns: 조회할 컬럼
+
+    limit 만 주면 가장 최근 메시지 limit 개를 반환한다.
+    키셋 정렬 키는 (created_at, id).
+    """
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("messages")\
+            .select(columns)\
+            .eq("conversation_id", conversation_id)
+        if before:
+            query = _apply_keyset(query, "created_at", before, "lt")
+        if after:
+            query = _apply_keyset(query, "created_at", after, "gt")
+
+        # after 가 없고 잘라야 하면 최신부터 읽어서 뒤집는다
+        newest_first = not after and (limit is not None or before is not None)
+        query = query.order("created_at", desc=newest_first).order("id", desc=newest_first)
+        if limit is not None:
+            query = query.limit(limit)
+
+        result = await run_db(query.execute)
+        rows = result.data if result.data else []
+        return rows[::-1] if newest_first else rows
+    except Exception as e:
+        logger.error("Failed to get messages", extra={"conversation_id": conversation_id, "error": str(e)})
+        return []
+
+
+@timed(DB_LATENCY)
+async def search_messages(
+    user_id: str,
+    query: str,
+    limit: int,
+    after: str | None = None
+) -> list[dict]:
+    """
+    사용자 메시지 전문 검색 (search_messages RPC, 관련도순)
+
+    Args:
+        user_id: 검색 범위 (이 사용자의 대화만)
+        query: 검색어 (websearch 문법 + 부분 일치)
+        limit: 최대 개수
+        after: 이전 페이지 마지막 결과의 커서 (rank, id)
+
+    Raises:
+        ValueError: 잘못된 커서
+    """
+    params = {"p_user_id": user_id, "p_query": query, "p_limit": limit}
+    if after:
+        rank, row_id = decode_cursor(after)
+        try:
+            params["p_after_rank"] = float(rank)
+        except ValueError:
+            raise ValueError(f"Invalid cursor: {after}")
+        params["p_after_id"] = row_id
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.rpc("search_messages", params).execute)
+        return result.data or []
+    except Exception as e:
+        logger.error("Failed to search messages", extra={"user_id": user_id, "error": str(e)})
+        return []
+
+
+@timed(DB_LATENCY)
 async def create_conversation(user_id: str, title: str = "New Conversation") -> dict | None:
     """새 대화 생성"""
     try:
         supabase = get_supabase_client()
-        result = supabase.table("conversations").insert({
+        result = await run_db(supabase.table("conversations").insert({
             "user_id": user_id,
             "title": title
-        }).execute()
+        }).execute)
         return result.data[0] if result.data else None
     except Exception as e:
-        print(f"Failed to create conversation: {e}")
+        logger.error("Failed to create conversation", extra={"user_id": user_id, "error": str(e)})
         return None
 
 
-async def get_user_conversations(user_id: str) -> list[dict]:
-    """사용자의 모든 대화 조회"""
+@timed(DB_LATENCY)
+async def get_conversation(conversation_id: str, columns: str = "*") -> dict | None:
+    """대화 단건 조회"""
     try:
         supabase = get_supabase_client()
-        result = supabase.table("conversations")\
-            .select("*")\
+        query = supabase.table("conversations")\
+            .select(columns)\
+            .eq("id", conversation_id)\
+            .limit(1)
+        result = await run_db(query.execute)
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error("Failed to get conversation", extra={"conversation_id": conversation_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def get_user_conversations(
+    user_id: str,
+    limit: int | None = None,
+    before: str | None = None,
+    after: str | None = None,
+    columns: str = "*"
+) -> list[dict]:
+    """
+    사용자의 대화 조회 (항상 최근 업데이트 순으로 반환)
+
+    Args:
+        user_id: 사용자 ID
+        limit: 최대 개수 (없으면 전체)
+        before: 이 커서보다 오래된 대화 (다음 페이지)
+        after: 이 커서보다 최근 대화 (이전 페이지)
+        columns: 조회할 컬럼
+
+    키셋 정렬 키는 목록 정렬과 같은 (updated_at, id).
+    """
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("conversations")\
+            .select(columns)\
+            .eq("user_id", user_id)
+        if before:
+            query = _apply_keyset(query, "updated_at", before, "lt")
+        if after:
+            query = _apply_keyset(query, "updated_at", after, "gt")
+
+        # after 는 커서에서 가까운 것부터 읽어야 하므로 오름차순 후 뒤집는다
+        oldest_first = after is not None
+        query = query.order("updated_at", desc=not oldest_first).order("id", desc=not oldest_first)
+        if limit is not None:
+            query = query.limit(limit)
+
+        result = await run_db(query.execute)
+        rows = result.data if result.data else []
+        return rows[::-1] if oldest_first else rows
+    except Exception as e:
+        logger.error("Failed to get conversations", extra={"user_id": user_id, "error": str(e)})
+        return []
+
+
+@timed(DB_LATENCY)
+async def create_batch_job(job: dict, items: list[dict]) -> bool | None:
+    """
+    배치 작업 + 항목 저장 (create_batch_job RPC, 한 트랜잭션)
+
+    Args:
+        job: id / user_id / kind
+        items: id / conversation_id / prompt 행
+
+    Returns:
+        True 저장됨, False 사용자 소유가 아닌 대화가 있음 (저장 안 함), None DB 오류
+    """
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.rpc("create_batch_job", {"p_job": job, "p_items": items}).execute)
+        return bool(result.data)
+    except Exception as e:
+        logger.error("Failed to create batch job", extra={"user_id": job.get("user_id"), "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def get_batch_job(job_id: str, columns: str = "*") -> dict | None:
+    """배치 작업 단건 조회"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("batch_jobs")\
+            .select(columns)\
+            .eq("id", job_id)\
+            .limit(1)
+        result = await run_db(query.execute)
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error("Failed to get batch job", extra={"job_id": job_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def get_user_batch_jobs(user_id: str, limit: int, columns: str = BATCH_JOB_COLUMNS) -> list[dict]:
+    """사용자의 배치 작업 (최근 순)"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("batch_jobs")\
+            .select(columns)\
             .eq("user_id", user_id)\
-            .order("updated_at", desc=True)\
-            .execute()
-        return result.data if result.data else []
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit)
+        result = await run_db(query.execute)
+        return result.data or []
+    except Exception as e:
+        logger.error("Failed to get batch jobs", extra={"user_id": user_id, "error": str(e)})
+        return []
+
+
+@timed(DB_LATENCY)
+async def get_batch_jobs_by_status(status: str, limit: int, columns: str = "*") -> list[dict]:
+    """워커용 - 상태별 작업 (오래된 순)"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("batch_jobs")\
+            .select(columns)\
+            .eq("status", status)\
+            .order("created_at")\
+            .limit(limit)
+        result = await run_db(query.execute)
+        return result.data or []
+    except Exception as e:
+        logger.error("Failed to get batch jobs by status", extra={"status": status, "error": str(e)})
+        return []
+
+
+@timed(DB_LATENCY)
+async def transition_batch_jobs(
+    from_status: str,
+    to_status: str,
+    job_ids: list[str] | None = None,
+    provider_batch_id: str | None = None,
+    stale_before: str | None = None,
+    changes: dict | None = None
+) -> list[dict]:
+    """
+    배치 작업 상태 전이 (조건부 UPDATE 한 번 - 워커 간 선점)
+
+    from_status 인 작업만 바꾸므로, 여러 워커가 같은 작업을 동시에 전이하면
+    한 쪽만 행을 돌려받는다.
+
+    Args:
+        job_ids: 이 작업들만
+        provider_batch_id: 이 Anthropic 배치로 제출된 작업만
+        stale_before: updated_at 이 이 시각보다 오래된 작업만 (멈춘 작업 회수)
+        changes: 함께 바꿀 컬럼
+
+    Returns:
+        전이된 작업 행 (실패하면 빈 리스트)
+    """
+    try:
+        supabase = get_supabase_client()
+        values = {
+            **(changes or {}),
+            "status": to_status,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        query = supabase.table("batch_jobs")\
+            .update(values)\
+            .eq("status", from_status)
+        if job_ids is not None:
+            query = query.in_("id", job_ids)
+        if provider_batch_id is not None:
+            query = query.eq("provider_batch_id", provider_batch_id)
+        if stale_before is not None:
+            query = query.lt("updated_at", stale_before)
+        result = await run_db(query.execute)
+        return result.data or []
     except Exception as e:
-        print(f"Failed to get conversations: {e}")
+        logger.error("Failed to transition batch jobs", extra={
+            "from_status": from_status, "to_status": to_status, "error": str(e)
+        })
         return []
+
+
+@timed(DB_LATENCY)
+async def get_batch_items(job_ids: list[str], columns: str = BATCH_ITEM_COLUMNS) -> list[dict]:
+    """작업들의 항목 (작업별 생성 순)"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("batch_items")\
+            .select(columns)\
+            .in_("job_id", job_ids)\
+            .order("created_at")\
+            .order("id")
+        result = await run_db(query.execute)
+        return result.data or []
+    except Exception as e:
+        logger.error("Failed to get batch items", extra={"jobs": len(job_ids), "error": str(e)})
+        return []
+
+
+@timed(DB_LATENCY)
+async def update_batch_items(item_ids: list[str], changes: dict) -> bool:
+    """항목 상태 일괄 갱신 (같은 값으로 바꿀 항목끼리 한 번에)"""
+    try:
+        supabase = get_supabase_client()
+        await run_db(supabase.table("batch_items")
+                     .update(changes, returning=ReturnMethod.minimal)
+                     .in_("id", item_ids)
+                     .execute)
+        return True
+    except Exception as e:
+        logger.error("Failed to update batch items", extra={"items": len(item_ids), "error": str(e)})
+        return False
+
+
+@timed(DB_LATENCY)
+async def get_export_conversations(user_id: str, after: str | None, limit: int) -> list[dict]:
+    """
+    내보내기용 대화 페이지 ((created_at, id) 오름차순 키셋)
+
+    updated_at 은 내보내는 도중 바뀔 수 있으므로 생성 순으로 읽는다.
+    실패하면 예외를 그대로 올린다. (내보내기가 조용히 잘리지 않도록)
+    """
+    supabase = get_supabase_client()
+    query = supabase.table("conversations")\
+        .select("id,title,created_at,updated_at")\
+        .eq("user_id", user_id)
+    if after:
+        query = _apply_keyset(query, "created_at", after, "gt")
+    query = query.order("created_at").order("id").limit(limit)
+    result = await run_db(query.execute)
+    return result.data or []
+
+
+@timed(DB_LATENCY)
+async def get_export_messages(conversation_id: str, after: str | None, limit: int) -> list[dict]:
+    """내보내기용 메시지 페이지 (시간순 키셋, 실패하면 예외)"""
+    supabase = get_supabase_client()
+    query = supabase.table("messages")\
+        .select(MESSAGE_COLUMNS)\
+        .eq("conversation_id", conversation_id)
+    if after:
+        query = _apply_keyset(query, "created_at", after, "gt")
+    query = query.order("created_at").order("id").limit(limit)
+    result = await run_db(query.execute)
+    return result.data or []
+
+
+@timed(DB_LATENCY)
+async def save_conversations(rows: list[dict]) -> bool:
+    """대화 일괄 저장 (가져오기용, id 를 미리 지정 - 재시도 시 이미 저장된 행은 무시)"""
+    try:
+        supabase = get_supabase_client()
+        await run_db(supabase.table("conversations").upsert(
+            rows,
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal
+        ).execute)
+        return True
+    except Exception as e:
+        logger.error("Failed to save conversation batch", extra={"rows": len(rows), "error": str(e)})
+        return False
+
+
+@timed(DB_LATENCY)
+async def create_deletion_job(user_id: str, total: int) -> dict | None:
+    """대화 삭제 작업 생성 (상태 deleting)"""
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.table("deletion_jobs").insert({
+            "user_id": user_id,
+            "total": total
+        }).execute)
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error("Failed to create deletion job", extra={"user_id": user_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def get_deletion_job(job_id: str) -> dict | None:
+    """대화 삭제 작업 조회"""
+    try:
+        supabase = get_supabase_client()
+        query = supabase.table("deletion_jobs")\
+            .select("*")\
+            .eq("id", job_id)\
+            .limit(1)
+        result = await run_db(query.execute)
+        return result.data[0] if result.data else None
+    except Exception as e:
+        logger.error("Failed to get deletion job", extra={"job_id": job_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def update_deletion_job(job_id: str, changes: dict) -> bool:
+    """대화 삭제 작업 진행 상황 갱신"""
+    try:
+        supabase = get_supabase_client()
+        await run_db(supabase.table("deletion_jobs").update(
+            {**changes, "updated_at": datetime.now(timezone.utc).isoformat()},
+            returning=ReturnMethod.minimal
+        ).eq("id", job_id).execute)
+        return True
+    except Exception as e:
+        logger.error("Failed to update deletion job", extra={"job_id": job_id, "error": str(e)})
+        return False
+
+
+@timed(DB_LATENCY)
+async def delete_user_conversations(user_id: str, conversation_ids: list[str]) -> int | None:
+    """
+    사용자의 대화 삭제 (메시지 → 파일 행은 DB 에서 cascade)
+
+    지워진 files 행의 Storage 경로는 트리거가 storage_purge_queue 에 남긴다.
+
+    Returns:
+        삭제된 대화 수 (없거나 남의 대화는 세지 않음), 실패 시 None
+    """
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.table("conversations")
+                              .delete()
+                              .eq("user_id", user_id)
+                              .in_("id", conversation_ids)
+                              .execute)
+        return len(result.data or [])
+    except Exception as e:
+        logger.error("Failed to delete conversations", extra={"user_id": user_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def get_conversation_file_paths(user_id: str, conversation_ids: list[str]) -> set[str] | None:
+    """
+    대화들의 메시지에 연결된 Storage 경로 (conversation_file_paths RPC, 파생 파일 포함)
+
+    Returns:
+        경로 집합 (남의 대화는 포함하지 않음), 실패 시 None
+    """
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.rpc("conversation_file_paths", {
+            "p_user_id": user_id,
+            "p_conversation_ids": conversation_ids
+        }).execute)
+        return set(result.data or [])
+    except Exception as e:
+        logger.error("Failed to get conversation file paths", extra={"user_id": user_id, "error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def claim_storage_purge(limit: int) -> list[dict] | None:
+    """
+    Storage 정리 큐에서 경로 꺼내기 (claim_storage_purge RPC)
+
+    Returns:
+        file_path / in_use 행 (in_use 면 다른 files 행이 아직 쓰는 경로), 실패 시 None
+    """
+    try:
+        supabase = get_supabase_client()
+        result = await run_db(supabase.rpc("claim_storage_purge", {"p_limit": limit}).execute)
+        return result.data or []
+    except Exception as e:
+        logger.error("Failed to claim storage purge", extra={"error": str(e)})
+        return None
+
+
+@timed(DB_LATENCY)
+async def requeue_storage_purge(file_paths: list[str]) -> bool:
+    """Storage 삭제에 실패한 경로를 큐에 되돌림 (다음 정리 때 재시도)"""
+    try:
+        supabase = get_supabase_client()
+        await run_db(supabase.table("storage_purge_queue").insert(
+            [{"file_path": path} for path in file_paths],
+            returning=ReturnMethod.minimal
+        ).execute)
+        return True
+    except Exception as e:
+        logger.error("Failed to requeue storage purge", extra={"paths": len(file_paths), "error": str(e)})
+        return False
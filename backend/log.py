@@ -0,0 +1,107 @@
+"""
+구조화 로깅 - 큐 기반 (로그 I/O 가 이벤트 루프를 막지 않음)
+
+로거는 레코드를 메모리 큐에 넣기만 하고, 실제 출력(stdout)은 QueueListener
+스레드가 한다. 큐가 가득 차면 기다리지 않고 버린다. (msg_log_dropped_total)
+
+    logger = get_logger(__name__)
+    logger.warning("Hub publish failed", extra={"conversation_id": cid, "error": str(e)})
+
+LOG_FORMAT=json 이면 레코드 하나가 JSON 한 줄 (extra 필드 포함),
+text 면 사람이 읽는 형식.
+"""
+import copy
+import logging
+import logging.handlers
+import queue
+import sys
+from datetime import datetime, timezone
+from metrics import LOG_DROPPED
+from serialization import dumps
+
+# 큐에 쌓아 둘 최대 레코드 수 (넘으면 버림)
+_QUEUE_SIZE = 10000
+# LogRecord 기본 속성 (이 외의 속성은 extra 필드로 출력)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JSONFormatter(logging.Formatter):
+    """JSON 한 줄 (ts / level / logger / msg + extra 필드)"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return dumps(entry)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 기다리지 않고 버림"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 메시지 / 예외만 여기서 문자열로 만들고, extra 필드는 그대로 넘김
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+def setup_logging(level: str = "INFO", fmt: str = "json"):
+    """루트 로거를 큐 핸들러로 교체하고 출력 스레드 시작 (여러 번 호출해도 한 번만)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        output.setFormatter(JSONFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records: queue.Queue = queue.Queue(maxsize=_QUEUE_SIZE)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DroppingQueueHandler(records))
+    root.setLevel(level.upper())
+    # uvicorn 로거(접근 로그 포함)도 같은 큐로
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        for handler in list(uvicorn_logger.handlers):
+            uvicorn_logger.removeHandler(handler)
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """남은 레코드 출력 후 출력 스레드 종료 (FastAPI lifespan 종료 시 호출)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """모듈 로거"""
+    return logging.getLogger(name)
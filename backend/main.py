@@ -1,26 +1,87 @@
 """MSG 백엔드 메인 애플리케이션"""
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from config import get_settings
-from api import auth, chat, history
+from database import shutdown_db_executor
+from log import get_logger, setup_logging, shutdown_logging
+from serialization import FastJSONResponse
+import metrics
+from services import (
+    get_claude_service,
+    get_auth_service,
+    get_message_writer,
+    get_response_cache,
+    get_scheduler,
+    get_hub,
+    get_replay_buffer,
+    get_health_checker,
+    get_profile_cache,
+    get_batch_service,
+    get_deletion_service,
+    get_attachment_service,
+    get_preprocess_service
+)
+from api import auth, chat, history, files, batch
 import os
 
 settings = get_settings()
+setup_logging(settings.log_level, settings.log_format)
+logger = get_logger(__name__)
+
+# 환경변수 확인 (키 값은 남기지 않음)
+logger.info("Environment variables check", extra={
+    "supabase_url": settings.supabase_url,
+    "supabase_service_role_key_set": bool(settings.supabase_service_role_key),
+    "anthropic_api_key_set": bool(settings.anthropic_api_key),
+    "env_vars_found": len([k for k in os.environ.keys() if "SUPABASE" in k or "ANTHROPIC" in k])
+})
+
+# 수집 시점에 서비스 상태를 읽는 게이지
+metrics.WEBSOCKET_CONNECTIONS.set_function(lambda: get_hub().get_stats()["connections"])
+metrics.CLAUDE_IN_FLIGHT.set_function(lambda: get_scheduler().get_stats()["active"])
+metrics.CLAUDE_WAITING.set_function(lambda: get_scheduler().get_stats()["waiting"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    앱 수명주기
+
+    시작: 메시지 저장 큐 / 허브 시작, Supabase / Anthropic 클라이언트 예열, 배치 워커 / Storage 정리 시작
+    종료: readiness 를 내리고 진행 중인 턴 / 삭제 작업 마무리 → 배치 워커 중지 → 허브 / 저장 큐 drain → 공유 클라이언트 정리
+    """
+    health = get_health_checker()
+    get_message_writer().start()
+    await get_hub().start()
+    await health.warm_up()
+    if settings.batch_worker_enabled:
+        get_batch_service().start()
+    get_deletion_service().start()
+    yield
+    health.draining = True
+    drained = await chat.drain_turns(settings.shutdown_drain_timeout)
+    logger.info("Shutdown drain finished", extra=drained)
+    await get_deletion_service().stop()
+    await get_batch_service().stop()
+    await get_hub().stop()
+    await get_message_writer().stop()
+    await get_claude_service().aclose()
+    await get_attachment_service().aclose()
+    get_preprocess_service().shutdown()
+    shutdown_db_executor()
+    shutdown_logging()
 
-# 환경변수 디버깅
-print("=" * 50)
-print("Environment Variables Check:")
-print(f"SUPABASE_URL: {settings.supabase_url[:30]}...")
-print(f"SUPABASE_SERVICE_ROLE_KEY: {settings.supabase_service_role_key[:20]}...")
-print(f"ANTHROPIC_API_KEY: {settings.anthropic_api_key[:20]}...")
-print(f"Environment vars loaded: {len([k for k in os.environ.keys() if 'SUPABASE' in k or 'ANTHROPIC' in k])} found")
-print("=" * 50)
 
 # FastAPI 앱 생성
 app = FastAPI(
     title="MSG API",
     description="AI Messenger Backend",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS 설정
@@ -30,12 +91,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Turn-Id"],  # 스트림 재개용 (api/chat.py)
 )
 
 # 라우터 등록
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(history.router, prefix="/api/history", tags=["history"])
+app.include_router(files.router, prefix="/api/files", tags=["files"])
+app.include_router(batch.router, prefix="/api/batch", tags=["batch"])
 
 
 @app.get("/")
@@ -48,12 +112,57 @@ async def root():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness - 프로세스가 응답하는지만 (의존성 점검 없음, 실패 시 재시작 대상)"""
+    return get_health_checker().liveness()
+
+
+@app.get("/health/ready")
+async def readiness():
+    """Readiness - Supabase 연결 점검 (결과 캐시), 준비 안 됐으면 503"""
+    ready, body = await get_health_checker().readiness()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 @app.get("/health")
 async def health_check():
-    """헬스체크 엔드포인트"""
+    """헬스체크 엔드포인트 (= readiness, render.yaml healthCheckPath)"""
+    return await readiness()
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus 메트릭 (워커별 값)"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+def require_stats_token(authorization: str | None = Header(None)):
+    """STATS_TOKEN 확인 (설정되지 않았으면 엔드포인트를 숨김)"""
+    if not settings.stats_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    expected = f"Bearer {settings.stats_token}"
+    if not authorization or not secrets.compare_digest(authorization.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid stats token")
+
+
+@app.get("/stats", dependencies=[Depends(require_stats_token)])
+async def stats():
+    """서비스 통계 (Claude 커넥션 재사용 / TTFT, 토큰 검증 캐시) - STATS_TOKEN 필요"""
     return {
-        "status": "ok",
-        "supabase_connected": True  # TODO: 실제 연결 확인
+        "claude": get_claude_service().get_stats(),
+        "auth": get_auth_service().get_stats(),
+        "message_writer": get_message_writer().get_stats(),
+        "response_cache": get_response_cache().get_stats(),
+        "scheduler": get_scheduler().get_stats(),
+        "hub": get_hub().get_stats(),
+        "replay_buffer": get_replay_buffer().get_stats(),
+        "health": get_health_checker().get_stats(),
+        "profile_cache": get_profile_cache().get_stats(),
+        "batch": get_batch_service().get_stats(),
+        "deletion": get_deletion_service().get_stats(),
+        "attachments": get_attachment_service().get_stats(),
+        "preprocess": get_preprocess_service().get_stats()
     }
 
 
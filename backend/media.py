@@ -0,0 +1,105 @@
+"""
+첨부 전처리 - 이미지 축소 / 썸네일, PDF 텍스트 추출
+
+프로세스 풀 워커에서 실행되는 순수 함수만 둔다. (앱 설정 / DB 모듈을 import 하지
+않아 spawn 된 워커가 가볍게 뜬다.) Pillow / pypdf 는 선택 의존성이며, 없으면
+호출하는 쪽(PreprocessService)이 해당 단계를 건너뛴다.
+"""
+import io
+import warnings
+
+# 이 픽셀 수를 넘는 이미지는 처리하지 않음 (압축 폭탄 방지, 약 8000x8000)
+MAX_IMAGE_PIXELS = 64_000_000
+
+
+def _encode(image, has_alpha: bool, quality: int) -> tuple[bytes, str]:
+    """투명도가 있으면 PNG, 없으면 JPEG"""
+    buffer = io.BytesIO()
+    if has_alpha:
+        image.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue(), "image/png"
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue(), "image/jpeg"
+
+
+def process_image(
+    path: str,
+    max_edge: int,
+    thumbnail_edge: int,
+    reencode_min_bytes: int,
+    quality: int
+) -> dict:
+    """
+    모델 입력용 이미지 + 썸네일 생성
+
+    - 긴 변이 max_edge 를 넘으면 비율 유지 축소 후 재인코딩
+    - 축소가 필요 없어도 원본이 reencode_min_bytes 보다 크면 재인코딩을 시도
+      (결과가 원본보다 작을 때만 사용)
+    - 애니메이션 GIF 는 원본 유지, 썸네일만 첫 프레임으로 생성
+
+    Returns:
+        {"width", "height", "thumbnail": (bytes, mime), "model_image": (bytes, mime) | 없음}
+    """
+    from PIL import Image, ImageOps
+
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", Image.DecompressionBombWarning)
+        with open(path, "rb") as f:
+            original = f.read()
+        image = Image.open(io.BytesIO(original))
+        animated = getattr(image, "is_animated", False)
+        # 원본 크기 (EXIF 회전 반영)
+        width, height = image.size
+        if image.getexif().get(0x0112, 1) in (5, 6, 7, 8):
+            width, height = height, width
+        # JPEG 는 디코딩 단계에서 1/2, 1/4, 1/8 로 줄여 읽음 (픽셀 작업량 감소)
+        if image.format == "JPEG":
+            image.draft("RGB", (max_edge, max_edge))
+        image.load()
+
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+    if image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    result = {"width": width, "height": height}
+
+    needs_resize = max(width, height) > max_edge
+    if not animated and (needs_resize or len(original) > reencode_min_bytes):
+        model_image = image.copy()
+        if needs_resize:
+            model_image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        data, mime_type = _encode(model_image, has_alpha, quality)
+        if len(data) < len(original):
+            result["model_image"] = (data, mime_type)
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_edge, thumbnail_edge), Image.Resampling.LANCZOS)
+    result["thumbnail"] = _encode(thumbnail, has_alpha, quality)
+    return result
+
+
+def extract_pdf_text(path: str, max_chars: int) -> str | None:
+    """
+    PDF 텍스트 추출 (페이지 구분 표시, max_chars 에서 자름)
+
+    텍스트 레이어가 없는 스캔 PDF 는 None
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    parts: list[str] = []
+    total = 0
+    for number, page in enumerate(reader.pages, 1):
+        text = (page.extract_text() or "").strip()
+        if not text:
+            continue
+        part = f"[page {number}]\n{text}"
+        parts.append(part[:max_chars - total])
+        total += len(parts[-1])
+        if total >= max_chars:
+            break
+    return "\n\n".join(parts) or None
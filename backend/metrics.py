@@ -0,0 +1,242 @@
+"""
+Prometheus 메트릭 (text exposition format 0.0.4, 외부 의존성 없음)
+
+prometheus_client 와 같은 모양의 API 만 최소로 구현한다.
+    TTFT.labels(transport="ws").observe(0.42)
+    DB_LATENCY.labels(function="get_messages").observe(0.012)
+
+값 갱신은 이벤트 루프(단일 스레드)에서만 일어나므로 락을 쓰지 않는다.
+uvicorn 워커마다 값이 따로 쌓이므로 워커 여러 개면 워커(프로세스)별로 수집한다.
+"""
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable
+
+_REGISTRY: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """메트릭 공통 (이름 / 설명 / 레이블 → 자식 값)"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        _REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, **labels: str):
+        """레이블 값별 자식 (처음 쓰는 조합이면 생성)"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+            for key, child in self._children.items()
+        ]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """수집 시점에 값을 읽어 올 함수 (서비스 통계를 그대로 노출)"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """현재 값 (직접 설정 또는 수집 시점 콜백)"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def set_function(self, function: Callable[[], float]):
+        self._children[()].set_function(function)
+
+    def _samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.get())}"
+            for key, child in self._children.items()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def _samples(self) -> list[str]:
+        lines = []
+        bounds = [*self.buckets, float("inf")]
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+def render() -> str:
+    """등록된 전체 메트릭 (/metrics 응답 본문)"""
+    return "\n".join(metric.render() for metric in _REGISTRY) + "\n"
+
+
+def timed(histogram: Histogram):
+    """async 함수 실행 시간을 function 레이블로 기록하는 데코레이터"""
+    def decorator(fn):
+        child = histogram.labels(function=fn.__name__)
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+# ============================================
+# 채팅 파이프라인 메트릭
+# ============================================
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # starlette 가 charset=utf-8 추가
+
+TTFT = Histogram(
+    "msg_chat_ttft_seconds", "턴 시작부터 첫 응답 청크까지 (대기열 / 재시도 포함)",
+    ("transport",), buckets=(0.1, 0.25, 0.5, 0.75, 1, 1.5, 2, 3, 5, 10, 30)
+)
+TURN_DURATION = Histogram(
+    "msg_chat_turn_seconds", "응답 턴 전체 시간",
+    ("transport", "outcome"), buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300)
+)
+TOKENS_PER_SECOND = Histogram(
+    "msg_claude_output_tokens_per_second", "완료된 Claude 호출의 첫 토큰 이후 출력 속도",
+    buckets=(5, 10, 20, 30, 50, 75, 100, 150, 200, 300)
+)
+DB_LATENCY = Histogram(
+    "msg_db_call_seconds", "database.py 함수별 호출 시간",
+    ("function",), buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+UPLOAD_SIZE = Histogram(
+    "msg_upload_size_bytes", "업로드된 파일 크기",
+    buckets=(1024, 10240, 102400, 1048576, 5242880, 10485760, 52428800)
+)
+WEBSOCKET_CONNECTIONS = Gauge("msg_websocket_connections", "이 워커에 열린 WebSocket 연결")
+CLAUDE_IN_FLIGHT = Gauge("msg_claude_in_flight", "실행 중인 Claude 호출 (스케줄러 슬롯)")
+CLAUDE_WAITING = Gauge("msg_claude_waiting", "스케줄러 대기열의 Claude 호출")
+LOG_DROPPED = Counter("msg_log_dropped_total", "로그 큐가 가득 차 버린 레코드")
+BATCH_RESULTS = Counter("msg_batch_results_total", "수집한 배치 요청 결과 (succeeded / errored / canceled / expired)", ("result",))
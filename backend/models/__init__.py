@@ -3,11 +3,21 @@ from .user import UserProfile, UserProfileUpdate, AuthResponse
 from .conversation import (
     Message,
     MessageCreate,
+    MessagePage,
     Conversation,
+    ConversationSummary,
+    ConversationPage,
     ConversationCreate,
     ConversationWithMessages,
-    FileUpload
+    SearchResult,
+    SearchPage,
+    ConversationBulkDelete,
+    DeletionJob,
+    ImportResult,
+    FileUpload,
+    FileUploadResult
 )
+from .batch import BatchItemCreate, BatchJobCreate, BatchJob, BatchItem
 
 __all__ = [
     "UserProfile",
@@ -15,8 +25,21 @@ __all__ = [
     "AuthResponse",
     "Message",
     "MessageCreate",
+    "MessagePage",
     "Conversation",
+    "ConversationSummary",
+    "ConversationPage",
     "ConversationCreate",
     "ConversationWithMessages",
-    "FileUpload"
+    "SearchResult",
+    "SearchPage",
+    "ConversationBulkDelete",
+    "DeletionJob",
+    "ImportResult",
+    "FileUpload",
+    "FileUploadResult",
+    "BatchItemCreate",
+    "BatchJobCreate",
+    "BatchJob",
+    "BatchItem"
 ]
@@ -0,0 +1,43 @@
+"""배치 작업 관련 Pydantic 모델"""
+from typing import Literal
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class BatchItemCreate(BaseModel):
+    """배치 항목 (대화 하나에 대한 요청)"""
+    conversation_id: str
+    prompt: str | None = Field(None, min_length=1)  # prompt 작업에서 필수, summarize 작업은 무시
+
+
+class BatchJobCreate(BaseModel):
+    """배치 작업 생성 요청"""
+    kind: Literal["prompt", "summarize"] = "prompt"
+    items: list[BatchItemCreate] = Field(..., min_length=1)
+
+
+class BatchJob(BaseModel):
+    """배치 작업 상태"""
+    id: str
+    kind: str  # 'prompt' | 'summarize'
+    status: str  # 'queued' | 'submitting' | 'submitted' | 'collecting' | 'ended' | 'failed' | 'cancelled'
+    total: int
+    succeeded: int = 0
+    errored: int = 0
+    canceled: int = 0
+    expired: int = 0
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    submitted_at: datetime | None = None
+    ended_at: datetime | None = None
+
+
+class BatchItem(BaseModel):
+    """배치 항목 상태"""
+    id: str
+    job_id: str
+    conversation_id: str
+    prompt: str | None = None
+    status: str  # 'pending' | 'succeeded' | 'errored' | 'canceled' | 'expired'
+    error: str | None = None
@@ -1,5 +1,5 @@
 """대화 관련 Pydantic 모델"""
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
@@ -9,6 +9,7 @@ class Message(BaseModel):
     conversation_id: str
     role: str  # 'user' | 'assistant' | 'system'
     content: str
+    truncated: bool = False  # 취소/연결 끊김으로 중간에 멈춘 응답
     created_at: datetime
 
 
@@ -28,6 +29,21 @@ class Conversation(BaseModel):
     updated_at: datetime
 
 
+class ConversationSummary(BaseModel):
+    """대화 목록 항목 (목록 화면용 컬럼만)"""
+    id: str
+    title: str
+    created_at: datetime
+    updated_at: datetime
+
+
+class ConversationPage(BaseModel):
+    """대화 목록 페이지 (키셋 페이지네이션)"""
+    items: list[ConversationSummary]
+    next_cursor: str | None = None  # before= 로 전달 → 더 오래된 대화
+    prev_cursor: str | None = None  # after= 로 전달 → 더 최근 대화
+
+
 class ConversationCreate(BaseModel):
     """대화 생성 요청"""
     title: str = "New Conversation"
@@ -38,12 +54,74 @@ class ConversationWithMessages(Conversation):
     messages: list[Message] = []
 
 
+class MessagePage(BaseModel):
+    """메시지 페이지 (키셋 페이지네이션, 시간순)"""
+    items: list[Message]
+    next_cursor: str | None = None  # before= 로 전달 → 더 오래된 메시지
+    prev_cursor: str | None = None  # after= 로 전달 → 더 새로운 메시지
+
+
+class SearchResult(BaseModel):
+    """검색 결과 항목 (본문 대신 하이라이트된 발췌)"""
+    id: str
+    conversation_id: str
+    conversation_title: str
+    role: str
+    snippet: str  # HTML 이스케이프된 발췌, 일치 부분은 <mark>...</mark>
+    truncated: bool = False
+    created_at: datetime
+    rank: float
+
+
+class SearchPage(BaseModel):
+    """검색 결과 페이지 (관련도순, 키셋 페이지네이션)"""
+    items: list[SearchResult]
+    next_cursor: str | None = None  # cursor= 로 전달 → 다음 결과
+
+
+class ConversationBulkDelete(BaseModel):
+    """대화 일괄 삭제 요청"""
+    conversation_ids: list[str] = Field(..., min_length=1)
+
+
+class DeletionJob(BaseModel):
+    """대화 삭제 작업 진행 상황"""
+    id: str
+    status: str  # 'deleting' | 'purging' | 'done' | 'failed'
+    total: int  # 요청한 대화 수
+    deleted: int = 0  # 삭제된 대화 수 (없거나 남의 대화 제외)
+    files_removed: int = 0  # 정리 단계에서 지운 Storage 객체 수
+    error: str | None = None
+    created_at: datetime
+    updated_at: datetime
+    finished_at: datetime | None = None
+
+
+class ImportResult(BaseModel):
+    """히스토리 가져오기 결과"""
+    conversations: int
+    messages: int
+    skipped: int = 0  # 형식이 틀려 건너뛴 줄
+    errors: list[str] = []  # 건너뛴 줄 사유 (앞쪽 일부만)
+
+
 class FileUpload(BaseModel):
     """파일 업로드 정보"""
     id: str
-    message_id: str
+    message_id: str | None = None  # 메시지에 첨부되기 전이면 None
     file_name: str
     file_path: str
     file_size: int
     mime_type: str
+    sha256: str | None = None
+    width: int | None = None  # 이미지 원본 크기 (전처리했을 때만)
+    height: int | None = None
+    thumbnail_path: str | None = None
     created_at: datetime
+
+
+class FileUploadResult(FileUpload):
+    """업로드 응답"""
+    public_url: str | None = None
+    thumbnail_url: str | None = None
+    deduplicated: bool = False  # 같은 내용이 이미 있어 Storage 업로드 생략
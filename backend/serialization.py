@@ -0,0 +1,43 @@
+"""JSON 직렬화 - orjson 이 있으면 사용 (HTTP 응답 / WebSocket 프레임 / 허브 페이로드)"""
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+
+    loads = orjson.loads
+
+    def dumps(obj: Any) -> str:
+        """JSON 문자열 (UTF-8 그대로, 공백 없음)"""
+        return orjson.dumps(obj).decode()
+else:
+    FastJSONResponse = JSONResponse
+
+    loads = json.loads
+
+    def dumps(obj: Any) -> str:
+        """JSON 문자열 (UTF-8 그대로, 공백 없음)"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+async def send_json(websocket, data: Any):
+    """WebSocket 텍스트 프레임 전송 (websocket.send_json 대체)"""
+    await websocket.send_text(dumps(data))
+
+
+def trusted_response(content: Any, status_code: int = 200) -> JSONResponse:
+    """
+    우리 DB 에서 바로 읽은 행으로 만든 응답 (검증 생략)
+
+    select 컬럼이 response_model 필드와 같고 값도 이미 JSON 타입이므로
+    Pydantic 검증 / jsonable_encoder 를 거치지 않고 바로 직렬화한다.
+    엔드포인트의 response_model 은 OpenAPI 문서용으로 유지한다.
+    사용자 입력이나 외부 API 응답에는 쓰지 않는다.
+    """
+    return FastJSONResponse(content, status_code=status_code)
@@ -1,10 +1,56 @@
 """서비스 패키지"""
 from .claude_service import ClaudeService, get_claude_service
-from .storage_service import StorageService, get_storage_service
+from .storage_service import (
+    StorageService,
+    get_storage_service,
+    FileTooLargeError,
+    FileTypeNotAllowedError
+)
+from .auth_service import AuthService, get_auth_service
+from .message_writer import MessageWriter, get_message_writer
+from .response_cache import ResponseCache, get_response_cache
+from .scheduler import ClaudeScheduler, get_scheduler
+from .hub import ConnectionHub, get_hub
+from .replay_buffer import ReplayBuffer, get_replay_buffer, TurnExpiredError
+from .health import HealthChecker, get_health_checker
+from .profile_cache import ProfileCache, get_profile_cache
+from .batch_service import BatchService, get_batch_service, BatchConversationNotFoundError
+from .deletion_service import DeletionService, get_deletion_service
+from .attachment_service import AttachmentService, get_attachment_service, AttachmentError
+from .preprocess_service import PreprocessService, get_preprocess_service
 
 __all__ = [
     "ClaudeService",
     "get_claude_service",
     "StorageService",
-    "get_storage_service"
+    "get_storage_service",
+    "FileTooLargeError",
+    "FileTypeNotAllowedError",
+    "AuthService",
+    "get_auth_service",
+    "MessageWriter",
+    "get_message_writer",
+    "ResponseCache",
+    "get_response_cache",
+    "ClaudeScheduler",
+    "get_scheduler",
+    "ConnectionHub",
+    "get_hub",
+    "ReplayBuffer",
+    "get_replay_buffer",
+    "TurnExpiredError",
+    "HealthChecker",
+    "get_health_checker",
+    "ProfileCache",
+    "get_profile_cache",
+    "BatchService",
+    "get_batch_service",
+    "BatchConversationNotFoundError",
+    "DeletionService",
+    "get_deletion_service",
+    "AttachmentService",
+    "get_attachment_service",
+    "AttachmentError",
+    "PreprocessService",
+    "get_preprocess_service"
 ]
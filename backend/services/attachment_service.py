@@ -0,0 +1,357 @@
+"""첨부 파일 → Claude content block (내용 주소 캐시: 메모리 + 로컬 디스크, LRU)"""
+import asyncio
+import base64
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable
+import httpx
+from config import get_settings
+from database import get_user_files
+from log import get_logger
+from serialization import dumps, loads
+from services.storage_service import get_storage_service
+
+logger = get_logger(__name__)
+
+# Files API 를 쓰는 요청에 붙이는 베타 헤더
+FILES_API_BETA = "files-api-2025-04-14"
+
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+PDF_TYPE = "application/pdf"
+# 텍스트 문서 블록으로 보내는 형식 (Anthropic 에는 text/plain 으로 전달)
+TEXT_TYPES = {"text/plain", "text/csv", "application/json"}
+_MEDIA_ALIASES = {"image/jpg": "image/jpeg"}
+
+
+class AttachmentError(ValueError):
+    """첨부 파일을 찾을 수 없거나 지원하지 않는 형식"""
+
+
+def _media_type(mime_type: str | None) -> str | None:
+    if not mime_type:
+        return None
+    mime_type = mime_type.split(";")[0].strip().lower()
+    return _MEDIA_ALIASES.get(mime_type, mime_type)
+
+
+class _DiskCache:
+    """
+    로컬 디스크 LRU (키 = 내용 해시, 값 = 직렬화된 content block)
+
+    파일 mtime 을 사용 시각으로 써서 재시작 후에도 LRU 순서를 이어 간다.
+    쓰기는 임시 파일 → rename 이라 워커 여러 개가 같은 디렉터리를 써도 안전하다.
+    (용량 상한은 워커별로 따로 계산하므로 대략적인 값)
+
+    get / put 은 여러 스레드에서 동시에 실행되므로 인덱스 / 바이트 합계 / 내보내기는
+    _lock 안에서만 바꾼다. (캐시 파일 읽기 / 쓰기 자체는 잠금 밖)
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] | None = None  # 키 → 바이트 (오래된 것부터)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        # 스레드 풀에서 _lock 을 잡고 실행 (처음 한 번 디렉터리 스캔)
+        if self._entries is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.name[:-5], stat.st_size))
+        self._entries = OrderedDict((key, size) for _, key, size in sorted(found))
+        self._bytes = sum(self._entries.values())
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # 다른 워커(또는 이 프로세스의 동시 put)가 내보냄
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._bytes -= size
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return data
+
+    def _put(self, key: str, data: bytes):
+        with self._lock:
+            self._load_index()
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+
+        with self._lock:
+            self._bytes += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            # 파일 삭제도 잠금 안에서 (같은 키를 동시에 다시 넣은 파일을 지우지 않도록)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                old_key, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                try:
+                    os.remove(self._path(old_key))
+                except FileNotFoundError:
+                    pass
+
+    async def get(self, key: str) -> bytes | None:
+        return await asyncio.to_thread(self._get, key)
+
+    async def put(self, key: str, data: bytes):
+        await asyncio.to_thread(self._put, key, data)
+
+    def get_stats(self) -> dict:
+        return {"entries": len(self._entries or ()), "bytes": self._bytes}
+
+
+class AttachmentService:
+    """
+    chat-files 버킷의 첨부 파일을 Anthropic content block 으로 변환
+
+    - 이미지 → image 블록, PDF → document 블록 (base64), 텍스트 → text document 블록
+    - 업로드 전처리 결과가 있으면 축소 이미지 / PDF 추출 텍스트(attachment_pdf_text)를 대신 보냄
+    - 파일 여러 개를 동시에 받되 attachment_fetch_concurrency 로 제한
+    - 변환 결과는 내용 해시(files.sha256) 키로 메모리 LRU → 디스크 LRU 순으로 캐시
+      → 같은 파일을 다음 턴에 다시 보내도 다운로드 / base64 인코딩을 하지 않음
+    - 같은 파일을 동시에 요청하면 진행 중인 변환 하나를 함께 기다림
+    - attachment_mode=files_api: 파일을 Anthropic Files API 에 한 번 올리고 file_id 로 참조
+      (요청마다 base64 본문을 보내지 않음, 캐시에는 file_id 만 저장)
+    - 해시 / base64 / 직렬화는 스레드 풀에서 실행 (이벤트 루프 블로킹 방지)
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.mode = settings.attachment_mode
+        self.max_files = settings.attachment_max_files
+        self.pdf_text = settings.attachment_pdf_text
+        self.memory_limit = settings.attachment_cache_memory_mb * 1024 * 1024
+        self.files_url = f"{settings.anthropic_base_url.rstrip('/')}/v1/files"
+        self.api_key = settings.anthropic_api_key
+        self.timeout = settings.claude_timeout
+        directory = settings.attachment_cache_dir or os.path.join(tempfile.gettempdir(), "msg-attachments")
+        self._disk = _DiskCache(directory, settings.attachment_cache_disk_mb * 1024 * 1024)
+        self._fetch_slots = asyncio.Semaphore(max(settings.attachment_fetch_concurrency, 1))
+
+        self._memory: OrderedDict[str, tuple[int, dict]] = OrderedDict()
+        self._memory_bytes = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._client: httpx.AsyncClient | None = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "downloads": 0,
+            "downloaded_bytes": 0,
+            "encodes": 0,
+            "files_api_uploads": 0,
+        }
+
+    @property
+    def uses_files_api(self) -> bool:
+        return self.mode == "files_api"
+
+    async def blocks(self, user_id: str, file_paths: list[str]) -> list[dict]:
+        """
+        첨부 경로 → content block 목록 (요청 순서, 같은 경로는 한 번)
+
+        user_id 는 인증된 사용자 (요청 바디 값이 아님) - 그 사용자의 files 행이 있는
+        경로만 읽는다.
+
+        Raises:
+            AttachmentError: 다른 사용자의 경로 / 없는 파일 / 지원하지 않는 형식 / 개수 초과
+        """
+        paths = list(dict.fromkeys(file_paths))
+        if len(paths) > self.max_files:
+            raise AttachmentError(f"Too many attachments (max {self.max_files})")
+        for path in paths:
+            # 업로드 경로는 항상 {user_id}/ 로 시작 (storage_service)
+            if not path.startswith(f"{user_id}/") or ".." in path.split("/"):
+                raise AttachmentError(f"Attachment not found: {path}")
+        rows = {row["file_path"]: row for row in await get_user_files(user_id, paths)}
+        for path in paths:
+            # 경로 모양만으로 Storage 를 읽지 않음 - 업로드 때 만든 소유 행이 있어야 함
+            if path not in rows:
+                raise AttachmentError(f"Attachment not found: {path}")
+        return list(await asyncio.gather(*(self._block(path, rows[path]) for path in paths)))
+
+    async def _block(self, path: str, row: dict) -> dict:
+        media_type = _media_type(row["mime_type"] or mimetypes.guess_type(path)[0])
+        if media_type not in IMAGE_TYPES and media_type != PDF_TYPE and media_type not in TEXT_TYPES:
+            raise AttachmentError(f"Unsupported attachment type: {media_type or 'unknown'}")
+
+        # 업로드 때 만든 파생 파일이 있으면 그쪽을 보냄 (축소 이미지 / PDF 추출 텍스트)
+        variant = ""
+        if row.get("model_image_path") and media_type in IMAGE_TYPES:
+            path, variant = row["model_image_path"], "model"
+            media_type = _media_type(mimetypes.guess_type(path)[0])
+        elif row.get("text_path") and media_type == PDF_TYPE and self.pdf_text:
+            path, media_type, variant = row["text_path"], "text/plain", "text"
+
+        digest = row.get("sha256")
+        if digest:
+            key = self._cache_key(digest, variant)
+            return await self._single_flight(key, lambda: self._build(path, media_type, key))
+        # 해시를 모르는 예전 업로드 - 받아서 해시를 구한 뒤 같은 캐시 사용
+        return await self._single_flight(f"path:{path}", lambda: self._build(path, media_type, None))
+
+    def _cache_key(self, digest: str, variant: str = "") -> str:
+        # 모드마다 블록 모양이 다름 (base64 본문 / file_id), 파생 파일은 원본 해시 + 종류
+        return f"{self.mode}-{digest}.{variant}" if variant else f"{self.mode}-{digest}"
+
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[dict]]) -> dict:
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(factory())
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _build(self, path: str, media_type: str, key: str | None) -> dict:
+        if key:
+            cached = await self._cached(key)
+            if cached is not None:
+                return cached
+
+        data = await self._download(path)
+        if key is None:
+            key = self._cache_key(await asyncio.to_thread(lambda: hashlib.sha256(data).hexdigest()))
+            cached = await self._cached(key)
+            if cached is not None:
+                return cached
+
+        if self.uses_files_api:
+            block = await self._upload_block(path, media_type, data)
+        else:
+            block = await asyncio.to_thread(self._encode_block, media_type, data)
+        self._stats["encodes"] += 1
+        await self._store(key, block)
+        return block
+
+    async def _download(self, path: str) -> bytes:
+        async with self._fetch_slots:
+            data = await get_storage_service().download_file(path)
+        if data is None:
+            raise AttachmentError(f"Attachment not found: {path}")
+        self._stats["downloads"] += 1
+        self._stats["downloaded_bytes"] += len(data)
+        return data
+
+    @staticmethod
+    def _encode_block(media_type: str, data: bytes) -> dict:
+        """base64 / 텍스트 블록 (스레드 풀에서 실행)"""
+        if media_type in TEXT_TYPES:
+            return {
+                "type": "document",
+                "source": {"type": "text", "media_type": "text/plain", "data": data.decode("utf-8", "replace")}
+            }
+        return {
+            "type": "image" if media_type in IMAGE_TYPES else "document",
+            "source": {"type": "base64", "media_type": media_type, "data": base64.b64encode(data).decode("ascii")}
+        }
+
+    async def _upload_block(self, path: str, media_type: str, data: bytes) -> dict:
+        """Files API 업로드 → file_id 참조 블록"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=10.0))
+        upload_type = "text/plain" if media_type in TEXT_TYPES else media_type
+        async with self._fetch_slots:
+            response = await self._client.post(
+                self.files_url,
+                headers={
+                    "x-api-key": self.api_key,
+                    "anthropic-version": "2023-06-01",
+                    "anthropic-beta": FILES_API_BETA
+                },
+                files={"file": (os.path.basename(path), data, upload_type)}
+            )
+        if response.is_error:
+            logger.error("Files API upload failed", extra={"status": response.status_code, "body": response.text})
+            raise AttachmentError(f"Attachment upload failed: HTTP {response.status_code}")
+        self._stats["files_api_uploads"] += 1
+        return {
+            "type": "image" if media_type in IMAGE_TYPES else "document",
+            "source": {"type": "file", "file_id": response.json()["id"]}
+        }
+
+    async def _cached(self, key: str) -> dict | None:
+        """메모리 → 디스크 순 조회 (디스크 적중은 메모리로 올림)"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return entry[1]
+        raw = await self._disk.get(key)
+        if raw is None:
+            return None
+        block = await asyncio.to_thread(loads, raw)
+        self._stats["disk_hits"] += 1
+        self._remember(key, block, len(raw))
+        return block
+
+    async def _store(self, key: str, block: dict):
+        raw = await asyncio.to_thread(lambda: dumps(block).encode())
+        self._remember(key, block, len(raw))
+        try:
+            await self._disk.put(key, raw)
+        except OSError as e:
+            logger.warning("Attachment disk cache write failed", extra={"error": str(e)})
+
+    def _remember(self, key: str, block: dict, size: int):
+        if size > self.memory_limit:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[0]
+        self._memory[key] = (size, block)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_limit:
+            _, (old_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= old_size
+
+    async def aclose(self):
+        """Files API 클라이언트 종료"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def get_stats(self) -> dict:
+        """캐시 적중 / 다운로드 / 인코딩 통계"""
+        return {
+            **self._stats,
+            "mode": self.mode,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk": self._disk.get_stats(),
+        }
+
+
+# 싱글톤 인스턴스
+_attachment_service = None
+
+
+def get_attachment_service() -> AttachmentService:
+    """Attachment Service 싱글톤"""
+    global _attachment_service
+    if _attachment_service is None:
+        _attachment_service = AttachmentService()
+    return _attachment_service
@@ -0,0 +1,208 @@
+"""인증 서비스 - JWT 로컬 검증 + 검증 결과 캐시"""
+import hashlib
+import time
+from collections import OrderedDict
+import httpx
+from jose import jwt, JWTError
+from config import get_settings
+from database import verify_user_token
+from log import get_logger
+
+logger = get_logger(__name__)
+
+# 기본값 그대로면 로컬 HS256 검증을 하지 않는다
+_DEFAULT_JWT_SECRET = "change_this_in_production"
+# JWKS 검증에 허용하는 비대칭 알고리즘 (토큰 헤더의 alg 를 그대로 믿지 않음)
+_JWKS_ALGORITHMS = frozenset({"RS256", "RS384", "RS512", "ES256", "ES384", "ES512"})
+# 모르는 kid 로 인한 JWKS 재조회 최소 간격 (초)
+_JWKS_MIN_REFETCH_INTERVAL = 60.0
+
+
+class AuthService:
+    """
+    Supabase JWT 검증
+
+    1. HS256 시크릿 또는 JWKS(캐시)로 로컬 검증
+    2. 로컬 검증 수단이 없을 때만 Supabase Auth 서버 호출 (폴백)
+
+    검증된 토큰은 토큰 해시를 키로 TTL 캐시에 보관하며, 캐시 만료는
+    토큰의 exp 를 넘지 않는다. sub 가 없는 토큰은 거부한다.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.secret = settings.jwt_secret
+        self.algorithm = settings.jwt_algorithm
+        self.audience = settings.jwt_audience
+        self.jwks_url = settings.jwt_jwks_url
+        self.cache_ttl = settings.auth_cache_ttl
+        self.cache_max_entries = settings.auth_cache_max_entries
+
+        self._cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._jwks: dict | None = None
+        self._jwks_fetched_at = 0.0
+        self._jwks_attempted_at = 0.0
+        self._stats = {"cache_hits": 0, "local": 0, "remote": 0, "rejected": 0}
+
+    async def verify(self, token: str) -> dict | None:
+        """토큰 검증 후 사용자 정보 반환 (실패 시 None)"""
+        key = hashlib.sha256(token.encode()).hexdigest()
+        now = time.time()
+
+        cached = self._cache.get(key)
+        if cached:
+            expires_at, user = cached
+            if expires_at > now:
+                self._cache.move_to_end(key)
+                self._stats["cache_hits"] += 1
+                return user
+            del self._cache[key]
+
+        try:
+            claims = await self._verify_local(token)
+        except JWTError as e:
+            # 서명/만료 오류는 원격 호출 없이 바로 거부
+            logger.info("Token verification failed", extra={"error": str(e)})
+            self._stats["rejected"] += 1
+            return None
+
+        if claims is not None:
+            self._stats["local"] += 1
+            user = self._user_from_claims(claims)
+            exp = claims.get("exp")
+        else:
+            # 로컬 검증 수단 없음 → Supabase Auth 폴백
+            remote_user = await verify_user_token(token)
+            user = self._user_from_remote(remote_user) if remote_user else None
+            if not user or not user["id"]:
+                self._stats["rejected"] += 1
+                return None
+            self._stats["remote"] += 1
+            try:
+                exp = jwt.get_unverified_claims(token).get("exp")
+            except JWTError:
+                exp = None
+
+        self._store(key, user, exp, now)
+        return user
+
+    async def _verify_local(self, token: str) -> dict | None:
+        """
+        로컬 검증
+
+        Returns:
+            검증된 claims, 로컬 검증이 불가능하면 None
+
+        Raises:
+            JWTError: 서명 불일치, 만료 등 잘못된 토큰
+        """
+        header = jwt.get_unverified_header(token)
+        alg = header.get("alg")
+
+        if alg and alg.startswith("HS"):
+            if self.secret == _DEFAULT_JWT_SECRET:
+                return None
+            claims = jwt.decode(
+                token,
+                self.secret,
+                algorithms=[self.algorithm],
+                audience=self.audience
+            )
+        else:
+            if not self.jwks_url:
+                return None
+
+            key = await self._get_jwk(header.get("kid"))
+            if key is None:
+                # JWKS 를 받아 두었는데 없는 kid 면 원격 폴백 없이 거부
+                if self._jwks is not None:
+                    raise JWTError("Unknown signing key")
+                return None
+            # 알고리즘은 키(JWK)가 정한다 - 키에 alg 가 없으면 허용 목록 안에서만
+            algorithm = key.get("alg") or alg
+            if algorithm not in _JWKS_ALGORITHMS or alg != algorithm:
+                raise JWTError(f"Algorithm not allowed: {alg}")
+            claims = jwt.decode(token, key, algorithms=[algorithm], audience=self.audience)
+
+        if not claims.get("sub"):
+            raise JWTError("Token has no sub claim")
+        return claims
+
+    async def _get_jwk(self, kid: str | None) -> dict | None:
+        """JWKS 조회 (캐시, 모르는 kid 면 재조회 - 최소 간격 제한)"""
+        now = time.time()
+        stale = now - self._jwks_fetched_at > self.cache_ttl
+        needed = self._jwks is None or stale or not self._find_jwk(kid)
+        if needed and now - self._jwks_attempted_at >= _JWKS_MIN_REFETCH_INTERVAL:
+            self._jwks_attempted_at = now
+            try:
+                async with httpx.AsyncClient(timeout=5.0) as client:
+                    response = await client.get(self.jwks_url)
+                    response.raise_for_status()
+                    self._jwks = response.json()
+                    self._jwks_fetched_at = time.time()
+            except Exception as e:
+                logger.error("Failed to fetch JWKS", extra={"error": str(e)})
+        return self._find_jwk(kid)
+
+    def _find_jwk(self, kid: str | None) -> dict | None:
+        if not self._jwks:
+            return None
+        for key in self._jwks.get("keys", []):
+            if kid is None or key.get("kid") == kid:
+                return key
+        return None
+
+    def _store(self, key: str, user: dict, exp: int | None, now: float):
+        expires_at = now + self.cache_ttl
+        if exp:
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now:
+            return
+        self._cache[key] = (expires_at, user)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_max_entries:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, token: str):
+        """특정 토큰 캐시 제거 (로그아웃 등)"""
+        self._cache.pop(hashlib.sha256(token.encode()).hexdigest(), None)
+
+    def get_stats(self) -> dict:
+        """검증 경로별 통계"""
+        return {**self._stats, "cached_tokens": len(self._cache)}
+
+    @staticmethod
+    def _user_from_claims(claims: dict) -> dict:
+        metadata = claims.get("user_metadata") or {}
+        return {
+            "id": claims.get("sub"),
+            "email": claims.get("email"),
+            "role": claims.get("role"),
+            "display_name": metadata.get("display_name") or metadata.get("full_name"),
+            "user_metadata": metadata
+        }
+
+    @staticmethod
+    def _user_from_remote(user) -> dict:
+        data = user.model_dump() if hasattr(user, "model_dump") else dict(user)
+        metadata = data.get("user_metadata") or {}
+        return {
+            "id": data.get("id"),
+            "email": data.get("email"),
+            "role": data.get("role"),
+            "display_name": metadata.get("display_name") or metadata.get("full_name"),
+            "user_metadata": metadata
+        }
+
+
+# 싱글톤 인스턴스
+_auth_service = None
+
+
+def get_auth_service() -> AuthService:
+    """Auth Service 싱글톤"""
+    global _auth_service
+    if _auth_service is None:
+        _auth_service = AuthService()
+    return _auth_service
@@ -0,0 +1,519 @@
+"""배치 작업 서비스 - Anthropic Message Batches API 로 비대화형 일괄 처리"""
+import asyncio
+import random
+import uuid
+from collections import defaultdict, deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator
+import httpx
+from config import get_settings
+from database import (
+    create_batch_job,
+    get_batch_job,
+    get_batch_jobs_by_status,
+    get_batch_items,
+    get_conversation_messages,
+    encode_cursor,
+    save_messages,
+    transition_batch_jobs,
+    RowsRejectedError,
+    update_batch_items,
+    BATCH_JOB_COLUMNS
+)
+from log import get_logger
+from metrics import BATCH_RESULTS
+from serialization import dumps, loads
+from services.context_builder import estimate_tokens, get_context_builder
+
+logger = get_logger(__name__)
+
+# Anthropic 배치 결과 타입 (batch_items.status / batch_jobs 카운트 컬럼과 같은 이름)
+RESULT_TYPES = ("succeeded", "errored", "canceled", "expired")
+# 요청 구성 시 동시에 읽을 대화 히스토리 수 (대화형 요청의 DB 스레드를 다 쓰지 않도록)
+_HISTORY_CONCURRENCY = 4
+# 한 주기에 살펴볼 대기 / 제출된 작업 수
+_JOB_SCAN_LIMIT = 500
+# 요약용 대화록의 역할 표시
+_TRANSCRIPT_ROLES = {"user": "사용자", "assistant": "AI"}
+
+
+class BatchConversationNotFoundError(Exception):
+    """항목의 대화가 없거나 요청한 사용자의 대화가 아님"""
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class BatchService:
+    """
+    비대화형 작업(대화 요약, 저장된 프롬프트 재답변)을 Message Batches 로 처리
+
+    - create_job(): 작업 + 항목을 저장만 하고 바로 반환 (상태 queued)
+    - 워커 주기(batch_poll_interval)마다
+      1. 대기 작업 여러 개를 Anthropic 배치 하나로 묶어 제출 (batch_max_requests 까지)
+      2. 제출된 배치 상태를 확인하고, 끝난 배치의 결과(JSONL)를 스트리밍으로 읽어
+         messages 에 batch_write_size 단위로 일괄 저장
+    - 상태 전이는 조건부 UPDATE 라서 uvicorn 워커 여러 개가 같이 돌아도
+      작업 하나는 한 워커만 제출 / 수집한다.
+    - 결과 메시지 id 는 항목 id 에서 만들어지므로 같은 배치를 다시 수집해도 중복 저장되지 않는다.
+    - summarize 는 최근 히스토리 창이 아니라 대화 전체를 페이지 단위로 읽어 대화록으로 요청
+      (batch_summary_max_tokens 를 넘으면 앞/뒤를 남기고 중간 생략)
+
+    대화형 채팅과 HTTP 클라이언트 / 스케줄러 슬롯을 공유하지 않는다.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.api_key = settings.anthropic_api_key
+        self.batches_url = f"{settings.anthropic_base_url.rstrip('/')}/v1/messages/batches"
+        self.poll_interval = settings.batch_poll_interval
+        self.max_requests = settings.batch_max_requests
+        self.max_tokens = settings.batch_max_tokens
+        self.write_size = settings.batch_write_size
+        self.stale_timeout = settings.batch_stale_timeout
+        self.summary_prompt = settings.batch_summary_prompt
+        self.history_limit = settings.context_max_messages
+        self.summary_page_size = settings.batch_summary_page_size
+        self.summary_max_tokens = settings.batch_summary_max_tokens
+        self.timeout = settings.claude_timeout
+        self.max_retries = settings.message_max_retries
+        self.retry_base_delay = settings.message_retry_base_delay
+
+        self._client: httpx.AsyncClient | None = None
+        self._task: asyncio.Task | None = None
+        self._stats = {
+            "jobs_created": 0,
+            "batches_submitted": 0,
+            "requests_submitted": 0,
+            "submit_failures": 0,
+            "polls": 0,
+            "batches_collected": 0,
+            "messages_written": 0,
+            "write_failures": 0,
+            "recovered_jobs": 0,
+            "summaries_truncated": 0,
+        }
+
+    # --- Anthropic Message Batches API ---
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """배치 전용 AsyncClient (대화형 스트림의 커넥션 풀과 분리)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+                limits=httpx.Limits(max_connections=4, max_keepalive_connections=2)
+            )
+        return self._client
+
+    async def aclose(self):
+        """배치 클라이언트 종료"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _headers(self) -> dict:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+
+    async def _create_batch(self, requests: list[dict]) -> dict:
+        response = await self._get_client().post(
+            self.batches_url,
+            headers=self._headers(),
+            content=dumps({"requests": requests}).encode()
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def _get_batch(self, batch_id: str) -> dict:
+        response = await self._get_client().get(f"{self.batches_url}/{batch_id}", headers=self._headers())
+        response.raise_for_status()
+        return response.json()
+
+    async def _results(self, batch: dict) -> AsyncGenerator[dict, None]:
+        """결과 JSONL 을 한 줄씩 (전체를 메모리에 올리지 않음)"""
+        url = batch.get("results_url") or f"{self.batches_url}/{batch['id']}/results"
+        async with self._get_client().stream("GET", url, headers=self._headers()) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield loads(line)
+
+    # --- 작업 생성 / 취소 ---
+
+    async def create_job(self, user_id: str, kind: str, items: list[dict]) -> dict | None:
+        """
+        작업 저장 (워커가 다음 주기에 다른 대기 작업과 묶어 제출)
+
+        Args:
+            kind: "prompt" (항목의 prompt 로 재답변) | "summarize" (대화 요약)
+            items: conversation_id / prompt 목록
+
+        Returns:
+            작업 행 (DB 오류면 None)
+
+        Raises:
+            BatchConversationNotFoundError: 사용자 소유가 아닌 대화가 있음
+        """
+        job_id = str(uuid.uuid4())
+        created = await create_batch_job(
+            {"id": job_id, "user_id": user_id, "kind": kind},
+            [
+                {
+                    "id": str(uuid.uuid4()),
+                    "conversation_id": item["conversation_id"],
+                    "prompt": item.get("prompt") if kind == "prompt" else None
+                }
+                for item in items
+            ]
+        )
+        if created is None:
+            return None
+        if not created:
+            raise BatchConversationNotFoundError(user_id)
+        self._stats["jobs_created"] += 1
+        return await get_batch_job(job_id, BATCH_JOB_COLUMNS)
+
+    async def cancel_job(self, job_id: str) -> bool:
+        """
+        제출 전(queued) 작업 취소
+
+        제출된 작업은 같은 Anthropic 배치에 다른 작업이 함께 묶여 있을 수 있어 취소하지 않는다.
+        """
+        return bool(await transition_batch_jobs(
+            "queued", "cancelled", job_ids=[job_id], changes={"ended_at": _utcnow().isoformat()}
+        ))
+
+    # --- 워커 ---
+
+    def start(self):
+        """워커 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        워커 종료 + 클라이언트 정리
+
+        수집 도중 멈춘 작업은 collecting 상태로 남고, batch_stale_timeout 뒤
+        (이 워커든 다른 워커든) 다시 수집한다.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.aclose()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.error("Batch worker cycle failed", exc_info=True)
+            # 주기 사이에 들어온 작업은 다음 주기에 한 배치로 묶인다
+            await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self):
+        """워커 한 주기: 멈춘 작업 회수 → 대기 작업 제출 → 끝난 배치 수집"""
+        await self._recover_stale()
+        while await self._submit_next():
+            pass
+        await self._collect_ended()
+
+    async def _recover_stale(self):
+        """
+        제출 / 수집 도중 워커가 죽어 멈춘 작업을 이전 상태로 되돌림
+
+        submitting 은 Anthropic 배치 생성 직후에 죽었다면 다시 제출될 수 있다.
+        (배치 API 에 멱등 키가 없음 - 결과 메시지는 항목 id 로 중복 저장되지 않음)
+        """
+        stale_before = (_utcnow() - timedelta(seconds=self.stale_timeout)).isoformat()
+        for from_status, to_status in (("submitting", "queued"), ("collecting", "submitted")):
+            recovered = await transition_batch_jobs(from_status, to_status, stale_before=stale_before)
+            if recovered:
+                self._stats["recovered_jobs"] += len(recovered)
+                logger.warning("Recovered stale batch jobs", extra={
+                    "from_status": from_status, "jobs": len(recovered)
+                })
+
+    async def _submit_next(self) -> bool:
+        """대기 작업을 max_requests 까지 묶어 배치 하나로 제출 (제출했으면 True)"""
+        queued = await get_batch_jobs_by_status("queued", _JOB_SCAN_LIMIT, columns="id,total")
+        group, size = [], 0
+        for job in queued:
+            if group and size + job["total"] > self.max_requests:
+                break
+            group.append(job["id"])
+            size += job["total"]
+        if not group:
+            return False
+
+        jobs = await transition_batch_jobs("queued", "submitting", job_ids=group)
+        if not jobs:
+            return False  # 다른 워커가 가져감
+        job_ids = [job["id"] for job in jobs]
+
+        try:
+            requests = await self._build_requests(jobs)
+            batch = await self._create_batch(requests)
+        except httpx.HTTPStatusError as e:
+            self._stats["submit_failures"] += 1
+            status = e.response.status_code
+            logger.error("Batch submit failed", extra={"status": status, "body": e.response.text, "jobs": len(job_ids)})
+            if status == 429 or status >= 500:
+                await transition_batch_jobs("submitting", "queued", job_ids=job_ids)
+            else:
+                await transition_batch_jobs("submitting", "failed", job_ids=job_ids, changes={
+                    "error": f"HTTP {status}: {e.response.text[:500]}",
+                    "ended_at": _utcnow().isoformat()
+                })
+            return False
+        except (httpx.TransportError, ValueError) as e:
+            self._stats["submit_failures"] += 1
+            logger.error("Batch submit failed", extra={"error": str(e) or type(e).__name__, "jobs": len(job_ids)})
+            await transition_batch_jobs("submitting", "queued", job_ids=job_ids)
+            return False
+
+        await transition_batch_jobs("submitting", "submitted", job_ids=job_ids, changes={
+            "provider_batch_id": batch["id"],
+            "submitted_at": _utcnow().isoformat()
+        })
+        self._stats["batches_submitted"] += 1
+        self._stats["requests_submitted"] += len(requests)
+        logger.info("Batch submitted", extra={
+            "batch_id": batch["id"], "jobs": len(job_ids), "requests": len(requests)
+        })
+        return True
+
+    async def _build_requests(self, jobs: list[dict]) -> list[dict]:
+        """항목별 Messages API 요청 (대화 히스토리 + 프롬프트, custom_id = 항목 id)"""
+        from services.claude_service import get_claude_service
+        model = get_claude_service().model
+        kinds = {job["id"]: job["kind"] for job in jobs}
+        items = await get_batch_items(list(kinds))
+        summarized = {item["conversation_id"] for item in items if kinds[item["job_id"]] == "summarize"}
+        prompted = {item["conversation_id"] for item in items if kinds[item["job_id"]] != "summarize"}
+        histories = await self._load_histories(prompted)
+        transcripts = await self._load_transcripts(summarized)
+
+        builder = get_context_builder()
+        requests = []
+        for item in items:
+            if kinds[item["job_id"]] == "summarize":
+                # 대화록 전체를 한 메시지로 (히스토리 토큰 예산으로 자르지 않음)
+                transcript = transcripts.get(item["conversation_id"])
+                prompt = f"{transcript}\n\n{self.summary_prompt}" if transcript else self.summary_prompt
+                context = builder.build([], prompt)
+            else:
+                context = builder.build(histories.get(item["conversation_id"], []), item["prompt"])
+            params = {"model": model, "max_tokens": self.max_tokens, "messages": context["messages"]}
+            if context["system"]:
+                params["system"] = context["system"]
+            requests.append({"custom_id": item["id"], "params": params})
+        return requests
+
+    async def _load_histories(self, conversation_ids: set[str]) -> dict[str, list[dict]]:
+        """대화별 최근 히스토리 (같은 대화는 한 번만, 동시 조회 수 제한)"""
+        semaphore = asyncio.Semaphore(_HISTORY_CONCURRENCY)
+
+        async def load(conversation_id: str) -> list[dict]:
+            async with semaphore:
+                return await get_conversation_messages(
+                    conversation_id, limit=self.history_limit, columns="role,content"
+                )
+
+        ordered = list(conversation_ids)
+        histories = await asyncio.gather(*(load(conversation_id) for conversation_id in ordered))
+        return dict(zip(ordered, histories))
+
+    async def _load_transcripts(self, conversation_ids: set[str]) -> dict[str, str]:
+        """요약할 대화별 전체 대화록 (동시 조회 수 제한)"""
+        semaphore = asyncio.Semaphore(_HISTORY_CONCURRENCY)
+
+        async def load(conversation_id: str) -> str:
+            async with semaphore:
+                return await self._load_transcript(conversation_id)
+
+        ordered = list(conversation_ids)
+        transcripts = await asyncio.gather(*(load(conversation_id) for conversation_id in ordered))
+        return dict(zip(ordered, transcripts))
+
+    async def _load_transcript(self, conversation_id: str) -> str:
+        """
+        대화 전체를 키셋 페이지로 읽어 "역할: 내용" 대화록으로
+
+        상한을 넘으면 앞쪽 절반 / 뒤쪽 절반 예산만큼만 남긴다 (메모리에도 그만큼만 보관).
+        """
+        half = self.summary_max_tokens // 2
+        head: list[str] = []
+        head_tokens = 0
+        tail: deque[tuple[str, int]] = deque()
+        tail_tokens = 0
+        omitted = 0
+
+        cursor = None
+        while True:
+            page = await get_conversation_messages(
+                conversation_id, limit=self.summary_page_size, after=cursor,
+                columns="id,role,content,created_at"
+            )
+            for row in page:
+                role = _TRANSCRIPT_ROLES.get(row.get("role"))
+                if role is None or not row.get("content"):
+                    continue
+                line = f"{role}: {row['content']}"
+                tokens = estimate_tokens(line)
+                if not tail and head_tokens + tokens <= half:
+                    head.append(line)
+                    head_tokens += tokens
+                    continue
+                tail.append((line, tokens))
+                tail_tokens += tokens
+                while tail_tokens > half and tail:
+                    _, dropped = tail.popleft()
+                    tail_tokens -= dropped
+                    omitted += 1
+            if len(page) < self.summary_page_size:
+                break
+            cursor = encode_cursor(page[-1], "created_at")
+
+        lines = head
+        if omitted:
+            self._stats["summaries_truncated"] += 1
+            lines.append(f"(중간 메시지 {omitted}개 생략)")
+        lines.extend(line for line, _ in tail)
+        return "\n\n".join(lines)
+
+    async def _collect_ended(self):
+        """제출된 배치 상태 확인 → 끝난 배치 수집"""
+        jobs = await get_batch_jobs_by_status("submitted", _JOB_SCAN_LIMIT, columns="id,provider_batch_id")
+        for batch_id in dict.fromkeys(job["provider_batch_id"] for job in jobs):
+            self._stats["polls"] += 1
+            try:
+                batch = await self._get_batch(batch_id)
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning("Batch status check failed", extra={"batch_id": batch_id, "error": str(e)})
+                continue
+            if batch.get("processing_status") != "ended":
+                continue
+            claimed = await transition_batch_jobs("submitted", "collecting", provider_batch_id=batch_id)
+            if claimed:
+                await self._collect(batch, claimed)
+
+    async def _collect(self, batch: dict, jobs: list[dict]):
+        """끝난 배치 결과를 읽어 messages 에 일괄 저장하고 작업을 ended 로"""
+        kinds = {job["id"]: job["kind"] for job in jobs}
+        items = {item["id"]: item for item in await get_batch_items(list(kinds))}
+        counts = {job_id: dict.fromkeys(RESULT_TYPES, 0) for job_id in kinds}
+
+        pending: list[tuple[dict, dict]] = []
+        try:
+            async for line in self._results(batch):
+                item = items.get(line.get("custom_id"))
+                if item is None:
+                    continue
+                pending.append((item, line.get("result") or {}))
+                if len(pending) >= self.write_size:
+                    await self._write(pending, kinds, counts)
+                    pending = []
+            if pending:
+                await self._write(pending, kinds, counts)
+        except (httpx.HTTPError, ValueError) as e:
+            # collecting 으로 남겨 두면 stale_timeout 뒤 다시 수집 (저장은 멱등)
+            logger.error("Batch results download failed", extra={"batch_id": batch["id"], "error": str(e)})
+            return
+
+        ended_at = _utcnow().isoformat()
+        for job_id, job_counts in counts.items():
+            await transition_batch_jobs("collecting", "ended", job_ids=[job_id], changes={
+                **job_counts, "ended_at": ended_at
+            })
+        self._stats["batches_collected"] += 1
+        logger.info("Batch collected", extra={"batch_id": batch["id"], "jobs": len(jobs)})
+
+    async def _write(self, pending: list[tuple[dict, dict]], kinds: dict[str, str], counts: dict[str, dict]):
+        """결과 묶음 하나 저장 (messages 한 번 + 항목 상태는 값별로 한 번)"""
+        rows = []
+        saved_items = []
+        statuses: dict[tuple[str, str | None], list[str]] = defaultdict(list)
+        created_at = _utcnow()
+        for item, result in pending:
+            result_type = result.get("type")
+            if result_type == "succeeded":
+                text = "".join(
+                    block.get("text", "")
+                    for block in result.get("message", {}).get("content", [])
+                    if block.get("type") == "text"
+                )
+                if kinds[item["job_id"]] == "summarize":
+                    turn = [("system", "summary", text)]
+                else:
+                    turn = [("user", "prompt", item["prompt"]), ("assistant", "answer", text)]
+                for role, name, content in turn:
+                    created_at += timedelta(microseconds=1)
+                    rows.append({
+                        "id": str(uuid.uuid5(uuid.UUID(item["id"]), name)),
+                        "conversation_id": item["conversation_id"],
+                        "role": role,
+                        "content": content,
+                        "truncated": False,
+                        "created_at": created_at.isoformat()
+                    })
+                saved_items.append(item)
+                continue
+            if result_type not in RESULT_TYPES:
+                result_type = "errored"
+            error = result.get("error") or {}
+            statuses[(result_type, error.get("error", error).get("type"))].append(item["id"])
+
+        if rows and not await self._save(rows):
+            self._stats["write_failures"] += len(saved_items)
+            statuses[("errored", "write_failed")].extend(item["id"] for item in saved_items)
+        elif saved_items:
+            self._stats["messages_written"] += len(rows)
+            statuses[("succeeded", None)].extend(item["id"] for item in saved_items)
+
+        job_of = {item["id"]: item["job_id"] for item, _ in pending}
+        for (status, error), item_ids in statuses.items():
+            for item_id in item_ids:
+                counts[job_of[item_id]][status] += 1
+            BATCH_RESULTS.labels(result=status).inc(len(item_ids))
+            await update_batch_items(item_ids, {"status": status, "error": error})
+
+    async def _save(self, rows: list[dict]) -> bool:
+        """messages 일괄 저장 (지수 백오프 재시도, 행이 거부되면 재시도하지 않음)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if await save_messages(rows):
+                    return True
+            except RowsRejectedError as e:
+                # 수집 중에 대화가 삭제된 경우 등 - 다시 보내도 같은 결과
+                logger.error("Batch results rejected by database", extra={"messages": len(rows), "error": str(e)})
+                return False
+            if attempt < self.max_retries:
+                delay = self.retry_base_delay * (2 ** attempt)
+                await asyncio.sleep(delay * (0.5 + random.random()))
+        logger.error("Failed to save batch results", extra={"messages": len(rows), "retries": self.max_retries})
+        return False
+
+    def get_stats(self) -> dict:
+        """제출 / 수집 통계"""
+        return {**self._stats, "worker_running": self._task is not None and not self._task.done()}
+
+
+# 싱글톤 인스턴스
+_batch_service = None
+
+
+def get_batch_service() -> BatchService:
+    """Batch Service 싱글톤"""
+    global _batch_service
+    if _batch_service is None:
+        _batch_service = BatchService()
+    return _batch_service
@@ -1,8 +1,48 @@
 """Claude API 서비스 - 직접 HTTP 호출"""
-import os
+import asyncio
+import random
+import time
 import httpx
-from typing import AsyncGenerator
-import json
+from contextlib import aclosing
+from typing import AsyncGenerator, Awaitable, Callable
+from log import get_logger
+from metrics import TOKENS_PER_SECOND
+from services.attachment_service import AttachmentError, FILES_API_BETA, get_attachment_service
+from services.context_builder import estimate_tokens, get_context_builder
+from services.response_cache import get_response_cache
+from services.scheduler import get_scheduler
+from services.sse_parser import SSEParser, TEXT, USAGE, STOP, ERROR
+
+logger = get_logger(__name__)
+
+# 재시도 대상 상태 코드 (rate limit / overloaded / 일시적 서버 오류)
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504, 529}
+# 스트림 도중 error 이벤트 중 재시도 대상
+_RETRYABLE_ERRORS = {"overloaded_error", "api_error", "rate_limit_error"}
+
+# message_start / message_delta 의 usage 필드
+_USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+
+def _merge_usage(turn_usage: dict, event_usage: dict | None):
+    """이벤트의 usage 값을 턴 usage 에 반영 (나중 값이 우선)"""
+    for field in _USAGE_FIELDS:
+        value = (event_usage or {}).get(field)
+        if value is not None:
+            turn_usage[field] = value
+
+
+class ClaudeStreamError(Exception):
+    """스트림 도중 받은 error 이벤트"""
+
+    def __init__(self, error: dict):
+        self.error = error
+        super().__init__(f"{error.get('type', 'error')}: {error.get('message', '')}")
 
 
 class ClaudeService:
@@ -11,7 +51,163 @@ class ClaudeService:
     def __init__(self):
         self.api_key = None
         self.model = "claude-3-5-sonnet-20241022"
-        self.api_url = "https://api.anthropic.com/v1/messages"
+        self._client: httpx.AsyncClient | None = None
+
+        from config import get_settings
+        settings = get_settings()
+        self.api_url = f"{settings.anthropic_base_url.rstrip('/')}/v1/messages"
+        self.max_retries = settings.claude_max_retries
+        self.retry_base_delay = settings.claude_retry_base_delay
+        self.retry_max_delay = settings.claude_retry_max_delay
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "new_connections": 0,
+            "ttft_count": 0,
+            "ttft_total_ms": 0.0,
+            "ttft_last_ms": None,
+            "input_tokens": 0,
+            "output_tokens": 0,
+            "cache_read_tokens": 0,
+            "cache_write_tokens": 0,
+            "completed_turns": 0,
+            "completed_output_tokens": 0,
+            "cancelled_turns": 0,
+            "cancelled_output_tokens": 0,
+            "tokens_saved_estimate": 0,
+            "stop_reasons": {},
+            "stream_errors": 0,
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """공유 AsyncClient (커넥션 풀 + keep-alive + HTTP/2)"""
+        if self._client is None or self._client.is_closed:
+            from config import get_settings
+            settings = get_settings()
+
+            http2 = settings.claude_http2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    logger.warning("h2 패키지가 없어 HTTP/1.1로 연결합니다. (pip install 'httpx[http2]')")
+                    http2 = False
+
+            self._client = httpx.AsyncClient(
+                http2=http2,
+                timeout=httpx.Timeout(settings.claude_timeout, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=settings.claude_max_connections,
+                    max_keepalive_connections=settings.claude_max_keepalive_connections,
+                    keepalive_expiry=settings.claude_keepalive_expiry
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        """공유 클라이언트 종료 (FastAPI lifespan 종료 시 호출)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _api_headers(self) -> dict:
+        self._ensure_api_key()
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+
+    async def ping(self) -> int:
+        """
+        Anthropic 에 가벼운 HTTP 왕복 (GET /v1/models, 토큰 사용 없음)
+
+        응답 상태 코드를 반환한다. 연결 실패는 예외로 전달된다.
+        공유 클라이언트를 쓰므로 열린 연결은 keep-alive 풀에 남는다.
+        """
+        models_url = self.api_url.rsplit("/", 1)[0] + "/models"
+        response = await self._get_client().get(
+            models_url,
+            params={"limit": 1},
+            headers=self._api_headers()
+        )
+        return response.status_code
+
+    async def warm_up(self, connections: int = 2):
+        """시작 시 커넥션 풀 예열 (DNS / TCP / TLS 를 첫 요청 전에)"""
+        results = await asyncio.gather(
+            *(self.ping() for _ in range(max(connections, 1))),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.warning("Claude warm-up failed", extra={"error": str(errors[0])})
+
+    async def _trace(self, event_name: str, info: dict):
+        """httpcore trace 훅 - 새 TCP 연결이 열릴 때만 카운트"""
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["new_connections"] += 1
+
+    def get_stats(self) -> dict:
+        """커넥션 재사용 및 TTFT 통계"""
+        stats = self._stats
+        requests = stats["requests"]
+        reused = max(requests - stats["new_connections"], 0)
+        return {
+            "requests": requests,
+            "retries": stats["retries"],
+            "new_connections": stats["new_connections"],
+            "reused_connections": reused,
+            "reuse_ratio": round(reused / requests, 3) if requests else None,
+            "ttft_avg_ms": (
+                round(stats["ttft_total_ms"] / stats["ttft_count"], 1)
+                if stats["ttft_count"] else None
+            ),
+            "ttft_last_ms": stats["ttft_last_ms"],
+            "input_tokens": stats["input_tokens"],
+            "output_tokens": stats["output_tokens"],
+            "cache_read_tokens": stats["cache_read_tokens"],
+            "cache_write_tokens": stats["cache_write_tokens"],
+            "completed_turns": stats["completed_turns"],
+            "cancelled_turns": stats["cancelled_turns"],
+            "cancelled_output_tokens": stats["cancelled_output_tokens"],
+            "tokens_saved_estimate": stats["tokens_saved_estimate"],
+            "stop_reasons": dict(stats["stop_reasons"]),
+            "stream_errors": stats["stream_errors"],
+        }
+
+    def _record_ttft(self, started: float):
+        ttft_ms = (time.perf_counter() - started) * 1000
+        self._stats["ttft_count"] += 1
+        self._stats["ttft_total_ms"] += ttft_ms
+        self._stats["ttft_last_ms"] = round(ttft_ms, 1)
+
+    def _record_usage(self, turn_usage: dict):
+        """턴 종료 시 사용량을 서비스 전체 통계에 누적"""
+        self._stats["input_tokens"] += turn_usage.get("input_tokens", 0)
+        self._stats["output_tokens"] += turn_usage.get("output_tokens", 0)
+        self._stats["cache_read_tokens"] += turn_usage.get("cache_read_input_tokens", 0)
+        self._stats["cache_write_tokens"] += turn_usage.get("cache_creation_input_tokens", 0)
+
+    def _record_cancel(self, turn_usage: dict, produced: list[str]):
+        """
+        취소된 턴 기록
+
+        취소 시점에는 최종 output_tokens 가 오지 않으므로 받은 텍스트로 추정하고,
+        절약한 토큰은 완료된 턴의 평균 출력 토큰에서 뺀 값으로 추정한다.
+        """
+        generated = max(
+            turn_usage.get("output_tokens", 0),
+            estimate_tokens("".join(produced)) if produced else 0
+        )
+        stats = self._stats
+        average = (
+            stats["completed_output_tokens"] / stats["completed_turns"]
+            if stats["completed_turns"] else 0
+        )
+        stats["cancelled_turns"] += 1
+        stats["cancelled_output_tokens"] += generated
+        stats["tokens_saved_estimate"] += max(int(average) - generated, 0)
 
     def _ensure_api_key(self):
         """API 키 lazy loading"""
@@ -25,83 +221,222 @@ class ClaudeService:
     async def chat(
         self,
         message: str,
-        files: list[str] = None
+        files: list[str] = None,
+        history: list[dict] = None,
+        usage: dict = None,
+        user_id: str = None,
+        on_queue: Callable[[int], Awaitable[None]] = None
     ) -> AsyncGenerator[str, None]:
         """
         Claude API로 대화
 
         Args:
             message: 사용자 메시지
-            files: 첨부 파일 경로 리스트 (현재 미지원)
+            files: 첨부 파일 경로 리스트 (chat-files 버킷, user_id 소유) - image / document 블록으로 전달
+            history: 이전 메시지 행 (시간순, role/content) - 토큰 예산 내로 잘라 컨텍스트로 사용
+            usage: 전달하면 이번 턴의 토큰 사용량(cache read/write 포함)을 채워 넣음
+            user_id: 인증된 사용자 id (요청 바디 값 금지) - 첨부 소유 확인 / 사용자별 속도 제한 / 공정 대기열 키
+            on_queue: 동시 실행 상한으로 대기할 때 순번(1부터)을 받는 콜백
 
         Yields:
             AI 응답 청크 (스트리밍)
         """
+        turn_usage = usage if usage is not None else {}
+        cache = get_response_cache()
+        if not cache.enabled:
+            async with aclosing(
+                self._stream(message, files, history, turn_usage, {}, user_id, on_queue)
+            ) as stream:
+                async for chunk in stream:
+                    yield chunk
+            return
+
+        # 응답 캐시 (opt-in) - 적중 시 같은 스트리밍 인터페이스로 즉시 재생
+        key = cache.make_key(self.model, message, history, files)
+        cached = cache.get(key)
+        if cached is not None:
+            for chunk in cache.replay(cached):
+                yield chunk
+            return
+
+        parts: list[str] = []
+        outcome: dict = {}
+        async with aclosing(
+            self._stream(message, files, history, turn_usage, outcome, user_id, on_queue)
+        ) as stream:
+            async for chunk in stream:
+                parts.append(chunk)
+                yield chunk
+        # max_tokens 등으로 잘린 응답은 재사용하지 않음
+        if outcome.get("completed") and outcome.get("stop_reason") == "end_turn":
+            cache.put(key, "".join(parts))
+
+    async def _stream(
+        self,
+        message: str,
+        files: list[str] | None,
+        history: list[dict] | None,
+        turn_usage: dict,
+        outcome: dict,
+        user_id: str | None = None,
+        on_queue: Callable[[int], Awaitable[None]] | None = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Anthropic Messages API 스트리밍 호출
+
+        정상 종료 시 outcome["completed"] = True, outcome["stop_reason"] 에 종료 사유.
+
+        요청은 스케줄러 슬롯 안에서 보내며, 첫 토큰 전의 429/529/5xx/연결 오류는
+        retry-after 를 존중하는 지터 백오프로 재시도한다. 재시도 대기 중에는
+        슬롯을 반환하고, retry-after 가 claude_retry_max_delay 보다 길면 포기한다.
+
+        소비자가 제너레이터를 닫거나 태스크가 취소되면 업스트림 HTTP 스트림을
+        바로 닫고 슬롯을 반환한다. (취소 통계에 기록)
+        """
+        produced: list[str] = []
         try:
-            # API 키 로드
-            self._ensure_api_key()
-
-            # HTTP 요청 헤더
-            headers = {
-                "x-api-key": self.api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json"
-            }
+            # HTTP 요청 헤더 (API 키 로드)
+            headers = self._api_headers()
+
+            # 첨부 파일 → content block (스케줄러 슬롯 밖에서 받아 둠, 캐시 적중이면 다운로드 없음)
+            attachments = None
+            if files:
+                if not user_id:
+                    raise AttachmentError("Attachments require a user")
+                attachment_service = get_attachment_service()
+                attachments = await attachment_service.blocks(user_id, files)
+                if attachment_service.uses_files_api:
+                    headers = {**headers, "anthropic-beta": FILES_API_BETA}
 
-            # 요청 바디
+            # 요청 바디 (히스토리 + 첨부 + 프롬프트 캐시 브레이크포인트)
+            context = get_context_builder().build(history or [], message, attachments)
             payload = {
                 "model": self.model,
                 "max_tokens": 4096,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": message
-                    }
-                ],
+                "messages": context["messages"],
                 "stream": True
             }
+            if context["system"]:
+                payload["system"] = context["system"]
+
+            scheduler = get_scheduler()
+            # 스트리밍 요청 (공유 클라이언트 - 연결 재사용)
+            client = self._get_client()
+            started = 0.0
+            first_token = True
+            first_token_at = 0.0
+            attempt = 0
+            while True:
+                retry_delay = None
+                # 슬롯은 시도마다 잡고, 재시도 대기 중에는 반환해 다른 요청이 쓰게 함
+                # (사용자 토큰 버킷은 턴의 첫 시도에서만 차감)
+                async with scheduler.slot(user_id, on_queue, throttle=attempt == 0):
+                    if not started:
+                        started = time.perf_counter()
+                    self._stats["requests"] += 1
+                    try:
+                        async with client.stream(
+                            "POST",
+                            self.api_url,
+                            headers=headers,
+                            json=payload,
+                            extensions={"trace": self._trace}
+                        ) as response:
+                            if response.is_error:
+                                await response.aread()
+                                if response.status_code in _RETRYABLE_STATUS and attempt < self.max_retries:
+                                    retry_delay = self._retry_delay(response, attempt)
+                            if retry_delay is None:
+                                response.raise_for_status()
 
-            # 스트리밍 요청
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                async with client.stream(
-                    "POST",
-                    self.api_url,
-                    headers=headers,
-                    json=payload
-                ) as response:
-                    response.raise_for_status()
-
-                    # SSE 스트림 파싱
-                    async for line in response.aiter_lines():
-                        if line.startswith("data: "):
-                            data_str = line[6:]  # "data: " 제거
-
-                            if data_str == "[DONE]":
-                                break
-
-                            try:
-                                data = json.loads(data_str)
-
-                                # 텍스트 델타 추출
-                                if data.get("type") == "content_block_delta":
-                                    delta = data.get("delta", {})
-                                    if delta.get("type") == "text_delta":
-                                        text = delta.get("text", "")
-                                        if text:
-                                            yield text
-
-                            except json.JSONDecodeError:
-                                continue
+                                # SSE 스트림 파싱 (바이트 단위 증분 파서)
+                                parser = SSEParser()
+                                async for raw in response.aiter_bytes():
+                                    for event in parser.feed(raw):
+                                        kind = event.kind
+                                        if kind == TEXT:
+                                            if first_token:
+                                                self._record_ttft(started)
+                                                first_token = False
+                                                first_token_at = time.perf_counter()
+                                            produced.append(event.text)
+                                            yield event.text
+                                        elif kind == USAGE:
+                                            # 캐시 read/write 포함, message_delta 는 누적값
+                                            _merge_usage(turn_usage, event.data)
+                                        elif kind == STOP:
+                                            stop_reason = event.data["stop_reason"]
+                                            outcome["stop_reason"] = stop_reason
+                                            reasons = self._stats["stop_reasons"]
+                                            reasons[stop_reason] = reasons.get(stop_reason, 0) + 1
+                                        elif kind == ERROR:
+                                            # 스트림 중 overloaded 등 - 첫 토큰 전이면 재시도
+                                            if (
+                                                first_token
+                                                and event.data.get("type") in _RETRYABLE_ERRORS
+                                                and attempt < self.max_retries
+                                            ):
+                                                retry_delay = self._retry_delay(None, attempt)
+                                                break
+                                            raise ClaudeStreamError(event.data)
+                                    if retry_delay is not None:
+                                        break
+                    except httpx.TransportError:
+                        # 연결/타임아웃 오류도 첫 토큰 전이면 재시도
+                        if not first_token or attempt >= self.max_retries:
+                            raise
+                        retry_delay = self._retry_delay(None, attempt)
 
+                if retry_delay is None:
+                    break
+                attempt += 1
+                self._stats["retries"] += 1
+                await asyncio.sleep(retry_delay)
+
+            outcome["completed"] = True
+            output_tokens = turn_usage.get("output_tokens", 0)
+            self._stats["completed_turns"] += 1
+            self._stats["completed_output_tokens"] += output_tokens
+            generation_time = time.perf_counter() - first_token_at if first_token_at else 0.0
+            if output_tokens and generation_time > 0:
+                TOKENS_PER_SECOND.observe(output_tokens / generation_time)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            self._record_cancel(turn_usage, produced)
+            raise
+        except AttachmentError as e:
+            logger.warning("Attachment rejected", extra={"user_id": user_id, "error": str(e)})
+            yield f"\n⚠️ Attachment Error: {e}"
+        except ClaudeStreamError as e:
+            self._stats["stream_errors"] += 1
+            logger.warning("Claude API stream error", extra={"error": str(e)})
+            yield f"\n⚠️ API Error: {e}"
         except httpx.HTTPStatusError as e:
             error_detail = f"HTTP {e.response.status_code}: {e.response.text}"
-            print(f"Claude API HTTP Error: {error_detail}")
+            logger.error("Claude API HTTP error", extra={"status": e.response.status_code, "body": e.response.text})
             yield f"\n⚠️ API Error: {error_detail}"
         except Exception as e:
-            import traceback
-            error_detail = traceback.format_exc()
-            print(f"Claude API Error: {error_detail}")
+            logger.error("Claude API error", exc_info=True)
             yield f"\n⚠️ Error: {str(e)}"
+        finally:
+            self._record_usage(turn_usage)
+
+    def _retry_delay(self, response: httpx.Response | None, attempt: int) -> float | None:
+        """
+        재시도 대기 시간 - 지수 백오프에 full jitter, retry-after 보다 짧게 기다리지 않음
+
+        서버가 요청한 retry-after 가 retry_max_delay 보다 길면 재시도하지 않음 (None)
+        """
+        backoff = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** attempt)))
+        retry_after = 0.0
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after", 0))
+            except ValueError:
+                retry_after = 0.0
+        if retry_after > self.retry_max_delay:
+            return None
+        return max(retry_after, backoff)
 
 
 # 싱글톤 인스턴스
@@ -0,0 +1,123 @@
+"""대화 컨텍스트 구성 - 토큰 예산 트리밍 + 프롬프트 캐시 브레이크포인트"""
+from config import get_settings
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+# 첨부 하나의 토큰 근사치 (이미지 최대 해상도 기준, 히스토리 예산에서 미리 뺌)
+ATTACHMENT_TOKENS = 1600
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토큰 수 근사치
+
+    영문/ASCII 는 약 4자당 1토큰, 한글 등 비ASCII 문자는 1자당 1토큰으로 계산
+    (정확한 토크나이저 없이 예산 판단용으로만 사용)
+    """
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+class ContextBuilder:
+    """최근 히스토리를 토큰 예산에 맞춰 Anthropic messages 형식으로 변환"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.max_tokens = settings.context_max_tokens
+        self.max_messages = settings.context_max_messages
+        self.trim_step = max(settings.context_trim_step, 1)
+        self.system_prompt = settings.claude_system_prompt
+        self.prompt_caching = settings.claude_prompt_caching
+
+    def build(self, history: list[dict], message: str, attachments: list[dict] | None = None) -> dict:
+        """
+        요청 바디의 system / messages 구성
+
+        Args:
+            history: 시간순 메시지 행 (role, content)
+            message: 이번 사용자 메시지
+            attachments: 이번 메시지의 첨부 content block (image / document)
+
+        Returns:
+            {"system": [...] | None, "messages": [...]}
+        """
+        budget = self.max_tokens - estimate_tokens(message) - ATTACHMENT_TOKENS * len(attachments or ())
+        turns = self._trim(self._normalize(history), budget)
+
+        messages = [
+            {"role": turn["role"], "content": [{"type": "text", "text": turn["content"]}]}
+            for turn in turns
+        ]
+
+        # 안정적인 프리픽스(히스토리 끝)에 캐시 브레이크포인트
+        if self.prompt_caching and messages:
+            messages[-1]["content"][-1]["cache_control"] = _CACHE_CONTROL
+
+        if attachments:
+            # 첨부를 텍스트보다 앞에 둠 (Anthropic 권장 순서)
+            messages.append({"role": "user", "content": [*attachments, {"type": "text", "text": message}]})
+        else:
+            messages.append({"role": "user", "content": message})
+
+        system = None
+        if self.system_prompt:
+            system = [{"type": "text", "text": self.system_prompt}]
+            if self.prompt_caching:
+                system[0]["cache_control"] = _CACHE_CONTROL
+
+        return {"system": system, "messages": messages}
+
+    @staticmethod
+    def _normalize(history: list[dict]) -> list[dict]:
+        """user/assistant 만 남기고 같은 역할이 연속되면 합침, 첫 턴은 user"""
+        turns: list[dict] = []
+        for row in history:
+            role = row.get("role")
+            content = row.get("content")
+            if role not in ("user", "assistant") or not content:
+                continue
+            if turns and turns[-1]["role"] == role:
+                turns[-1]["content"] += "\n\n" + content
+            else:
+                turns.append({"role": role, "content": content})
+
+        while turns and turns[0]["role"] != "user":
+            turns.pop(0)
+        # 이번 메시지가 user 이므로 히스토리는 assistant 로 끝나야 함
+        if turns and turns[-1]["role"] == "user":
+            turns.pop()
+        return turns
+
+    def _trim(self, turns: list[dict], budget: int) -> list[dict]:
+        """
+        예산(토큰 수, 최대 메시지 수)을 넘으면 오래된 턴부터 제거
+
+        잘라내는 시작 위치를 trim_step 단위로 올림하여, 턴이 늘어나도
+        한동안 같은 프리픽스가 유지되도록 함 (프롬프트 캐시 적중률 유지)
+        """
+        costs = [estimate_tokens(turn["content"]) for turn in turns]
+        total = sum(costs)
+        start = max(len(turns) - self.max_messages, 0) if self.max_messages else 0
+        total -= sum(costs[:start])
+        while start < len(turns) and total > budget:
+            total -= costs[start]
+            start += 1
+        if start == 0:
+            return turns
+
+        start = min(-(-start // self.trim_step) * self.trim_step, len(turns))
+        # user 턴에서 시작하도록 보정
+        while start < len(turns) and turns[start]["role"] != "user":
+            start += 1
+        return turns[start:]
+
+
+# 싱글톤 인스턴스
+_context_builder = None
+
+
+def get_context_builder() -> ContextBuilder:
+    """Context Builder 싱글톤"""
+    global _context_builder
+    if _context_builder is None:
+        _context_builder = ContextBuilder()
+    return _context_builder
@@ -0,0 +1,204 @@
+"""대화 삭제 서비스 - 백그라운드 묶음 삭제 + Storage 정리 (진행 상황은 deletion_jobs)"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+from config import get_settings
+from database import (
+    create_deletion_job,
+    update_deletion_job,
+    delete_user_conversations,
+    get_conversation_file_paths,
+    claim_storage_purge,
+    requeue_storage_purge
+)
+from log import get_logger
+from services.storage_service import get_storage_service
+
+logger = get_logger(__name__)
+
+
+class DeletionService:
+    """
+    대화 삭제
+
+    - delete_conversations(): 작업 행을 만들고 바로 반환, 실제 삭제는 백그라운드 태스크
+      1. deleting: deletion_batch_size 개씩 DELETE (메시지 → files 행은 DB cascade)
+      2. purging: files 행이 지워질 때 트리거가 쌓은 storage_purge_queue 를 비우며
+         Storage 객체를 storage_purge_batch_size 개씩 remove 한 번으로 삭제
+      3. done
+    - 내용 기반 중복 제거로 같은 경로를 다른 files 행이 아직 쓰고 있으면 지우지 않는다.
+    - 주기적 정리(storage_purge_interval)가 중단된 작업 / 다른 경로(프로필 삭제 cascade 등)로
+      쌓인 큐를 마저 비운다.
+    - 큐는 모든 삭제가 함께 쓰므로 작업의 files_removed 는 DELETE 전에 모아 둔 그 작업 대화의
+      경로만 센다. 다른 작업 / 주기적 정리가 먼저 지운 경로도 이 작업 몫으로 센다.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.batch_size = settings.deletion_batch_size
+        self.purge_batch_size = settings.storage_purge_batch_size
+        self.purge_interval = settings.storage_purge_interval
+        self.drain_timeout = settings.shutdown_drain_timeout
+
+        self._jobs: set[asyncio.Task] = set()
+        self._purge_task: asyncio.Task | None = None
+        # 작업 id → (아직 지워지지 않은 이 작업의 경로, 지워진 수)
+        self._job_paths: dict[str, tuple[set[str], list[int]]] = {}
+        self._stats = {
+            "jobs": 0,
+            "failed_jobs": 0,
+            "conversations_deleted": 0,
+            "files_removed": 0,
+            "files_kept": 0,  # 다른 files 행이 쓰고 있어 남긴 경로
+            "storage_calls": 0,
+            "purge_failures": 0,
+        }
+
+    async def delete_conversations(self, user_id: str, conversation_ids: list[str]) -> dict | None:
+        """
+        삭제 작업 시작 (작업 행을 바로 반환)
+
+        남의 대화 / 없는 대화 id 는 삭제되지 않고 deleted 에 세지 않는다.
+
+        Returns:
+            deletion_jobs 행 (DB 오류면 None)
+        """
+        conversation_ids = list(dict.fromkeys(conversation_ids))
+        job = await create_deletion_job(user_id, len(conversation_ids))
+        if job is None:
+            return None
+        self._stats["jobs"] += 1
+        task = asyncio.create_task(self._run(job["id"], user_id, conversation_ids))
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+        return job
+
+    async def _run(self, job_id: str, user_id: str, conversation_ids: list[str]):
+        pending, removed = self._job_paths[job_id] = (set(), [0])
+        try:
+            deleted = 0
+            for start in range(0, len(conversation_ids), self.batch_size):
+                batch = conversation_ids[start:start + self.batch_size]
+                paths = await get_conversation_file_paths(user_id, batch)
+                if paths is None:
+                    await self._fail(job_id, "Failed to read conversation files")
+                    return
+                pending.update(paths)
+                count = await delete_user_conversations(user_id, batch)
+                if count is None:
+                    await self._fail(job_id, "Failed to delete conversations")
+                    return
+                deleted += count
+                self._stats["conversations_deleted"] += count
+                done = start + self.batch_size >= len(conversation_ids)
+                await update_deletion_job(job_id, {"deleted": deleted, **({"status": "purging"} if done else {})})
+
+            async def report(_: int):
+                await update_deletion_job(job_id, {"files_removed": removed[0]})
+
+            if await self.purge(report) is None:
+                await self._fail(job_id, "Failed to purge storage")
+                return
+            await update_deletion_job(job_id, {
+                "status": "done",
+                "files_removed": removed[0],
+                "finished_at": datetime.now(timezone.utc).isoformat()
+            })
+        except Exception:
+            logger.error("Deletion job failed", extra={"job_id": job_id}, exc_info=True)
+            await self._fail(job_id, "Unexpected error")
+        finally:
+            del self._job_paths[job_id]
+
+    async def _fail(self, job_id: str, error: str):
+        self._stats["failed_jobs"] += 1
+        await update_deletion_job(job_id, {
+            "status": "failed",
+            "error": error,
+            "finished_at": datetime.now(timezone.utc).isoformat()
+        })
+
+    async def purge(self, on_progress: Callable[[int], Awaitable[None]] | None = None) -> int | None:
+        """
+        정리 큐가 빌 때까지 Storage 객체 삭제
+
+        큐 조회는 skip locked 라서 여러 워커가 동시에 비워도 된다.
+        Storage 삭제에 실패한 경로는 큐에 되돌려 다음 정리 때 재시도한다.
+
+        지운 경로는 진행 중인 삭제 작업 중 그 경로를 가진 작업의 files_removed 에 더한다.
+
+        Returns:
+            지운 객체 수 (큐를 읽지 못했거나 Storage 삭제에 실패하면 None)
+        """
+        storage = get_storage_service()
+        removed = 0
+        while True:
+            rows = await claim_storage_purge(self.purge_batch_size)
+            if rows is None:
+                return None
+            # 같은 경로가 여러 번 큐에 들어갈 수 있음 (중복 제거된 업로드)
+            paths = list(dict.fromkeys(row["file_path"] for row in rows if not row["in_use"]))
+            self._stats["files_kept"] += len({row["file_path"] for row in rows if row["in_use"]})
+            if paths:
+                self._stats["storage_calls"] += 1
+                if not await storage.delete_files(paths):
+                    self._stats["purge_failures"] += 1
+                    await requeue_storage_purge(paths)
+                    return None
+                removed += len(paths)
+                self._stats["files_removed"] += len(paths)
+                for pending, count in self._job_paths.values():
+                    hits = pending.intersection(paths)
+                    pending.difference_update(hits)
+                    count[0] += len(hits)
+                if on_progress is not None:
+                    await on_progress(removed)
+            if len(rows) < self.purge_batch_size:
+                return removed
+
+    # --- 주기적 정리 ---
+
+    def start(self):
+        """주기적 정리 태스크 시작 (storage_purge_interval 이 0 이면 시작하지 않음)"""
+        if self.purge_interval > 0 and (self._purge_task is None or self._purge_task.done()):
+            self._purge_task = asyncio.create_task(self._purge_loop())
+
+    async def _purge_loop(self):
+        while True:
+            await asyncio.sleep(self.purge_interval)
+            try:
+                await self.purge()
+            except Exception:
+                logger.error("Storage purge failed", exc_info=True)
+
+    async def stop(self):
+        """진행 중인 삭제 작업을 기다린 뒤 (drain timeout) 정리 태스크 종료"""
+        if self._jobs:
+            _, pending = await asyncio.wait(set(self._jobs), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.error("Deletion jobs cancelled at shutdown", extra={"jobs": len(pending)})
+        if self._purge_task is not None:
+            self._purge_task.cancel()
+            try:
+                await self._purge_task
+            except asyncio.CancelledError:
+                pass
+            self._purge_task = None
+
+    def get_stats(self) -> dict:
+        """삭제 / 정리 통계"""
+        return {**self._stats, "running_jobs": len(self._jobs)}
+
+
+# 싱글톤 인스턴스
+_deletion_service = None
+
+
+def get_deletion_service() -> DeletionService:
+    """Deletion Service 싱글톤"""
+    global _deletion_service
+    if _deletion_service is None:
+        _deletion_service = DeletionService()
+    return _deletion_service
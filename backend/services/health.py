@@ -0,0 +1,160 @@
+"""헬스체크 서비스 - 시작 시 워밍업 + 의존성 점검 결과 캐시 (liveness / readiness)"""
+import asyncio
+import time
+from config import get_settings
+from database import get_supabase_client, run_db
+from log import get_logger
+
+logger = get_logger(__name__)
+
+
+async def _skipped() -> dict:
+    return {"ok": True, "skipped": True}
+
+
+class HealthChecker:
+    """
+    의존성 점검
+
+    - Supabase: 가장 가벼운 PostgREST 조회 (필수 - 실패하면 not ready)
+    - Anthropic: API 에 HTTP 왕복 (선택 - 실패해도 ready, degraded 로 표시)
+
+    점검 결과는 HEALTH_CACHE_TTL 초 동안 재사용하고, 동시에 들어온 프로브는
+    진행 중인 점검 하나를 함께 기다린다. (프로브가 DB 부하가 되지 않도록)
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.cache_ttl = settings.health_cache_ttl
+        self.timeout = settings.health_check_timeout
+        self.check_anthropic = settings.health_check_anthropic
+        self.started_at = time.time()
+        self.warmed_up = False
+        self.draining = False
+
+        self._result: dict | None = None
+        self._checked_at = 0.0
+        self._checked_wall = 0.0
+        self._inflight: asyncio.Task | None = None
+        self._stats = {"checks": 0, "cache_hits": 0, "failures": 0}
+
+    async def warm_up(self):
+        """
+        클라이언트 생성 + 커넥션 풀 예열 (FastAPI lifespan 시작 시 호출)
+
+        첫 요청이 클라이언트 생성 / DNS / TLS 비용을 치르지 않도록
+        Supabase 와 Anthropic 에 미리 연결을 열어 둔다. 실패해도 기동은
+        계속하며 readiness 점검이 상태를 알린다.
+        """
+        from services.claude_service import get_claude_service
+        settings = get_settings()
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.gather(
+                self._warm_supabase(settings.warmup_db_connections),
+                get_claude_service().warm_up(settings.warmup_claude_connections),
+                return_exceptions=True
+            ), timeout=settings.warmup_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up timed out", extra={"timeout": settings.warmup_timeout})
+        self.warmed_up = True
+        logger.info("Warm-up finished", extra={"ms": round((time.perf_counter() - started) * 1000, 1)})
+
+    async def _warm_supabase(self, connections: int):
+        # 동시에 여러 번 조회해 스레드 풀 스레드와 keep-alive 커넥션을 함께 만든다
+        get_supabase_client()
+        results = await asyncio.gather(
+            *(self._ping_supabase() for _ in range(max(connections, 1))),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.warning("Supabase warm-up failed", extra={"error": str(errors[0])})
+
+    async def _ping_supabase(self):
+        supabase = get_supabase_client()
+        await run_db(supabase.table("profiles").select("id").limit(1).execute)
+
+    async def _check(self, probe) -> dict:
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(probe(), timeout=self.timeout)
+            result = {"ok": True}
+            if detail:
+                result.update(detail)
+        except Exception as e:
+            result = {"ok": False, "error": str(e) or type(e).__name__}
+        result["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    async def _check_anthropic(self) -> dict:
+        from services.claude_service import get_claude_service
+        status = await get_claude_service().ping()
+        if status >= 500:
+            raise RuntimeError(f"HTTP {status}")
+        return {"status": status}
+
+    async def _run_checks(self) -> dict:
+        self._stats["checks"] += 1
+        supabase, anthropic = await asyncio.gather(
+            self._check(self._ping_supabase),
+            self._check(self._check_anthropic) if self.check_anthropic else _skipped()
+        )
+        if not supabase["ok"]:
+            self._stats["failures"] += 1
+            logger.warning("Readiness check failed", extra={"dependency": "supabase", "error": supabase["error"]})
+        return {"supabase": supabase, "anthropic": anthropic}
+
+    async def check_dependencies(self) -> dict:
+        """의존성 점검 결과 (TTL 캐시 + 동시 프로브 병합)"""
+        if self._result is not None and time.monotonic() - self._checked_at < self.cache_ttl:
+            self._stats["cache_hits"] += 1
+            return self._result
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._run_checks())
+        task = self._inflight
+        try:
+            result = await asyncio.shield(task)
+        finally:
+            if self._inflight is task and task.done():
+                self._inflight = None
+        self._result = result
+        self._checked_at = time.monotonic()
+        self._checked_wall = time.time()
+        return result
+
+    def liveness(self) -> dict:
+        """프로세스 / 이벤트 루프가 응답하는지만 (의존성 점검 없음)"""
+        return {"status": "ok", "uptime_s": round(time.time() - self.started_at, 1)}
+
+    async def readiness(self) -> tuple[bool, dict]:
+        """트래픽을 받아도 되는지 (워밍업 완료, 종료 중 아님, Supabase 연결)"""
+        if self.draining:
+            return False, {"status": "draining"}
+        if not self.warmed_up:
+            return False, {"status": "starting"}
+        checks = await self.check_dependencies()
+        ready = checks["supabase"]["ok"]
+        status = "ok" if ready and checks["anthropic"]["ok"] else ("degraded" if ready else "unavailable")
+        return ready, {
+            "status": status,
+            "supabase_connected": checks["supabase"]["ok"],
+            "checks": checks,
+            "checked_at": round(self._checked_wall, 3)
+        }
+
+    def get_stats(self) -> dict:
+        """점검 횟수 / 캐시 적중"""
+        return {**self._stats, "warmed_up": self.warmed_up, "draining": self.draining}
+
+
+# 싱글톤 인스턴스
+_health_checker = None
+
+
+def get_health_checker() -> HealthChecker:
+    """Health Checker 싱글톤"""
+    global _health_checker
+    if _health_checker is None:
+        _health_checker = HealthChecker()
+    return _health_checker
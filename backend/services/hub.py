@@ -0,0 +1,430 @@
+"""WebSocket 연결 허브 - 대화별 스트림 이벤트를 워커/인스턴스 간에 팬아웃"""
+import asyncio
+import time
+import uuid
+from typing import Callable
+from fastapi import WebSocket
+from config import get_settings
+from log import get_logger
+from serialization import dumps, loads, send_json
+
+logger = get_logger(__name__)
+
+# Postgres NOTIFY 페이로드 상한은 8000 바이트 - 넘는 이벤트는 조각으로 나눠 보낸다
+_PG_NOTIFY_MAX_BYTES = 7900
+_PG_CHANNEL = "msg_chat_events"
+# 조각 프레임: "#{msg_id}:{index}:{total}:{data}" (일반 페이로드는 JSON 이라 '{' 로 시작)
+_PG_CHUNK_PREFIX = "#"
+_PG_CHUNK_HEADER_BYTES = 64
+# 조각은 한 문장(=한 트랜잭션)으로 보내므로 한꺼번에 순서대로 전달된다
+_PG_NOTIFY_SQL = (
+    "select pg_notify($1, part) from "
+    "(select part from unnest($2::text[]) with ordinality as t(part, n) order by n) s"
+)
+# 미완성 조각 보관 시간 (보낸 쪽 연결이 중간에 끊긴 경우 정리)
+_PG_PARTIAL_TTL = 30.0
+# 재연결 동안 쌓아 둘 수 있는 미전송 이벤트 수
+_PG_OUTBOX_MAX = 10000
+_PG_RECONNECT_MAX_DELAY = 30.0
+
+
+def _split_utf8(data: bytes, size: int) -> list[str]:
+    """UTF-8 문자 경계를 지켜 size 바이트 이하 조각으로 분할"""
+    parts = []
+    start = 0
+    while start < len(data):
+        end = min(start + size, len(data))
+        # 연속 바이트(10xxxxxx) 앞에서 자르지 않도록 문자 시작까지 당김
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode())
+        start = end
+    return parts
+
+
+class MemoryPubSub:
+    """
+    프로세스 내 pub/sub 백엔드 (기본값)
+
+    같은 프로세스의 허브끼리만 전달되므로 단일 워커 배포용.
+    """
+
+    _subscribers: list[Callable[[str], None]] = []
+
+    def __init__(self):
+        self._on_message = None
+
+    async def start(self, on_message: Callable[[str], None]):
+        self._on_message = on_message
+        MemoryPubSub._subscribers.append(on_message)
+
+    async def stop(self):
+        if self._on_message in MemoryPubSub._subscribers:
+            MemoryPubSub._subscribers.remove(self._on_message)
+
+    async def publish(self, payload: str):
+        for subscriber in list(MemoryPubSub._subscribers):
+            subscriber(payload)
+
+    def get_stats(self) -> dict:
+        return {}
+
+
+class PostgresPubSub:
+    """
+    Postgres LISTEN/NOTIFY 백엔드 (여러 워커/레플리카)
+
+    LISTEN 전용 연결 1개 + NOTIFY 전용 연결 1개를 사용한다. NOTIFY 는
+    전송 태스크가 순서대로 보내므로 스트림 루프가 DB 왕복을 기다리지 않는다.
+    asyncpg 는 이 백엔드를 쓸 때만 필요하다.
+
+    - 감시 태스크가 LISTEN 연결을 주기적으로 확인하고, 끊기면 백오프로 다시
+      연결해 LISTEN 한다 (끊겨 있던 동안 다른 워커가 보낸 이벤트는 유실)
+    - NOTIFY 연결이 끊기면 다시 연결한 뒤 실패한 이벤트부터 이어서 보낸다
+    - 8000 바이트를 넘는 이벤트는 조각으로 나눠 보내고 받는 쪽에서 조립한다
+    """
+
+    def __init__(self, dsn: str, health_interval: float = 5.0):
+        self.dsn = dsn
+        self.health_interval = health_interval
+        self._on_message = None
+        self._listen_conn = None
+        self._notify_conn = None
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=_PG_OUTBOX_MAX)
+        self._sender: asyncio.Task | None = None
+        self._watcher: asyncio.Task | None = None
+        # msg_id → (만료 시각, 조각 목록)
+        self._partial: dict[str, tuple[float, list[str | None]]] = {}
+        self._stats = {"reconnects": 0, "chunked": 0, "dropped": 0, "partial_expired": 0}
+
+    async def start(self, on_message: Callable[[str], None]):
+        self._on_message = on_message
+        self._listen_conn = await self._connect(listen=True)
+        self._notify_conn = await self._connect(listen=False)
+        self._sender = asyncio.create_task(self._send_loop())
+        self._watcher = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        for task in (self._sender, self._watcher):
+            if task is None:
+                continue
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._sender = None
+        self._watcher = None
+        if self._notify_conn is not None:
+            await self._close(self._notify_conn)
+            self._notify_conn = None
+        if self._listen_conn is not None:
+            await self._close(self._listen_conn)
+            self._listen_conn = None
+        self._partial.clear()
+
+    async def publish(self, payload: str):
+        data = payload.encode()
+        if len(data) <= _PG_NOTIFY_MAX_BYTES:
+            parts = [payload]
+        else:
+            msg_id = uuid.uuid4().hex
+            pieces = _split_utf8(data, _PG_NOTIFY_MAX_BYTES - _PG_CHUNK_HEADER_BYTES)
+            parts = [
+                f"{_PG_CHUNK_PREFIX}{msg_id}:{index}:{len(pieces)}:{piece}"
+                for index, piece in enumerate(pieces)
+            ]
+            self._stats["chunked"] += 1
+        try:
+            self._outbox.put_nowait(parts)
+        except asyncio.QueueFull:
+            # 재연결이 길어져 밀린 경우 - 새 이벤트를 버림
+            self._stats["dropped"] += 1
+            logger.warning("Hub NOTIFY outbox full, event not fanned out")
+
+    async def _connect(self, listen: bool):
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        if listen:
+            await connection.add_listener(_PG_CHANNEL, self._on_notify)
+        return connection
+
+    async def _close(self, connection):
+        try:
+            await asyncio.wait_for(connection.close(), timeout=self.health_interval)
+        except Exception:
+            connection.terminate()
+
+    async def _reconnect(self, connection, listen: bool):
+        """끊긴 연결을 버리고 성공할 때까지 백오프로 다시 연결"""
+        if connection is not None:
+            connection.terminate()
+        delay = 0.5
+        while True:
+            try:
+                connection = await self._connect(listen)
+            except Exception as e:
+                logger.warning(
+                    "Hub Postgres reconnect failed",
+                    extra={"listen": listen, "error": str(e), "retry_in": delay}
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _PG_RECONNECT_MAX_DELAY)
+                continue
+            self._stats["reconnects"] += 1
+            logger.info("Hub Postgres reconnected", extra={"listen": listen})
+            return connection
+
+    async def _watch_loop(self):
+        """LISTEN 연결 상태 확인 (조용히 끊긴 연결도 왕복으로 감지)"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                if self._listen_conn.is_closed():
+                    raise ConnectionError("connection closed")
+                await asyncio.wait_for(self._listen_conn.fetchval("select 1"), timeout=self.health_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Hub LISTEN connection lost", extra={"error": str(e)})
+                self._listen_conn = await self._reconnect(self._listen_conn, listen=True)
+
+    async def _send_loop(self):
+        while True:
+            parts = await self._outbox.get()
+            while True:
+                try:
+                    await self._notify_conn.execute(_PG_NOTIFY_SQL, _PG_CHANNEL, parts)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Hub NOTIFY failed", extra={"error": str(e)})
+                    if not self._notify_conn.is_closed():
+                        # 연결은 살아 있음 - 이 이벤트만의 문제이므로 버림
+                        break
+                    self._notify_conn = await self._reconnect(self._notify_conn, listen=False)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        if not payload.startswith(_PG_CHUNK_PREFIX):
+            self._on_message(payload)
+            return
+        payload = self._assemble(payload)
+        if payload is not None:
+            self._on_message(payload)
+
+    def _assemble(self, frame: str) -> str | None:
+        """조각 프레임 보관, 마지막 조각이 오면 원래 페이로드 반환"""
+        try:
+            msg_id, index, total, data = frame[len(_PG_CHUNK_PREFIX):].split(":", 3)
+            index, total = int(index), int(total)
+        except ValueError:
+            return None
+        if not 0 <= index < total:
+            return None
+
+        now = time.monotonic()
+        if index == 0:
+            for stale_id, (expires_at, _) in list(self._partial.items()):
+                if expires_at <= now:
+                    del self._partial[stale_id]
+                    self._stats["partial_expired"] += 1
+        _, parts = self._partial.setdefault(msg_id, (now + _PG_PARTIAL_TTL, [None] * total))
+        if len(parts) != total:
+            return None
+        parts[index] = data
+        if any(part is None for part in parts):
+            return None
+        del self._partial[msg_id]
+        return "".join(parts)
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "outbox": self._outbox.qsize(), "partial": len(self._partial)}
+
+
+class HubConnection:
+    """
+    허브에 등록된 WebSocket 하나
+
+    전송은 연결별 큐 + 전송 태스크로 직렬화하여, 느린 클라이언트가
+    스트림을 생산하는 쪽을 막지 않는다. 큐가 넘치면 연결을 끊는다.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, max_queue: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.conversations: set[str] = set()
+        self.closed = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    def send(self, event: dict) -> bool:
+        """이벤트 전송 예약 (큐가 가득 차면 연결 종료)"""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Hub client too slow, closing", extra={"user_id": self.user_id})
+            self.closed = True
+            self._task.cancel()
+            asyncio.create_task(self._close_socket())
+            return False
+
+    async def _run(self):
+        try:
+            while True:
+                event = await self._queue.get()
+                await send_json(self.websocket, event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.closed = True
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+
+    async def close(self, flush_timeout: float = 1.0):
+        """남은 이벤트를 잠시 보내 본 뒤 전송 태스크 종료"""
+        if not self.closed:
+            try:
+                await asyncio.wait_for(self._drain(), timeout=flush_timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.closed = True
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+    async def _drain(self):
+        while not self._queue.empty() and not self._task.done():
+            await asyncio.sleep(0.01)
+
+
+class ConnectionHub:
+    """
+    대화(conversation_id) 단위 구독/발행
+
+    - publish(): 이 워커의 구독자에게 바로 전달 + 백엔드로 다른 워커에 전파
+    - 다른 워커에서 온 이벤트는 이 워커의 구독자에게만 전달 (자기 워커 발행분은 무시)
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.worker_id = uuid.uuid4().hex
+        self.client_queue_size = settings.hub_client_queue_size
+        if settings.hub_backend == "postgres":
+            if not settings.database_url:
+                raise ValueError("HUB_BACKEND=postgres 에는 DATABASE_URL 이 필요합니다.")
+            self.backend = PostgresPubSub(settings.database_url, settings.hub_health_interval)
+        else:
+            self.backend = MemoryPubSub()
+
+        self._connections: set[HubConnection] = set()
+        self._subscribers: dict[str, set[HubConnection]] = {}
+        self._started = False
+        self._stats = {"published": 0, "delivered": 0, "remote_received": 0, "publish_errors": 0}
+
+    async def start(self):
+        """백엔드 연결"""
+        if not self._started:
+            await self.backend.start(self._on_backend_message)
+            self._started = True
+
+    async def stop(self):
+        """모든 연결 정리 후 백엔드 종료"""
+        for connection in list(self._connections):
+            await self.unregister(connection)
+        if self._started:
+            await self.backend.stop()
+            self._started = False
+
+    def register(self, websocket: WebSocket, user_id: str) -> HubConnection:
+        """WebSocket 등록"""
+        connection = HubConnection(websocket, user_id, self.client_queue_size)
+        self._connections.add(connection)
+        return connection
+
+    async def unregister(self, connection: HubConnection):
+        """WebSocket 해제 (구독도 모두 제거)"""
+        for conversation_id in list(connection.conversations):
+            self.unsubscribe(connection, conversation_id)
+        self._connections.discard(connection)
+        await connection.close()
+
+    def subscribe(self, connection: HubConnection, conversation_id: str):
+        """대화 이벤트 구독 (이미 해제된 연결은 무시)"""
+        if connection not in self._connections:
+            return
+        connection.conversations.add(conversation_id)
+        self._subscribers.setdefault(conversation_id, set()).add(connection)
+
+    def unsubscribe(self, connection: HubConnection, conversation_id: str):
+        """대화 이벤트 구독 해제"""
+        connection.conversations.discard(conversation_id)
+        subscribers = self._subscribers.get(conversation_id)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self._subscribers[conversation_id]
+
+    def has_subscribers(self, conversation_id: str) -> bool:
+        """이 워커에 대화를 구독 중인 연결이 있는지"""
+        return bool(self._subscribers.get(conversation_id))
+
+    async def publish(self, conversation_id: str, event: dict):
+        """대화 구독자 전체(모든 워커)에게 이벤트 전달"""
+        self._stats["published"] += 1
+        self._deliver(conversation_id, event)
+        if not self._started:
+            return
+        payload = dumps({"o": self.worker_id, "c": conversation_id, "e": event})
+        try:
+            await self.backend.publish(payload)
+        except Exception as e:
+            self._stats["publish_errors"] += 1
+            logger.warning("Hub publish failed", extra={"error": str(e)})
+
+    def _deliver(self, conversation_id: str, event: dict):
+        for connection in list(self._subscribers.get(conversation_id, ())):
+            if connection.send(event):
+                self._stats["delivered"] += 1
+
+    def _on_backend_message(self, payload: str):
+        try:
+            message = loads(payload)
+        except ValueError:
+            return
+        if message.get("o") == self.worker_id:
+            return
+        self._stats["remote_received"] += 1
+        self._deliver(message["c"], message["e"])
+
+    def get_stats(self) -> dict:
+        """연결 / 구독 / 전달 통계"""
+        return {
+            **self._stats,
+            "backend": type(self.backend).__name__,
+            "backend_stats": self.backend.get_stats(),
+            "connections": len(self._connections),
+            "conversations": len(self._subscribers)
+        }
+
+
+# 싱글톤 인스턴스
+_hub = None
+
+
+def get_hub() -> ConnectionHub:
+    """Connection Hub 싱글톤"""
+    global _hub
+    if _hub is None:
+        _hub = ConnectionHub()
+    return _hub
@@ -0,0 +1,224 @@
+"""메시지 저장 서비스 - write-behind 배치 저장"""
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from config import get_settings
+from database import RowsRejectedError, save_messages, link_message_files
+from log import get_logger
+
+logger = get_logger(__name__)
+
+
+class MessageWriter:
+    """
+    메시지 INSERT 를 스트리밍 경로에서 분리하는 write-behind 큐
+
+    - enqueue() 는 id / created_at 을 미리 채운 행을 즉시 반환
+    - 백그라운드 태스크가 크기(batch_size) 또는 시간(flush_interval) 단위로 묶어 저장
+    - 실패 시 지수 백오프(+지터)로 같은 배치를 재시도, 뒤 배치는 대기
+      → 단일 소비자 + 순차 재시도로 대화별 저장 순서 보장
+    - 행 때문에 거부된 배치(삭제된 대화 등)는 재시도하지 않고 반으로 나눠 저장,
+      거부된 행만 버린다
+    - stop() 은 큐가 빌 때까지 기다린 뒤 종료 (shutdown drain)
+    - 첨부 파일은 메시지 행이 저장된 뒤 files 행에 연결 (files.message_id 외래 키)
+    - pending_messages(): 아직 저장 전인 행 (다음 턴 히스토리에 합치기 위해)
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.batch_size = settings.message_batch_size
+        self.flush_interval = settings.message_flush_interval_ms / 1000
+        self.max_retries = settings.message_max_retries
+        self.retry_base_delay = settings.message_retry_base_delay
+        self.drain_timeout = settings.message_drain_timeout
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._last_created_at = datetime.min.replace(tzinfo=timezone.utc)
+        # 저장 대기 중인 메시지의 첨부 (메시지 id → (user_id, 경로 목록))
+        self._attachments: dict[str, tuple[str, list[str]]] = {}
+        # 저장이 끝나지 않은 행 (대화 id → 메시지 id → 행, 큐 순서)
+        self._pending: dict[str, dict[str, dict]] = {}
+        self._stats = {
+            "enqueued": 0, "saved": 0, "batches": 0, "retries": 0, "dropped": 0, "rejected": 0, "splits": 0,
+            "files_linked": 0, "file_link_failures": 0
+        }
+
+    def start(self):
+        """백그라운드 flush 태스크 시작 (이벤트 루프 안에서 호출)"""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """남은 메시지를 모두 저장한 뒤 태스크 종료"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error("Message writer drain timed out", extra={"unsaved": self._queue.qsize()})
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def enqueue(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        truncated: bool = False,
+        files: list[str] | None = None,
+        user_id: str | None = None
+    ) -> dict:
+        """
+        메시지 저장 예약
+
+        Args:
+            truncated: 취소/연결 끊김으로 중간에 멈춘 응답이면 True
+            files: 첨부 파일 경로 - 저장 후 user_id 소유 files 행을 이 메시지에 연결
+
+        Returns:
+            저장될 메시지 행 (id, created_at 포함) - DB 반영 전에 바로 사용 가능
+        """
+        self.start()
+        row = {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "truncated": truncated,
+            "created_at": self._next_created_at()
+        }
+        if files and user_id:
+            self._attachments[row["id"]] = (user_id, list(dict.fromkeys(files)))
+        self._pending.setdefault(conversation_id, {})[row["id"]] = row
+        self._queue.put_nowait(row)
+        self._stats["enqueued"] += 1
+        return row
+
+    def pending_messages(self, conversation_id: str) -> list[dict]:
+        """
+        대화에서 아직 저장이 끝나지 않은 행 (오래된 순)
+
+        이 워커의 큐에 있는 행만 알 수 있다. 저장 중인 배치도 포함하므로
+        DB 조회 결과와 id 가 겹칠 수 있다.
+        """
+        return list(self._pending.get(conversation_id, {}).values())
+
+    def _next_created_at(self) -> str:
+        """
+        프로세스 내에서 단조 증가하는 created_at
+
+        한 배치가 같은 트랜잭션 시각(now())을 받으면 (created_at, id) 정렬이
+        uuid 순서로 섞이므로, 시각을 직접 지정한다.
+        """
+        now = datetime.now(timezone.utc)
+        if now <= self._last_created_at:
+            now = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = now
+        return now.isoformat()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            finally:
+                for row in batch:
+                    self._forget(row)
+                    self._queue.task_done()
+
+    async def _flush(self, batch: list[dict]):
+        """배치 저장 (일시 오류는 지수 백오프 재시도, 거부된 배치는 나눠서 저장)"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                saved = await save_messages(batch)
+            except RowsRejectedError as e:
+                await self._split(batch, e)
+                return
+            if saved:
+                self._stats["saved"] += len(batch)
+                self._stats["batches"] += 1
+                await self._link_files(batch)
+                return
+            if attempt < self.max_retries:
+                self._stats["retries"] += 1
+                delay = self.retry_base_delay * (2 ** attempt)
+                await asyncio.sleep(delay * (0.5 + random.random()))
+
+        self._stats["dropped"] += len(batch)
+        for row in batch:
+            self._attachments.pop(row["id"], None)
+        logger.error("Dropped messages after retries", extra={"messages": len(batch), "retries": self.max_retries})
+
+    async def _split(self, batch: list[dict], error: RowsRejectedError):
+        """거부된 배치를 반씩 다시 저장 - 한 행만 남으면 그 행을 버림"""
+        if len(batch) == 1:
+            row = batch[0]
+            self._stats["rejected"] += 1
+            self._attachments.pop(row["id"], None)
+            logger.error("Message rejected by database, dropped", extra={
+                "message_id": row["id"], "conversation_id": row["conversation_id"], "error": str(error)
+            })
+            return
+        self._stats["splits"] += 1
+        middle = len(batch) // 2
+        # 앞 절반부터 순서대로 (대화별 저장 순서 유지)
+        await self._flush(batch[:middle])
+        await self._flush(batch[middle:])
+
+    def _forget(self, row: dict):
+        """저장(또는 포기)한 행을 대기 목록에서 제거"""
+        rows = self._pending.get(row["conversation_id"])
+        if rows is not None:
+            rows.pop(row["id"], None)
+            if not rows:
+                del self._pending[row["conversation_id"]]
+
+    async def _link_files(self, batch: list[dict]):
+        """저장된 메시지의 첨부 files 행 연결 (실패해도 메시지 저장은 유지)"""
+        for row in batch:
+            attachment = self._attachments.pop(row["id"], None)
+            if attachment is None:
+                continue
+            user_id, paths = attachment
+            linked = await link_message_files(row["id"], user_id, paths)
+            if linked is None:
+                self._stats["file_link_failures"] += 1
+            else:
+                self._stats["files_linked"] += linked
+
+    def get_stats(self) -> dict:
+        """큐 / 저장 통계"""
+        return {
+            **self._stats,
+            "pending": self._queue.qsize() if self._queue else 0
+        }
+
+
+# 싱글톤 인스턴스
+_message_writer = None
+
+
+def get_message_writer() -> MessageWriter:
+    """Message Writer 싱글톤"""
+    global _message_writer
+    if _message_writer is None:
+        _message_writer = MessageWriter()
+    return _message_writer
@@ -0,0 +1,161 @@
+"""첨부 전처리 서비스 - 이미지 축소 / 썸네일 / PDF 텍스트 추출 (프로세스 풀)"""
+import asyncio
+import importlib.util
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import media
+from config import get_settings
+from log import get_logger
+
+logger = get_logger(__name__)
+
+IMAGE_TYPES = {"image/png", "image/jpeg", "image/jpg", "image/gif", "image/webp"}
+PDF_TYPE = "application/pdf"
+
+
+class PreprocessService:
+    """
+    업로드된 원본에서 파생 결과물 생성
+
+    - 이미지: 모델 입력 해상도(image_max_edge)로 축소 / 재인코딩 + UI 썸네일
+    - PDF: 텍스트 레이어 추출 (첨부 시 PDF 대신 텍스트로 보낼 수 있음)
+
+    픽셀 / 파싱 작업은 preprocess_workers 개의 프로세스 풀에서만 실행하고,
+    동시에 넘기는 작업 수도 같은 수로 제한한다. (나머지는 이벤트 루프에서 대기)
+    Pillow / pypdf 가 없으면 해당 단계를 건너뛰고 원본만 저장한다.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.workers = settings.preprocess_workers
+        self.timeout = settings.preprocess_timeout
+        self.image_max_edge = settings.image_max_edge
+        self.thumbnail_max_edge = settings.thumbnail_max_edge
+        self.image_reencode_min_bytes = settings.image_reencode_min_kb * 1024
+        self.image_quality = settings.image_quality
+        self.pdf_text_max_chars = settings.pdf_text_max_chars
+
+        self.images_enabled = self.workers > 0 and importlib.util.find_spec("PIL") is not None
+        self.pdf_enabled = self.workers > 0 and importlib.util.find_spec("pypdf") is not None
+        if self.workers > 0 and not self.images_enabled:
+            logger.warning("Pillow 패키지가 없어 이미지 전처리를 건너뜁니다. (pip install Pillow)")
+        if self.workers > 0 and not self.pdf_enabled:
+            logger.warning("pypdf 패키지가 없어 PDF 텍스트 추출을 건너뜁니다. (pip install pypdf)")
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._slots = asyncio.Semaphore(max(self.workers, 1))
+        self._stats = {
+            "images": 0,
+            "pdfs": 0,
+            "failures": 0,
+            "timeouts": 0,
+            "bytes_in": 0,
+            "bytes_out": 0,  # 모델 입력용 이미지 (축소 / 재인코딩된 것만)
+        }
+
+    def supports(self, mime_type: str) -> bool:
+        """이 형식을 전처리하는지"""
+        if mime_type in IMAGE_TYPES:
+            return self.images_enabled
+        return mime_type == PDF_TYPE and self.pdf_enabled
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # fork 대신 spawn - 부모의 스레드 / 이벤트 루프 상태를 물려받지 않음
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def process(self, local_path: str, mime_type: str, file_size: int) -> dict:
+        """
+        원본 임시 파일 → 파생 결과물
+
+        Returns:
+            이미지: {"width", "height", "thumbnail": (bytes, mime), "model_image"?: (bytes, mime)}
+            PDF: {"text": str} (텍스트가 없으면 {})
+            전처리하지 않는 형식 / 실패 / 시간 초과: {} (업로드는 원본만으로 계속)
+        """
+        if not self.supports(mime_type):
+            return {}
+
+        if mime_type in IMAGE_TYPES:
+            task = (
+                media.process_image, local_path, self.image_max_edge, self.thumbnail_max_edge,
+                self.image_reencode_min_bytes, self.image_quality
+            )
+        else:
+            task = (media.extract_pdf_text, local_path, self.pdf_text_max_chars)
+
+        async with self._slots:
+            pool = self._get_pool()
+            try:
+                future = asyncio.get_running_loop().run_in_executor(pool, *task)
+                result = await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                # 멈춘 작업이 워커를 계속 붙잡지 않도록 (호출자가 지운 임시 파일을 읽지도 않도록)
+                # 워커를 종료하고 풀을 새로 만듦 - 같은 풀의 다른 작업은 원본만으로 계속
+                self._stats["timeouts"] += 1
+                logger.warning("Preprocessing timed out", extra={"mime_type": mime_type, "file_size": file_size})
+                self._recycle(pool)
+                return {}
+            except BrokenProcessPool:
+                # 워커가 죽으면 (메모리 부족, 시간 초과로 종료 등) 풀을 새로 만듦
+                self._stats["failures"] += 1
+                logger.error("Preprocessing pool broken", extra={"mime_type": mime_type})
+                self._recycle(pool)
+                return {}
+            except Exception as e:
+                self._stats["failures"] += 1
+                logger.warning("Preprocessing failed", extra={"mime_type": mime_type, "error": str(e)})
+                return {}
+
+        if mime_type == PDF_TYPE:
+            self._stats["pdfs"] += 1
+            return {"text": result} if result else {}
+
+        self._stats["images"] += 1
+        if "model_image" in result:
+            self._stats["bytes_in"] += file_size
+            self._stats["bytes_out"] += len(result["model_image"][0])
+        return result
+
+    def _recycle(self, pool: ProcessPoolExecutor):
+        """풀 폐기 + 실행 중인 워커 종료 (다음 작업은 새 풀에서)"""
+        if self._pool is pool:
+            self._pool = None
+        # shutdown 은 실행 중인 작업을 멈추지 않으므로 워커 프로세스를 직접 종료
+        processes = list((pool._processes or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    def shutdown(self):
+        """프로세스 풀 종료 (진행 중인 작업은 취소)"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def get_stats(self) -> dict:
+        """전처리 통계"""
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "images_enabled": self.images_enabled,
+            "pdf_enabled": self.pdf_enabled,
+        }
+
+
+# 싱글톤 인스턴스
+_preprocess_service = None
+
+
+def get_preprocess_service() -> PreprocessService:
+    """Preprocess Service 싱글톤"""
+    global _preprocess_service
+    if _preprocess_service is None:
+        _preprocess_service = PreprocessService()
+    return _preprocess_service
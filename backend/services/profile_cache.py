@@ -0,0 +1,91 @@
+"""프로필 캐시 - 존재가 확인된 프로필 id + 프로필 행 (LRU + TTL, 명시적 무효화)"""
+import time
+from collections import OrderedDict
+from config import get_settings
+from database import ensure_profile, get_user_profile
+
+
+class ProfileCache:
+    """
+    profiles 조회 / 생성 왕복 줄이기
+
+    - ensure(user_id): 새 대화 전에 프로필이 있는지 보장. 캐시에 있으면 DB 호출 없음,
+      없으면 idempotent upsert 한 번 (select → insert 두 번 대신)
+    - get(user_id): /api/auth/me 용 프로필 행 캐시
+    - invalidate(user_id): 프로필이 바뀌거나 지워졌을 때 (다음 호출에서 다시 확인)
+
+    워커(프로세스)마다 따로 캐시하므로, 다른 곳에서 프로필을 지우면 TTL 동안은
+    존재한다고 볼 수 있다. 그때 대화 생성이 실패하면 호출 측이 invalidate 한다.
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.ttl = settings.profile_cache_ttl
+        self.max_entries = settings.profile_cache_max_entries
+
+        # user_id → (만료 시각, 프로필 행 | None) - None 이면 존재만 확인된 상태
+        self._entries: OrderedDict[str, tuple[float, dict | None]] = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "upserts": 0, "invalidations": 0}
+
+    def _lookup(self, user_id: str) -> tuple[float, dict | None] | None:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def _store(self, user_id: str, row: dict | None):
+        self._entries[user_id] = (time.monotonic() + self.ttl, row)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def ensure(self, user_id: str) -> bool:
+        """프로필 존재 보장 (실패하면 False)"""
+        if self._lookup(user_id) is not None:
+            self._stats["hits"] += 1
+            return True
+        self._stats["misses"] += 1
+        self._stats["upserts"] += 1
+        if not await ensure_profile(user_id, f"User {user_id[:8]}"):
+            return False
+        # 행 내용은 모르므로 존재만 기록 (get 은 다시 조회)
+        if self._lookup(user_id) is None:
+            self._store(user_id, None)
+        return True
+
+    async def get(self, user_id: str) -> dict | None:
+        """프로필 행 (없으면 None, 없는 결과는 캐시하지 않음)"""
+        entry = self._lookup(user_id)
+        if entry is not None and entry[1] is not None:
+            self._stats["hits"] += 1
+            return entry[1]
+        self._stats["misses"] += 1
+        profile = await get_user_profile(user_id)
+        if profile is not None:
+            self._store(user_id, profile)
+        return profile
+
+    def invalidate(self, user_id: str):
+        """캐시에서 제거 (프로필 수정 / 삭제 / 참조 오류 시)"""
+        if self._entries.pop(user_id, None) is not None:
+            self._stats["invalidations"] += 1
+
+    def get_stats(self) -> dict:
+        """적중 / upsert 통계"""
+        return {**self._stats, "cached_profiles": len(self._entries)}
+
+
+# 싱글톤 인스턴스
+_profile_cache = None
+
+
+def get_profile_cache() -> ProfileCache:
+    """Profile Cache 싱글톤"""
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = ProfileCache()
+    return _profile_cache
@@ -0,0 +1,196 @@
+"""스트림 재개 버퍼 - 턴별 청크에 순번을 매겨 끊긴 클라이언트가 이어 받도록 보관"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import aclosing
+from typing import AsyncIterator
+from config import get_settings
+
+
+class TurnExpiredError(KeyError):
+    """버퍼에서 만료/제거된 턴"""
+
+
+class _Turn:
+    __slots__ = (
+        "turn_id", "user_id", "conversation_id", "chunks", "size",
+        "done", "final_event", "expires_at", "changed", "followers"
+    )
+
+    def __init__(self, turn_id: str, user_id: str | None, conversation_id: str | None):
+        self.turn_id = turn_id
+        self.user_id = user_id
+        self.conversation_id = conversation_id
+        self.chunks: list[str] = []  # seq = 인덱스 + 1
+        self.size = 0
+        self.done = False
+        self.final_event: dict | None = None
+        self.expires_at: float | None = None
+        self.changed = asyncio.Event()
+        self.followers = 0  # follow() 로 따라가는 중인 클라이언트 수
+
+
+class ReplayBuffer:
+    """
+    스트리밍 턴 재개용 버퍼 (프로세스 메모리)
+
+    - 턴마다 turn_id, 청크마다 1부터 증가하는 seq
+    - follow(turn_id, last_seq): 놓친 청크를 먼저 보내고 이후 라이브 청크를 이어서 전달
+    - 완료된 턴은 TTL 후 만료, 전체 바이트가 상한을 넘으면 오래된 완료 턴부터 제거
+      (진행 중인 턴은 제거하지 않음 - /stream 응답 본문도 이 버퍼를 따라가므로,
+      진행 중 턴을 지우면 연결된 클라이언트의 응답이 끊긴다. 진행 중 턴만으로
+      상한을 넘으면 끝날 때까지 잠시 초과를 허용)
+
+    재연결은 턴을 생성한 워커로 와야 한다 (sticky session).
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.ttl = settings.replay_ttl
+        self.max_bytes = settings.replay_max_mb * 1024 * 1024
+
+        self._turns: OrderedDict[str, _Turn] = OrderedDict()
+        self._bytes = 0
+        # over_limit: 진행 중인 턴만으로 상한을 넘은 횟수
+        self._stats = {"turns": 0, "follows": 0, "evicted": 0, "expired": 0, "over_limit": 0}
+
+    def start_turn(self, user_id: str | None, conversation_id: str | None = None) -> str:
+        """새 턴 등록"""
+        self._purge_expired()
+        turn_id = str(uuid.uuid4())
+        self._turns[turn_id] = _Turn(turn_id, user_id, conversation_id)
+        self._stats["turns"] += 1
+        return turn_id
+
+    def append(self, turn_id: str, chunk: str) -> int:
+        """청크 추가 후 seq 반환 (제거된 턴이면 0)"""
+        turn = self._turns.get(turn_id)
+        if turn is None:
+            return 0
+        turn.chunks.append(chunk)
+        size = len(chunk.encode())
+        turn.size += size
+        self._bytes += size
+        self._notify(turn)
+        if self._bytes > self.max_bytes:
+            self._evict()
+        return len(turn.chunks)
+
+    def finish(self, turn_id: str, final_event: dict | None = None):
+        """턴 완료 (final_event: 재개한 클라이언트에게 마지막으로 보낼 이벤트)"""
+        turn = self._turns.get(turn_id)
+        if turn is None or turn.done:
+            return
+        turn.done = True
+        turn.final_event = final_event
+        turn.expires_at = time.monotonic() + self.ttl
+        self._notify(turn)
+        # 진행 중이라 남겨 둔 만큼의 초과분 정리
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def get_turn(self, turn_id: str) -> _Turn | None:
+        """턴 조회 (만료되었으면 None)"""
+        turn = self._turns.get(turn_id)
+        if turn is not None and turn.expires_at is not None and turn.expires_at <= time.monotonic():
+            self._remove(turn_id)
+            self._stats["expired"] += 1
+            return None
+        return turn
+
+    async def follow(self, turn_id: str, last_seq: int = 0) -> AsyncIterator[tuple[int, str]]:
+        """
+        last_seq 이후 청크를 (seq, chunk) 로 전달, 턴이 끝날 때까지 라이브로 이어감
+
+        Raises:
+            TurnExpiredError: 없는 턴이거나 도중에 버퍼에서 제거됨
+        """
+        turn = self.get_turn(turn_id)
+        if turn is None:
+            raise TurnExpiredError(turn_id)
+        self._stats["follows"] += 1
+
+        sent = max(last_seq, 0)
+        turn.followers += 1
+        try:
+            while True:
+                changed = turn.changed
+                while sent < len(turn.chunks):
+                    sent += 1
+                    yield sent, turn.chunks[sent - 1]
+                if turn.done:
+                    return
+                await changed.wait()
+                # 완료 후 제거된 턴은 이미 가진 청크를 마저 보내고 끝냄
+                if self._turns.get(turn_id) is not turn and not turn.done:
+                    raise TurnExpiredError(turn_id)
+        finally:
+            turn.followers -= 1
+
+    async def follow_bytes(self, turn_id: str, offset: int = 0) -> AsyncIterator[bytes]:
+        """
+        UTF-8 바이트 오프셋 이후를 전달 (청크 경계를 모르는 text/plain 스트림 재개용)
+
+        Raises:
+            TurnExpiredError: 없는 턴이거나 도중에 버퍼에서 제거됨
+        """
+        skip = max(offset, 0)
+        async with aclosing(self.follow(turn_id, 0)) as chunks:
+            async for _, chunk in chunks:
+                data = chunk.encode()
+                if skip >= len(data):
+                    skip -= len(data)
+                    continue
+                yield data[skip:]
+                skip = 0
+
+    def _notify(self, turn: _Turn):
+        turn.changed.set()
+        turn.changed = asyncio.Event()
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for turn_id, turn in list(self._turns.items()):
+            if turn.expires_at is not None and turn.expires_at <= now:
+                self._remove(turn_id)
+                self._stats["expired"] += 1
+
+    def _evict(self):
+        """메모리 상한 초과 - 오래된 완료 턴부터 제거 (진행 중인 턴은 유지)"""
+        for turn_id, turn in list(self._turns.items()):
+            if self._bytes <= self.max_bytes:
+                return
+            if not turn.done:
+                continue
+            self._remove(turn_id)
+            self._stats["evicted"] += 1
+        if self._bytes > self.max_bytes:
+            self._stats["over_limit"] += 1
+
+    def _remove(self, turn_id: str):
+        turn = self._turns.pop(turn_id, None)
+        if turn is not None:
+            self._bytes -= turn.size
+            # 대기 중인 follow() 를 깨워 제거를 알림
+            self._notify(turn)
+
+    def get_stats(self) -> dict:
+        """버퍼 통계"""
+        return {
+            **self._stats,
+            "buffered_turns": len(self._turns),
+            "bytes": self._bytes
+        }
+
+
+# 싱글톤 인스턴스
+_replay_buffer = None
+
+
+def get_replay_buffer() -> ReplayBuffer:
+    """Replay Buffer 싱글톤"""
+    global _replay_buffer
+    if _replay_buffer is None:
+        _replay_buffer = ReplayBuffer()
+    return _replay_buffer
@@ -0,0 +1,121 @@
+"""응답 캐시 - 반복 프롬프트의 Claude 응답 재사용 (LRU + TTL + 메모리 상한)"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from config import get_settings
+
+# 재생 시 한 번에 내보내는 최대 글자 수
+_REPLAY_CHUNK_CHARS = 1024
+
+
+class ResponseCache:
+    """
+    완료된 응답 텍스트를 메모리에 캐시 (opt-in, RESPONSE_CACHE_ENABLED)
+
+    stop_reason 이 end_turn 인 응답만 저장한다 (호출부에서 확인).
+
+    키: 모델 + 정규화된 메시지 + 컨텍스트(히스토리) 해시 + 첨부 파일 목록
+    만료: TTL, 항목 수 / 전체 바이트 상한을 넘으면 가장 오래 안 쓴 것부터 제거
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.enabled = settings.response_cache_enabled
+        self.ttl = settings.response_cache_ttl
+        self.max_entries = settings.response_cache_max_entries
+        self.max_bytes = settings.response_cache_max_mb * 1024 * 1024
+
+        self._entries: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @staticmethod
+    def make_key(
+        model: str,
+        message: str,
+        history: list[dict] | None,
+        files: list[str] | None
+    ) -> str:
+        """캐시 키 생성"""
+        normalized = " ".join(message.split()).casefold()
+        context = [(row.get("role"), row.get("content")) for row in history or []]
+        context_hash = hashlib.sha256(
+            json.dumps(context, ensure_ascii=False).encode()
+        ).hexdigest()
+        raw = json.dumps(
+            [model, normalized, context_hash, sorted(files or [])],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """캐시 조회 (만료 항목은 제거)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+
+        expires_at, text, size = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._stats["expired"] += 1
+            self._stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return text
+
+    def put(self, key: str, text: str):
+        """완료된 응답 저장"""
+        size = len(text.encode())
+        if not text or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, text, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def replay(text: str):
+        """캐시된 응답을 스트리밍 청크로 분할"""
+        for start in range(0, len(text), _REPLAY_CHUNK_CHARS):
+            yield text[start:start + _REPLAY_CHUNK_CHARS]
+
+    def _remove(self, key: str):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """전체 비우기"""
+        self._entries.clear()
+        self._bytes = 0
+
+    def get_stats(self) -> dict:
+        """적중/미스 통계"""
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "hit_ratio": round(self._stats["hits"] / lookups, 3) if lookups else None,
+            "entries": len(self._entries),
+            "bytes": self._bytes
+        }
+
+
+# 싱글톤 인스턴스
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Response Cache 싱글톤"""
+    global _response_cache
+    if _response_cache is None:
+        _response_cache = ResponseCache()
+    return _response_cache
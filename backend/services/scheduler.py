@@ -0,0 +1,175 @@
+"""Claude 호출 스케줄러 - 동시 실행 상한 + 사용자별 토큰 버킷 + 공정 대기열"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+from config import get_settings
+
+# 대기 중 순번 확인 주기 (초)
+_POSITION_POLL_INTERVAL = 1.0
+# 버킷 정리 기준 (가득 찬 버킷은 기본 상태와 같으므로 삭제 가능)
+_MAX_BUCKETS = 10000
+
+
+class ClaudeScheduler:
+    """
+    Claude API 호출 입장 제어
+
+    1. 사용자별 토큰 버킷 - 분당 요청 수를 넘으면 토큰이 찰 때까지 대기
+    2. 전역 동시 실행 상한 - 넘으면 대기열에 들어감
+    3. 대기열은 사용자 단위 라운드로빈 - 한 사용자가 몰아 보내도 다른 사용자가 밀리지 않음
+    """
+
+    def __init__(self):
+        settings = get_settings()
+        self.max_concurrency = settings.claude_max_concurrency
+        self.rate_per_sec = settings.claude_user_rate_per_min / 60
+        self.burst = settings.claude_user_burst
+
+        self._active = 0
+        self._waiting: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._buckets: dict[str, tuple[float, float]] = {}
+        self._stats = {"admitted": 0, "queued": 0, "throttled": 0}
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        user_id: str | None,
+        on_position: Callable[[int], Awaitable[None]] | None = None,
+        throttle: bool = True
+    ):
+        """
+        실행 슬롯 획득 (async with)
+
+        Args:
+            user_id: 인증된 요청 사용자 (없으면 익명 하나로 취급)
+            on_position: 대기 중 순번이 바뀔 때 호출 (1부터)
+            throttle: False 면 토큰 버킷을 건너뜀 (같은 턴의 재시도 - 턴마다 한 번만 차감)
+        """
+        user_key = user_id or "anonymous"
+        if throttle:
+            await self._throttle(user_key)
+        await self._acquire(user_key, on_position)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _throttle(self, user_key: str):
+        """토큰 버킷에서 1개 소비 (부족하면 찰 때까지 대기)"""
+        if self.rate_per_sec <= 0:
+            return
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(user_key, (float(self.burst), now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate_per_sec)
+
+        # 대기 시간만큼 미리 소비해 두어 동시 요청도 순서대로 간격이 벌어짐
+        tokens -= 1
+        self._buckets[user_key] = (tokens, now)
+        if len(self._buckets) > _MAX_BUCKETS:
+            self._prune_buckets(now)
+
+        if tokens < 0:
+            self._stats["throttled"] += 1
+            await asyncio.sleep(-tokens / self.rate_per_sec)
+
+    def _prune_buckets(self, now: float):
+        for key, (tokens, updated) in list(self._buckets.items()):
+            if tokens + (now - updated) * self.rate_per_sec >= self.burst:
+                del self._buckets[key]
+
+    async def _acquire(self, user_key: str, on_position):
+        if self._active < self.max_concurrency and not self._waiting:
+            self._active += 1
+            self._stats["admitted"] += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user_key, deque()).append(future)
+        self._stats["queued"] += 1
+
+        last_position = None
+        try:
+            while not future.done():
+                if on_position is not None:
+                    position = self._position(future)
+                    if position != last_position:
+                        last_position = position
+                        await on_position(position)
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), _POSITION_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # 슬롯을 넘겨받은 직후 취소됨 → 다음 대기자에게 반환
+                self._release()
+            else:
+                future.cancel()
+                self._discard(user_key, future)
+            raise
+        self._stats["admitted"] += 1
+
+    def _release(self):
+        """슬롯 반환 - 대기자가 있으면 라운드로빈으로 다음 사용자에게 넘김"""
+        while self._waiting:
+            user_key, queue = next(iter(self._waiting.items()))
+            future = queue.popleft()
+            if queue:
+                self._waiting.move_to_end(user_key)
+            else:
+                del self._waiting[user_key]
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _discard(self, user_key: str, future: asyncio.Future):
+        queue = self._waiting.get(user_key)
+        if queue is None:
+            return
+        try:
+            queue.remove(future)
+        except ValueError:
+            pass
+        if not queue:
+            del self._waiting[user_key]
+
+    def _position(self, future: asyncio.Future) -> int:
+        """라운드로빈 순서를 따라갔을 때 몇 번째로 입장하는지"""
+        position = 0
+        queues = [list(queue) for queue in self._waiting.values()]
+        depth = 0
+        while True:
+            remaining = False
+            for queue in queues:
+                if depth < len(queue):
+                    remaining = True
+                    position += 1
+                    if queue[depth] is future:
+                        return position
+            if not remaining:
+                return position
+            depth += 1
+
+    def get_stats(self) -> dict:
+        """동시 실행 / 대기열 통계"""
+        return {
+            **self._stats,
+            "active": self._active,
+            "waiting": sum(len(queue) for queue in self._waiting.values()),
+            "max_concurrency": self.max_concurrency
+        }
+
+
+# 싱글톤 인스턴스
+_scheduler = None
+
+
+def get_scheduler() -> ClaudeScheduler:
+    """Claude Scheduler 싱글톤"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = ClaudeScheduler()
+    return _scheduler
@@ -0,0 +1,145 @@
+"""Anthropic SSE 파서 - 바이트 단위 증분 파싱 + 타입별 이벤트"""
+import json
+from typing import NamedTuple
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson 이 없으면 표준 json (bytes 입력 지원)
+    _loads = json.loads
+
+# 이벤트 종류
+TEXT = "text"      # text: 텍스트 델타
+USAGE = "usage"    # data: usage (message_start / message_delta, 나중 값이 우선)
+STOP = "stop"      # data: {"stop_reason", "stop_sequence"}
+ERROR = "error"    # data: {"type", "message"}
+PING = "ping"
+
+
+class SSEEvent(NamedTuple):
+    """파싱된 스트림 이벤트"""
+    kind: str
+    text: str = ""
+    data: dict | None = None
+
+
+_PING = SSEEvent(PING)
+
+
+def _event(kind: str, text: str = "", data: dict | None = None) -> SSEEvent:
+    # NamedTuple 기본 __new__ 보다 빠른 생성 (토큰마다 호출)
+    return tuple.__new__(SSEEvent, (kind, text, data))
+
+
+def _dict(value) -> dict:
+    """객체가 와야 할 자리에 다른 값이 오면 빈 dict"""
+    return value if isinstance(value, dict) else {}
+
+
+class SSEParser:
+    """
+    Messages API 스트림을 바이트 단위로 받아 이벤트로 변환
+
+    - feed(chunk) 는 완성된 이벤트만 반환하고 나머지 바이트는 다음 호출까지 보관
+      (청크 경계가 줄/UTF-8 문자 중간이어도 안전)
+    - 줄바꿈은 LF / CRLF 지원
+    - event: 줄로 ping 은 JSON 파싱 없이 처리
+    - content_block_start/stop, message_stop, tool 입력 델타 등은 무시
+    - JSON 객체가 아닌 data 는 error 이벤트 (invalid_event) 로 전달
+    """
+
+    __slots__ = ("_buffer", "_pending_cr")
+
+    def __init__(self):
+        self._buffer = b""
+        self._pending_cr = False
+
+    def feed(self, chunk: bytes) -> list[SSEEvent]:
+        """바이트 청크 추가 후 완성된 이벤트 반환"""
+        if self._pending_cr:
+            chunk = b"\r" + chunk
+            self._pending_cr = False
+        if b"\r" in chunk:
+            if chunk.endswith(b"\r"):
+                chunk = chunk[:-1]
+                self._pending_cr = True
+            chunk = chunk.replace(b"\r\n", b"\n")
+
+        buffer = self._buffer + chunk if self._buffer else chunk
+        end = buffer.rfind(b"\n\n")
+        if end < 0:
+            self._buffer = buffer
+            return []
+        self._buffer = buffer[end + 2:]
+
+        events: list[SSEEvent] = []
+        for block in buffer[:end].split(b"\n\n"):
+            # 빠른 경로: Anthropic 이 보내는 "event: 이름\ndata: JSON" 한 쌍
+            if block.startswith(b"event: "):
+                split = block.find(b"\ndata: ")
+                if split > 0 and block.find(b"\n", split + 7) < 0:
+                    self._dispatch(block[7:split], block[split + 7:], events)
+                    continue
+            if block:
+                self._parse_block(block, events)
+        return events
+
+    def _parse_block(self, block: bytes, events: list[SSEEvent]):
+        """일반 SSE 블록 (여러 data: 줄, 주석, event: 생략 등)"""
+        name = None
+        data = None
+        for line in block.split(b"\n"):
+            if line.startswith(b"data:"):
+                value = line[6:] if line[5:6] == b" " else line[5:]
+                data = value if data is None else data + b"\n" + value
+            elif line.startswith(b"event:"):
+                name = line[6:].strip()
+        if data is not None:
+            self._dispatch(name, data, events)
+        elif name == b"ping":
+            events.append(_PING)
+
+    @staticmethod
+    def _dispatch(name: bytes | None, data: bytes, events: list[SSEEvent]):
+        if name == b"ping":
+            events.append(_PING)
+            return
+        if data == b"[DONE]":
+            return
+        try:
+            payload = _loads(data)
+        except ValueError:
+            return
+        if not isinstance(payload, dict):
+            events.append(_event(ERROR, data={
+                "type": "invalid_event",
+                "message": f"Expected a JSON object, got {type(payload).__name__}"
+            }))
+            return
+
+        event_type = payload.get("type")
+        if event_type == "content_block_delta":
+            delta = _dict(payload.get("delta"))
+            if delta.get("type") == "text_delta":
+                text = delta.get("text")
+                if text and isinstance(text, str):
+                    events.append(_event(TEXT, text))
+        elif event_type == "message_start":
+            usage = _dict(_dict(payload.get("message")).get("usage"))
+            if usage:
+                events.append(_event(USAGE, data=usage))
+        elif event_type == "message_delta":
+            usage = _dict(payload.get("usage"))
+            if usage:
+                events.append(_event(USAGE, data=usage))
+            delta = _dict(payload.get("delta"))
+            if delta.get("stop_reason"):
+                events.append(_event(STOP, data={
+                    "stop_reason": delta["stop_reason"],
+                    "stop_sequence": delta.get("stop_sequence")
+                }))
+        elif event_type == "error":
+            events.append(_event(ERROR, data=_dict(payload.get("error"))))
+        elif event_type == "ping":
+            events.append(_PING)
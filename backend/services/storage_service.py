@@ -1,11 +1,31 @@
 """파일 업로드 서비스 - Supabase Storage"""
+import asyncio
+import hashlib
 import os
+import tempfile
 import uuid
 from datetime import datetime
-from database import get_supabase_client
+from typing import AsyncIterator
+import aiofiles
+import aiofiles.os
+from database import get_supabase_client, run_db, find_file_by_hash, create_file_record, FILE_DERIVED_COLUMNS
 from config import get_settings
+from log import get_logger
+from services.preprocess_service import get_preprocess_service
 
 settings = get_settings()
+logger = get_logger(__name__)
+
+# 전처리 이미지 확장자
+_IMAGE_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png"}
+
+
+class FileTooLargeError(ValueError):
+    """max_file_size_mb 초과"""
+
+
+class FileTypeNotAllowedError(ValueError):
+    """allowed_file_types 에 없는 MIME 타입"""
 
 
 class StorageService:
@@ -70,25 +90,177 @@ class StorageService:
                 "public_url": public_url
             }
 
+        except Exception:
+            logger.error("File upload failed", exc_info=True)
+            return None
+
+    async def upload_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        file_name: str,
+        mime_type: str,
+        user_id: str
+    ) -> dict | None:
+        """
+        스트리밍 파일 업로드 (메모리 사용량 일정)
+
+        청크를 임시 파일에 쓰면서 크기 제한과 SHA-256 을 동시에 처리한다.
+        같은 사용자가 같은 내용을 이미 올렸다면 Storage 업로드는 건너뛰고
+        기존 경로(전처리 결과 포함)를 가리키는 files 행만 추가한다.
+
+        새 파일은 원본 업로드와 전처리(프로세스 풀)를 동시에 진행하고,
+        파생 파일(모델 입력용 이미지 / 썸네일 / PDF 텍스트)을 원본 옆에 저장한다.
+
+        Args:
+            chunks: 요청 바디 청크 스트림
+            file_name: 원본 파일명
+            mime_type: MIME 타입
+            user_id: 사용자 ID
+
+        Returns:
+            files 행 + public_url, thumbnail_url, deduplicated (Storage/DB 실패 시 None)
+
+        Raises:
+            FileTypeNotAllowedError: 허용되지 않은 MIME 타입 (바디를 읽기 전에 거부)
+            FileTooLargeError: 제한 크기를 넘는 순간 거부
+        """
+        if mime_type not in settings.allowed_file_types:
+            raise FileTypeNotAllowedError(f"File type not allowed: {mime_type}")
+
+        max_size = settings.max_file_size_mb * 1024 * 1024
+        digest = hashlib.sha256()
+        file_size = 0
+
+        fd, temp_path = tempfile.mkstemp(prefix="upload_")
+        os.close(fd)
+        try:
+            async with aiofiles.open(temp_path, "wb") as temp_file:
+                async for chunk in chunks:
+                    file_size += len(chunk)
+                    if file_size > max_size:
+                        raise FileTooLargeError(
+                            f"File too large: over {max_size} bytes"
+                        )
+                    digest.update(chunk)
+                    await temp_file.write(chunk)
+
+            sha256 = digest.hexdigest()
+            file_extension = os.path.splitext(file_name)[1].lower()
+            # 사용자별 content-addressed 경로
+            file_path = f"{user_id}/sha256/{sha256}{file_extension}"
+
+            existing = await find_file_by_hash(user_id, sha256)
+            deduplicated = existing is not None
+            if deduplicated:
+                file_path = existing["file_path"]
+                derived = {column: existing.get(column) for column in FILE_DERIVED_COLUMNS.split(",")}
+            else:
+                _, artifacts = await asyncio.gather(
+                    run_db(self._upload_path, temp_path, file_path, mime_type),
+                    get_preprocess_service().process(temp_path, mime_type, file_size)
+                )
+                derived = await self._store_derived(file_path, artifacts)
+
+            record = await create_file_record(
+                user_id, file_name, file_path, file_size, mime_type, sha256, derived=derived
+            )
+            if not record:
+                return None
+
+            thumbnail_path = record.get("thumbnail_path")
+            return {
+                **record,
+                "public_url": self.supabase.storage.from_(self.bucket).get_public_url(file_path),
+                "thumbnail_url": (
+                    self.supabase.storage.from_(self.bucket).get_public_url(thumbnail_path)
+                    if thumbnail_path else None
+                ),
+                "deduplicated": deduplicated
+            }
+
+        except ValueError:
+            raise
+        except Exception:
+            logger.error("File upload failed", exc_info=True)
+            return None
+        finally:
+            await aiofiles.os.remove(temp_path)
+
+    def _upload_path(self, local_path: str, file_path: str, mime_type: str):
+        """임시 파일을 스트림으로 Storage 에 업로드 (스레드 풀에서 실행)"""
+        with open(local_path, "rb") as f:
+            self.supabase.storage.from_(self.bucket).upload(
+                path=file_path,
+                file=f,
+                # 같은 내용 동시 업로드 시 충돌 대신 덮어쓰기 (내용 동일)
+                file_options={"content-type": mime_type, "upsert": "true"}
+            )
+
+    async def _store_derived(self, file_path: str, artifacts: dict) -> dict:
+        """
+        전처리 결과를 원본 옆에 저장 → files 행에 넣을 컬럼
+
+        {base}.model.jpg|png (모델 입력용 이미지), {base}.thumb.jpg|png, {base}.text.txt
+        파생 파일 업로드가 실패하면 그 컬럼만 비워 둔다. (원본으로 동작)
+        """
+        base = os.path.splitext(file_path)[0]
+        uploads = []  # (컬럼, 경로, 내용, MIME 타입)
+        if "model_image" in artifacts:
+            data, mime_type = artifacts["model_image"]
+            uploads.append(("model_image_path", f"{base}.model{_IMAGE_EXTENSIONS[mime_type]}", data, mime_type))
+        if "thumbnail" in artifacts:
+            data, mime_type = artifacts["thumbnail"]
+            uploads.append(("thumbnail_path", f"{base}.thumb{_IMAGE_EXTENSIONS[mime_type]}", data, mime_type))
+        if "text" in artifacts:
+            uploads.append(("text_path", f"{base}.text.txt", artifacts["text"].encode(), "text/plain; charset=utf-8"))
+
+        results = await asyncio.gather(
+            *(run_db(self._upload_bytes, path, data, mime_type) for _, path, data, mime_type in uploads),
+            return_exceptions=True
+        )
+        derived = {key: artifacts[key] for key in ("width", "height") if key in artifacts}
+        for (column, path, _, _), result in zip(uploads, results):
+            if isinstance(result, Exception):
+                logger.warning("Derived file upload failed", extra={"file_path": path, "error": str(result)})
+            else:
+                derived[column] = path
+        return derived
+
+    def _upload_bytes(self, file_path: str, data: bytes, mime_type: str):
+        """메모리의 내용을 Storage 에 업로드 (스레드 풀에서 실행)"""
+        self.supabase.storage.from_(self.bucket).upload(
+            path=file_path,
+            file=data,
+            file_options={"content-type": mime_type, "upsert": "true"}
+        )
+
+    async def download_file(self, file_path: str) -> bytes | None:
+        """파일 내용 다운로드 (없거나 실패하면 None)"""
+        try:
+            return await run_db(self.supabase.storage.from_(self.bucket).download, file_path)
         except Exception as e:
-            print(f"File upload failed: {e}")
+            logger.error("File download failed", extra={"file_path": file_path, "error": str(e)})
             return None
 
-    async def delete_file(self, file_path: str) -> bool:
-        """파일 삭제"""
+    async def delete_files(self, file_paths: list[str]) -> bool:
+        """파일 여러 개 삭제 (Storage remove 호출 한 번)"""
         try:
-            self.supabase.storage.from_(self.bucket).remove([file_path])
+            await run_db(self.supabase.storage.from_(self.bucket).remove, file_paths)
             return True
         except Exception as e:
-            print(f"File deletion failed: {e}")
+            logger.error("File deletion failed", extra={"files": len(file_paths), "error": str(e)})
             return False
 
+    async def delete_file(self, file_path: str) -> bool:
+        """파일 삭제"""
+        return await self.delete_files([file_path])
+
     async def get_file_url(self, file_path: str) -> str | None:
         """파일 Public URL 조회"""
         try:
             return self.supabase.storage.from_(self.bucket).get_public_url(file_path)
         except Exception as e:
-            print(f"Failed to get file URL: {e}")
+            logger.error("Failed to get file URL", extra={"file_path": file_path, "error": str(e)})
             return None
 
 
@@ -0,0 +1,90 @@
+"""스트리밍 청크 병합 - 토큰 델타를 시간/크기 단위로 묶어 전송 횟수 절감"""
+import asyncio
+from typing import AsyncIterator
+
+
+async def coalesce_chunks(
+    chunks: AsyncIterator[str],
+    flush_ms: int,
+    flush_bytes: int
+) -> AsyncIterator[str]:
+    """
+    텍스트 청크를 모아서 내보냄
+
+    첫 청크가 버퍼에 들어온 뒤 flush_ms 가 지나거나, 버퍼가 flush_bytes
+    (UTF-8 기준) 이상이 되면 한 덩어리로 yield 한다. 업스트림이 멈춰 있어도
+    시간 조건은 지켜진다.
+
+    Args:
+        chunks: 원본 청크 스트림 (ClaudeService.chat 등)
+        flush_ms: 최대 지연 (0 이하면 시간 조건 없음)
+        flush_bytes: 최대 버퍼 크기 (0 이하면 크기 조건 없음)
+
+    둘 다 0 이하면 원본을 그대로 전달한다.
+    """
+    iterator = chunks.__aiter__()
+
+    if flush_ms <= 0 and flush_bytes <= 0:
+        try:
+            async for chunk in iterator:
+                yield chunk
+        finally:
+            await _aclose(iterator)
+        return
+
+    loop = asyncio.get_running_loop()
+    interval = flush_ms / 1000 if flush_ms > 0 else None
+    buffer: list[str] = []
+    size = 0
+    deadline = 0.0
+    pending: asyncio.Future | None = None
+
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+
+            timeout = None
+            if buffer and interval is not None:
+                timeout = max(deadline - loop.time(), 0)
+
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # 시간 초과 → 모인 것만 먼저 전송
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+
+            if not buffer:
+                deadline = loop.time() + (interval or 0)
+            buffer.append(chunk)
+            size += len(chunk.encode())
+
+            if flush_bytes > 0 and size >= flush_bytes:
+                yield "".join(buffer)
+                buffer, size = [], 0
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None and not pending.done():
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, Exception):
+                pass
+        await _aclose(iterator)
+
+
+async def _aclose(iterator):
+    """업스트림 제너레이터 정리 (HTTP 스트림 반환)"""
+    aclose = getattr(iterator, "aclose", None)
+    if aclose is not None:
+        await aclose()
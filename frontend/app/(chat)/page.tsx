@@ -42,14 +42,19 @@ export default function ChatPage() {
     setIsSending(true);
 
     try {
-      // HTTP POST 요청
+      // HTTP POST 요청 (사용자는 백엔드가 토큰으로 확인)
+      const { data: { session } } = await supabase.auth.getSession();
+      if (!session) {
+        router.push('/login');
+        return;
+      }
       const response = await fetch(`${API_URL}/api/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'Authorization': `Bearer ${session.access_token}`,
         },
         body: JSON.stringify({
-          user_id: user.id,
           message: message,
           files: []
         })
@@ -0,0 +1,22 @@
+-- MSG AI Messenger - 히스토리 키셋 페이지네이션 인덱스
+-- Created: 2026-10-18
+
+-- ============================================
+-- Messages: (conversation_id, created_at, id)
+-- ============================================
+-- 대화별 메시지를 (created_at, id) 키셋으로 앞/뒤 페이지 조회
+create index if not exists messages_conversation_created_at_id_idx
+  on public.messages(conversation_id, created_at, id);
+
+-- 위 복합 인덱스의 선두 컬럼과 중복
+drop index if exists public.messages_conversation_id_idx;
+
+-- ============================================
+-- Conversations: (user_id, updated_at desc, id desc)
+-- ============================================
+-- 사용자별 대화 목록을 최근 업데이트 순 키셋으로 조회
+create index if not exists conversations_user_updated_at_id_idx
+  on public.conversations(user_id, updated_at desc, id desc);
+
+-- 위 복합 인덱스의 선두 컬럼과 중복
+drop index if exists public.conversations_user_id_idx;
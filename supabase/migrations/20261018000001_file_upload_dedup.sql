@@ -0,0 +1,25 @@
+-- MSG AI Messenger - 스트리밍 업로드 / 내용 기반 중복 제거
+-- Created: 2026-10-18
+
+-- ============================================
+-- Files: 업로드 시점 메타데이터
+-- ============================================
+-- 업로드는 메시지 전송 전에 일어나므로 message_id 는 나중에 연결
+alter table public.files alter column message_id drop not null;
+
+-- 업로드한 사용자 + 내용 해시 (Storage 경로: {user_id}/sha256/{sha256}{ext})
+alter table public.files
+  add column if not exists user_id uuid references auth.users on delete cascade,
+  add column if not exists sha256 text;
+
+-- 같은 내용 재업로드 확인용
+create index if not exists files_user_id_sha256_idx on public.files(user_id, sha256);
+
+-- RLS 정책: 메시지에 연결되기 전 파일은 업로드한 사용자만 접근 가능
+create policy "Users can view own unattached files"
+  on public.files for select
+  using (message_id is null and auth.uid() = user_id);
+
+create policy "Users can create own unattached files"
+  on public.files for insert
+  with check (message_id is null and auth.uid() = user_id);
@@ -0,0 +1,8 @@
+-- MSG AI Messenger - 중단된 응답 표시
+-- Created: 2026-10-18
+
+-- ============================================
+-- Messages: 취소/연결 끊김으로 중간에 멈춘 assistant 응답
+-- ============================================
+alter table public.messages
+  add column if not exists truncated boolean not null default false;
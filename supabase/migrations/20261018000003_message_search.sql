@@ -0,0 +1,82 @@
+-- MSG AI Messenger - 메시지 전문 검색
+-- Created: 2026-10-18
+
+-- ============================================
+-- Extensions
+-- ============================================
+-- 한국어(형태소 분석기 없음) 부분 일치 검색용 trigram
+create extension if not exists pg_trgm with schema extensions;
+
+-- ============================================
+-- Messages: tsvector 생성 컬럼 + GIN 인덱스
+-- ============================================
+-- 'simple' 설정: 언어별 어간 추출 없이 공백/구두점 단위 토큰 (한국어 / 영어 혼용)
+alter table public.messages
+  add column if not exists search_vector tsvector
+  generated always as (to_tsvector('simple', content)) stored;
+
+create index if not exists messages_search_vector_idx
+  on public.messages using gin (search_vector);
+
+-- 조사가 붙은 한국어 단어("날씨는" → "날씨")처럼 토큰이 일치하지 않는 경우 ILIKE 폴백
+create index if not exists messages_content_trgm_idx
+  on public.messages using gin (content extensions.gin_trgm_ops);
+
+-- ============================================
+-- RPC: search_messages
+-- ============================================
+-- 사용자의 대화로 범위를 제한한 랭킹 검색 (키셋 페이지네이션: rank desc, id desc)
+-- rank = greatest(ts_rank, word_similarity) - 토큰 일치와 부분 일치를 같은 척도로 정렬
+create or replace function public.search_messages(
+  p_user_id uuid,
+  p_query text,
+  p_limit int default 20,
+  p_after_rank double precision default null,
+  p_after_id uuid default null
+)
+returns table (
+  id uuid,
+  conversation_id uuid,
+  conversation_title text,
+  role text,
+  content text,
+  truncated boolean,
+  created_at timestamp with time zone,
+  rank double precision
+)
+language sql
+stable
+set search_path = public, extensions
+as $$
+  with q as (
+    select
+      websearch_to_tsquery('simple', p_query) as tsq,
+      '%' || replace(replace(replace(p_query, '\', '\\'), '%', '\%'), '_', '\_') || '%' as pattern
+  ),
+  matches as (
+    select
+      m.id,
+      m.conversation_id,
+      c.title as conversation_title,
+      m.role,
+      m.content,
+      m.truncated,
+      m.created_at,
+      greatest(ts_rank(m.search_vector, q.tsq), word_similarity(p_query, m.content))::double precision as rank
+    from public.messages m
+    join public.conversations c on c.id = m.conversation_id
+    cross join q
+    where c.user_id = p_user_id
+      and (m.search_vector @@ q.tsq or m.content ilike q.pattern)
+  )
+  select *
+  from matches
+  where p_after_rank is null
+     or (matches.rank, matches.id) < (p_after_rank, p_after_id)
+  order by matches.rank desc, matches.id desc
+  limit p_limit;
+$$;
+
+-- 백엔드(service role)에서만 호출 (사용자 범위는 p_user_id 로 제한)
+revoke execute on function public.search_messages(uuid, text, int, double precision, uuid) from public, anon, authenticated;
+grant execute on function public.search_messages(uuid, text, int, double precision, uuid) to service_role;
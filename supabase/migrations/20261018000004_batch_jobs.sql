@@ -0,0 +1,114 @@
+-- MSG AI Messenger - 배치 작업 (Anthropic Message Batches API)
+-- Created: 2026-10-18
+
+-- ============================================
+-- Batch Jobs Table
+-- ============================================
+-- 비대화형 일괄 처리 작업 (대화 요약 / 저장된 프롬프트 재답변)
+-- 상태: queued → submitting → submitted → collecting → ended
+--       (제출 실패 시 failed, 대기 중 취소 시 cancelled)
+-- 여러 작업을 Anthropic 배치 하나로 묶어 제출하므로 provider_batch_id 는 작업 간에 공유될 수 있다.
+create table public.batch_jobs (
+  id uuid default uuid_generate_v4() primary key,
+  user_id uuid references auth.users on delete cascade not null,
+  kind text not null check (kind in ('prompt', 'summarize')),
+  status text not null default 'queued'
+    check (status in ('queued', 'submitting', 'submitted', 'collecting', 'ended', 'failed', 'cancelled')),
+  provider_batch_id text,
+  total integer not null,
+  succeeded integer not null default 0,
+  errored integer not null default 0,
+  canceled integer not null default 0,
+  expired integer not null default 0,
+  error text,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  submitted_at timestamp with time zone,
+  ended_at timestamp with time zone
+);
+
+-- 워커: 상태별 대기 작업 / 오래 멈춘 작업 조회
+create index batch_jobs_status_updated_at_idx on public.batch_jobs(status, updated_at);
+-- 워커: 같은 Anthropic 배치로 제출된 작업 일괄 전이
+create index batch_jobs_provider_batch_id_idx on public.batch_jobs(provider_batch_id)
+  where provider_batch_id is not null;
+-- 작업 목록 (최근 순)
+create index batch_jobs_user_id_created_at_idx on public.batch_jobs(user_id, created_at desc, id desc);
+
+-- RLS 활성화
+alter table public.batch_jobs enable row level security;
+
+-- RLS 정책: 사용자는 자신의 작업만 조회 가능 (생성 / 상태 변경은 백엔드에서만)
+create policy "Users can view own batch jobs"
+  on public.batch_jobs for select
+  using (auth.uid() = user_id);
+
+-- ============================================
+-- Batch Items Table
+-- ============================================
+-- 작업의 요청 하나 = Anthropic 배치 요청 하나 (custom_id = 항목 id)
+create table public.batch_items (
+  id uuid default uuid_generate_v4() primary key,
+  job_id uuid references public.batch_jobs on delete cascade not null,
+  conversation_id uuid references public.conversations on delete cascade not null,
+  prompt text, -- summarize 작업은 null (설정의 요약 지시문 사용)
+  status text not null default 'pending'
+    check (status in ('pending', 'succeeded', 'errored', 'canceled', 'expired')),
+  error text,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- 인덱스
+create index batch_items_job_id_idx on public.batch_items(job_id);
+
+-- RLS 활성화
+alter table public.batch_items enable row level security;
+
+-- RLS 정책: 사용자는 자신의 작업 항목만 조회 가능
+create policy "Users can view own batch items"
+  on public.batch_items for select
+  using (
+    auth.uid() = (
+      select user_id from public.batch_jobs
+      where id = batch_items.job_id
+    )
+  );
+
+-- ============================================
+-- RPC: create_batch_job
+-- ============================================
+-- 작업 + 항목을 한 트랜잭션으로 저장 (워커가 항목 없는 작업을 가져가지 않도록)
+-- 항목의 대화가 모두 p_job.user_id 소유일 때만 저장하고 true, 아니면 아무것도 하지 않고 false
+create or replace function public.create_batch_job(p_job jsonb, p_items jsonb)
+returns boolean
+language plpgsql
+set search_path = public
+as $$
+declare
+  v_job_id uuid := (p_job->>'id')::uuid;
+  v_user_id uuid := (p_job->>'user_id')::uuid;
+begin
+  if exists (
+    select 1
+    from jsonb_to_recordset(p_items) as i(conversation_id uuid)
+    left join public.conversations c
+      on c.id = i.conversation_id and c.user_id = v_user_id
+    where c.id is null
+  ) then
+    return false;
+  end if;
+
+  insert into public.batch_jobs (id, user_id, kind, total)
+  values (v_job_id, v_user_id, p_job->>'kind', jsonb_array_length(p_items));
+
+  insert into public.batch_items (id, job_id, conversation_id, prompt)
+  select i.id, v_job_id, i.conversation_id, i.prompt
+  from jsonb_to_recordset(p_items) as i(id uuid, conversation_id uuid, prompt text);
+
+  return true;
+end;
+$$;
+
+-- 백엔드(service role)에서만 호출
+revoke execute on function public.create_batch_job(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function public.create_batch_job(jsonb, jsonb) to service_role;
@@ -0,0 +1,9 @@
+-- MSG AI Messenger - 히스토리 내보내기
+-- Created: 2026-10-18
+
+-- ============================================
+-- Conversations: (user_id, created_at, id)
+-- ============================================
+-- 내보내기는 도중에 바뀌지 않는 생성 순 키셋으로 대화를 읽는다 (재개 커서)
+create index if not exists conversations_user_created_at_id_idx
+  on public.conversations(user_id, created_at, id);
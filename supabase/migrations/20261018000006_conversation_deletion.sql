@@ -0,0 +1,95 @@
+-- MSG AI Messenger - 대화 삭제 + Storage 정리
+-- Created: 2026-10-18
+
+-- ============================================
+-- Deletion Jobs Table
+-- ============================================
+-- 대화 삭제 작업 진행 상황 (요청은 바로 반환, 백그라운드에서 묶음 단위로 삭제)
+-- 상태: deleting → purging → done (실패 시 failed)
+create table public.deletion_jobs (
+  id uuid default uuid_generate_v4() primary key,
+  user_id uuid references auth.users on delete cascade not null,
+  status text not null default 'deleting'
+    check (status in ('deleting', 'purging', 'done', 'failed')),
+  total integer not null, -- 요청한 대화 수
+  deleted integer not null default 0, -- 삭제된 대화 수 (없거나 남의 대화는 제외)
+  files_removed integer not null default 0, -- 이 작업이 지운 Storage 객체 수
+  error text,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  updated_at timestamp with time zone default timezone('utc'::text, now()) not null,
+  finished_at timestamp with time zone
+);
+
+create index deletion_jobs_user_id_idx on public.deletion_jobs(user_id);
+
+-- RLS 활성화
+alter table public.deletion_jobs enable row level security;
+
+-- RLS 정책: 사용자는 자신의 삭제 작업만 조회 가능
+create policy "Users can view own deletion jobs"
+  on public.deletion_jobs for select
+  using (auth.uid() = user_id);
+
+-- ============================================
+-- Storage Purge Queue
+-- ============================================
+-- files 행이 (대화 → 메시지 → 파일 cascade 포함) 지워질 때 Storage 경로를 남긴다.
+-- cascade 가 끝나면 files 행으로는 경로를 찾을 수 없으므로 트리거로 기록한다.
+create table public.storage_purge_queue (
+  id bigint generated always as identity primary key,
+  file_path text not null,
+  created_at timestamp with time zone default timezone('utc'::text, now()) not null
+);
+
+-- 백엔드(service role)만 사용 - 정책 없음
+alter table public.storage_purge_queue enable row level security;
+
+create or replace function public.enqueue_storage_purge()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  insert into public.storage_purge_queue (file_path) values (old.file_path);
+  return old;
+end;
+$$;
+
+create trigger files_enqueue_storage_purge
+  after delete on public.files
+  for each row execute function public.enqueue_storage_purge();
+
+-- 경로가 아직 다른 files 행에서 쓰이는지 확인 (내용 기반 중복 제거로 경로 공유)
+create index if not exists files_file_path_idx on public.files(file_path);
+
+-- ============================================
+-- RPC: claim_storage_purge
+-- ============================================
+-- 큐에서 p_limit 개를 꺼내 경로마다 아직 참조하는 files 행이 있는지(in_use) 함께 반환
+-- in_use 인 경로는 지우지 않는다. 반환 행 수 < p_limit 이면 큐가 비었다는 뜻.
+-- (여러 워커가 동시에 호출해도 skip locked 로 같은 행을 나눠 갖지 않음)
+create or replace function public.claim_storage_purge(p_limit int default 100)
+returns table (file_path text, in_use boolean)
+language sql
+set search_path = public
+as $$
+  with claimed as (
+    delete from public.storage_purge_queue q
+    where q.id in (
+      select id from public.storage_purge_queue
+      order by id
+      limit p_limit
+      for update skip locked
+    )
+    returning q.file_path
+  )
+  select
+    c.file_path,
+    exists (select 1 from public.files f where f.file_path = c.file_path) as in_use
+  from claimed c;
+$$;
+
+-- 백엔드(service role)에서만 호출
+revoke execute on function public.claim_storage_purge(int) from public, anon, authenticated;
+grant execute on function public.claim_storage_purge(int) to service_role;
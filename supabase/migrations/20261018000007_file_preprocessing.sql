@@ -0,0 +1,66 @@
+-- MSG AI Messenger - 업로드 전처리 (이미지 축소 / 썸네일, PDF 텍스트)
+-- Created: 2026-10-18
+
+-- ============================================
+-- Files: 전처리 결과
+-- ============================================
+-- 파생 파일은 원본 옆에 저장 ({user_id}/sha256/{sha256}.model.jpg 등)
+-- 같은 내용을 다시 올리면 (중복 제거) 원본과 함께 파생 경로도 공유한다.
+alter table public.files
+  add column if not exists width integer, -- 이미지 원본 크기
+  add column if not exists height integer,
+  add column if not exists model_image_path text, -- 모델 입력용으로 축소 / 재인코딩한 이미지
+  add column if not exists thumbnail_path text, -- UI 썸네일
+  add column if not exists text_path text; -- PDF 에서 추출한 텍스트
+
+-- 정리 큐에서 파생 경로가 아직 쓰이는지 확인
+create index if not exists files_model_image_path_idx on public.files(model_image_path)
+  where model_image_path is not null;
+create index if not exists files_thumbnail_path_idx on public.files(thumbnail_path)
+  where thumbnail_path is not null;
+create index if not exists files_text_path_idx on public.files(text_path)
+  where text_path is not null;
+
+-- ============================================
+-- Storage Purge: 파생 파일 포함
+-- ============================================
+-- files 행이 지워지면 원본과 파생 경로를 모두 정리 큐에 넣는다.
+create or replace function public.enqueue_storage_purge()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  insert into public.storage_purge_queue (file_path)
+  select p
+  from unnest(array[old.file_path, old.model_image_path, old.thumbnail_path, old.text_path]) as p
+  where p is not null;
+  return old;
+end;
+$$;
+
+-- 경로가 원본이든 파생 파일이든 남은 files 행에서 쓰이면 in_use
+create or replace function public.claim_storage_purge(p_limit int default 100)
+returns table (file_path text, in_use boolean)
+language sql
+set search_path = public
+as $$
+  with claimed as (
+    delete from public.storage_purge_queue q
+    where q.id in (
+      select id from public.storage_purge_queue
+      order by id
+      limit p_limit
+      for update skip locked
+    )
+    returning q.file_path
+  )
+  select
+    c.file_path,
+    exists (select 1 from public.files f where f.file_path = c.file_path)
+      or exists (select 1 from public.files f where f.model_image_path = c.file_path)
+      or exists (select 1 from public.files f where f.thumbnail_path = c.file_path)
+      or exists (select 1 from public.files f where f.text_path = c.file_path) as in_use
+  from claimed c;
+$$;
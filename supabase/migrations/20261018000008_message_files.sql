@@ -0,0 +1,68 @@
+-- MSG AI Messenger - 첨부 파일 ↔ 메시지 연결
+-- Created: 2026-10-18
+
+-- ============================================
+-- RPC: link_message_files
+-- ============================================
+-- 메시지에 첨부된 경로의 files 행을 p_message_id 에 연결한다.
+-- (대화 삭제 cascade → files 삭제 트리거 → storage_purge_queue 가 동작하려면 필요)
+--
+-- - 아직 메시지에 연결되지 않은 업로드 행이 있으면 그 행을 연결
+-- - 이미 다른 메시지에 연결된 경로(같은 파일을 다시 첨부)는 메타데이터를 복사한 행을 추가
+--   → 대화 하나를 지워도 다른 대화가 쓰는 경로는 in_use 로 남는다
+-- - p_user_id 소유가 아닌 경로는 무시
+-- 연결한 행 수를 반환
+create or replace function public.link_message_files(
+  p_message_id uuid,
+  p_user_id uuid,
+  p_paths text[]
+)
+returns integer
+language plpgsql
+set search_path = public
+as $$
+declare
+  v_linked integer;
+  v_copied integer;
+begin
+  with unlinked as (
+    select distinct on (file_path) id
+    from public.files
+    where user_id = p_user_id
+      and message_id is null
+      and file_path = any(p_paths)
+    order by file_path, created_at
+  )
+  update public.files f
+  set message_id = p_message_id
+  from unlinked u
+  where f.id = u.id;
+  get diagnostics v_linked = row_count;
+
+  insert into public.files (
+    message_id, user_id, file_name, file_path, file_size, mime_type, sha256,
+    width, height, model_image_path, thumbnail_path, text_path
+  )
+  select distinct on (f.file_path)
+    p_message_id, f.user_id, f.file_name, f.file_path, f.file_size, f.mime_type, f.sha256,
+    f.width, f.height, f.model_image_path, f.thumbnail_path, f.text_path
+  from public.files f
+  where f.user_id = p_user_id
+    and f.file_path = any(p_paths)
+    and not exists (
+      select 1 from public.files linked
+      where linked.message_id = p_message_id and linked.file_path = f.file_path
+    )
+  order by f.file_path, f.created_at;
+  get diagnostics v_copied = row_count;
+
+  return v_linked + v_copied;
+end;
+$$;
+
+-- 백엔드(service role)에서만 호출
+revoke execute on function public.link_message_files(uuid, uuid, text[]) from public, anon, authenticated;
+grant execute on function public.link_message_files(uuid, uuid, text[]) to service_role;
+
+-- 경로로 사용자 파일 조회 (첨부 / 연결)
+create index if not exists files_user_id_file_path_idx on public.files(user_id, file_path);
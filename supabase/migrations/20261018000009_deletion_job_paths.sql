@@ -0,0 +1,33 @@
+-- MSG AI Messenger - 삭제 작업별 Storage 경로
+-- Created: 2026-10-18
+
+-- ============================================
+-- RPC: conversation_file_paths
+-- ============================================
+-- 대화들의 메시지에 연결된 files 행의 Storage 경로 (원본 + 파생 파일, 중복 제거)
+-- 삭제 작업이 DELETE 전에 호출해 두고, 정리 큐에서 지운 경로 중 이 작업 몫만 센다.
+-- (storage_purge_queue 는 모든 삭제가 함께 쓰므로 큐 전체 수로는 작업별 진행을 알 수 없음)
+create or replace function public.conversation_file_paths(
+  p_user_id uuid,
+  p_conversation_ids uuid[]
+)
+returns setof text
+language sql
+stable
+set search_path = public
+as $$
+  select distinct p
+  from public.conversations c
+  join public.messages m on m.conversation_id = c.id
+  join public.files f on f.message_id = m.id
+  cross join lateral unnest(
+    array[f.file_path, f.model_image_path, f.thumbnail_path, f.text_path]
+  ) as p
+  where c.user_id = p_user_id
+    and c.id = any(p_conversation_ids)
+    and p is not null;
+$$;
+
+-- 백엔드(service role)에서만 호출
+revoke execute on function public.conversation_file_paths(uuid, uuid[]) from public, anon, authenticated;
+grant execute on function public.conversation_file_paths(uuid, uuid[]) to service_role;